@@ -13,6 +13,9 @@ if is_64bits and sys.platform == "darwin":
 
 from skype import Skype
 from callchannel import CallChannelManager
+from recorder import Recorder
+from roster import Roster
+from chatsync import ChatSync
 from errors import SkypeError, SkypeAPIError
 from enums import *
 from api import platform
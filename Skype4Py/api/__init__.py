@@ -20,18 +20,21 @@ __docformat__ = 'restructuredtext en'
 import sys
 import threading
 import logging
+import time
+import heapq
 
 from Skype4Py.utils import *
 from Skype4Py.enums import apiAttachUnknown
 from Skype4Py.errors import SkypeAPIError
 
 
-__all__ = ['Command', 'SkypeAPINotifier', 'SkypeAPI']
+__all__ = ['Command', 'CommandFuture', 'SkypeAPINotifier', 'SkypeAPI']
 
 
 DEFAULT_PROTOCOL = 5
 DEFAULT_FRIENDLYNAME = u'Skype4Py'
 DEFAULT_TIMEOUT = 30000
+MAX_COMMAND_ID = 0x7fffffff
 
 
 class Command(object):
@@ -85,6 +88,135 @@ class Command(object):
         return timeout2float(self.Timeout)
 
 
+class CommandFuture(object):
+    """Represents a pending reply to a non-blocking command. Use `Skype.SendCommandAsync`
+    or `Skype.Batch` to instantiate.
+
+    The future is completed by the API thread as soon as Skype replies to the command
+    or the command times out.
+    """
+
+    def __init__(self, command, convert=None):
+        """Use `Skype.SendCommandAsync` to instantiate the object instead of doing it directly.
+
+        :Parameters:
+          command : `Command` or None
+            The command this future waits for.
+          convert : callable or None
+            Optional callable converting the command to the result value. Called once,
+            on the API thread when the reply arrives, with the command object as the
+            only argument. Side effects of the conversion (like caching the value)
+            therefore happen in the order in which the messages arrive, even if nobody
+            calls `result`.
+        """
+
+        self.command = command
+        """Command object this future waits for.
+
+        :type: `Command`"""
+
+        self.convert = convert
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._error = None
+        self._value = None
+        if command is not None:
+            command._future = self
+
+    def __repr__(self):
+        return '<%s with command=%s, done=%s>' % \
+            (object.__repr__(self)[1:-1], repr(self.command), self.done())
+
+    def done(self):
+        """Tells if the reply has been received or the command has timed out.
+
+        :rtype: bool
+        """
+        return self._event.isSet()
+
+    def wait(self, timeout=None):
+        """Waits until the future is completed.
+
+        :Parameters:
+          timeout : int, long, float or None
+            Maximum wait time (see `timeout2float`). None waits until the command
+            itself times out.
+
+        :return: True if the future is completed, False otherwise.
+        :rtype: bool
+        """
+        if timeout is None:
+            self._event.wait()
+        else:
+            self._event.wait(timeout2float(timeout))
+        return self._event.isSet()
+
+    def result(self, timeout=None):
+        """Returns the result of the command waiting for it if necessary.
+
+        :Parameters:
+          timeout : int, long, float or None
+            Maximum wait time (see `timeout2float`).
+
+        :return: The command reply or the value returned by the ``convert`` callable.
+
+        :raise SkypeAPIError: If the command or the wait has timed out. Exceptions
+                              raised by the ``convert`` callable are propagated.
+        """
+        if not self.wait(timeout):
+            raise SkypeAPIError('Skype command timeout')
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def add_done_callback(self, callback):
+        """Registers a callable called with the future as the only argument after it
+        is completed. If the future is already completed, the callable is called
+        immediately. Otherwise it is called on the API thread.
+
+        :Parameters:
+          callback : callable
+            Callable to register.
+        """
+        self._lock.acquire()
+        try:
+            if not self._event.isSet():
+                self._callbacks.append(callback)
+                return
+        finally:
+            self._lock.release()
+        callback(self)
+
+    def set_done(self, error=None):
+        """Completes the future. Called by the API when the reply arrives. Converts
+        the reply unless an error is given.
+
+        :Parameters:
+          error : Exception or None
+            Exception that `result` should raise instead of returning a value.
+        """
+        self._lock.acquire()
+        try:
+            if self._event.isSet():
+                return
+            if error is None:
+                try:
+                    if self.convert is None:
+                        self._value = self.command.Reply
+                    else:
+                        self._value = self.convert(self.command)
+                except Exception, e:
+                    error = e
+            self._error = error
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        finally:
+            self._lock.release()
+        for callback in callbacks:
+            callback(self)
+
+
 class SkypeAPINotifier(object):
     def attachment_changed(self, status):
         pass
@@ -99,6 +231,125 @@ class SkypeAPINotifier(object):
         pass
 
 
+class TimeoutScheduler(threading.Thread):
+    """Expires non-blocking commands using a single thread for all of them.
+
+    Scheduled commands are kept in a heap ordered by their deadlines. Cancelled
+    entries are only marked and dropped when they reach the top of the heap or
+    when the heap is compacted.
+    """
+
+    def __init__(self, expire):
+        """Initializes the object.
+
+        :Parameters:
+          expire : callable
+            Called on the scheduler thread with the command as the only argument
+            when its timeout elapses.
+        """
+        threading.Thread.__init__(self, name='Skype4Py timeout scheduler')
+        self.setDaemon(True)
+        self.expire = expire
+        self.cond = threading.Condition(threading.Lock())
+        self.heap = []
+        self.seq = 0
+        self.cancelled = 0
+        self.started = False
+        self.closed = False
+
+    def __len__(self):
+        return len(self.heap) - self.cancelled
+
+    def schedule(self, command):
+        """Schedules the expiration of a command after its ``Timeout``.
+
+        :Parameters:
+          command : `Command`
+            Command to expire.
+
+        :raise SkypeAPIError: If the scheduler was closed.
+        """
+        self.cond.acquire()
+        try:
+            if self.closed:
+                raise SkypeAPIError('Skype API closed')
+            entry = [time.time() + command.timeout2float(), self.seq, command]
+            self.seq += 1
+            command._timeout = entry
+            heapq.heappush(self.heap, entry)
+            if self.heap[0] is entry:
+                self.cond.notify()
+            if not self.started:
+                self.started = True
+                self.start()
+        finally:
+            self.cond.release()
+
+    def cancel(self, command):
+        """Cancels the expiration of a command.
+
+        :Parameters:
+          command : `Command`
+            Command scheduled earlier using `schedule`.
+        """
+        self.cond.acquire()
+        try:
+            entry = getattr(command, '_timeout', None)
+            if entry is None or entry[2] is None:
+                return
+            entry[2] = None
+            self.cancelled += 1
+            if self.cancelled > 64 and self.cancelled * 2 > len(self.heap):
+                self.heap = [x for x in self.heap if x[2] is not None]
+                heapq.heapify(self.heap)
+                self.cancelled = 0
+        finally:
+            self.cond.release()
+
+    def close(self):
+        """Stops the scheduler thread. Pending commands are not expired.
+
+        :return: Commands which were still scheduled, the caller has to complete them.
+        :rtype: list of `Command`
+        """
+        self.cond.acquire()
+        try:
+            self.closed = True
+            pending = [x[2] for x in sorted(self.heap) if x[2] is not None]
+            for entry in self.heap:
+                entry[2] = None
+            self.heap = []
+            self.cancelled = 0
+            self.cond.notify()
+        finally:
+            self.cond.release()
+        return pending
+
+    def run(self):
+        while True:
+            self.cond.acquire()
+            try:
+                while not self.closed:
+                    while self.heap and self.heap[0][2] is None:
+                        heapq.heappop(self.heap)
+                        self.cancelled -= 1
+                    if not self.heap:
+                        self.cond.wait()
+                        continue
+                    delay = self.heap[0][0] - time.time()
+                    if delay <= 0:
+                        break
+                    self.cond.wait(delay)
+                if self.closed:
+                    return
+                entry = heapq.heappop(self.heap)
+                command = entry[2]
+                entry[2] = None
+            finally:
+                self.cond.release()
+            self.expire(command)
+
+
 class SkypeAPIBase(threading.Thread):
     def __init__(self):
         threading.Thread.__init__(self, name='Skype4Py API thread')
@@ -109,10 +360,17 @@ class SkypeAPIBase(threading.Thread):
         self.friendly_name = DEFAULT_FRIENDLYNAME
         self.protocol = DEFAULT_PROTOCOL
         self.commands = {}
+        # Guards the id allocation only, lookups and removals of commands
+        # rely on the atomicity of dict operations.
+        self.commands_lock = threading.Lock()
+        self.next_id = 0
         # This lock is the main mechanism to make Skype4Py thread-safe.
         self.rlock = threading.RLock()
         self.notifier = SkypeAPINotifier()
         self.attachment_status = apiAttachUnknown
+        # Number of non-blocking commands that timed out.
+        self.expired_commands = 0
+        self.timeouts = TimeoutScheduler(self.expire_command)
         self.logger.info('opened')
 
     def _not_implemented(self):
@@ -122,27 +380,77 @@ class SkypeAPIBase(threading.Thread):
         self.notifier = notifier
         
     def push_command(self, command):
-        self.acquire()
+        # Ids are allocated from a wrapping counter so they are not reused until
+        # the counter wraps around. Ids still in flight at that point are skipped.
+        self.commands_lock.acquire()
         try:
             if command.Id < 0:
-                command.Id = 0
-                while command.Id in self.commands:
-                    command.Id += 1
+                id_ = self.next_id
+                while id_ in self.commands:
+                    id_ = (id_ + 1) % MAX_COMMAND_ID
+                self.next_id = (id_ + 1) % MAX_COMMAND_ID
+                command.Id = id_
             elif command.Id in self.commands:
                 raise SkypeAPIError('Command Id conflict')
             self.commands[command.Id] = command
         finally:
-            self.release()
+            self.commands_lock.release()
 
     def pop_command(self, id_):
-        self.acquire()
+        return self.commands.pop(id_, None)
+
+    def complete_command(self, command):
+        """Called by the transports after a reply to a non-blocking command has
+        been stored in ``command.Reply``.
+        """
+        future = getattr(command, '_future', None)
+        if future is not None:
+            future.set_done()
+
+    def remove_command(self, command):
+        """Removes the command from the table unless the reply has already
+        arrived (and the id has been reused).
+
+        :return: True if the command was removed, False otherwise.
+        :rtype: bool
+        """
+        self.commands_lock.acquire()
         try:
-            try:
-                return self.commands.pop(id_)
-            except KeyError:
-                return None
+            if self.commands.get(command.Id) is not command:
+                return False
+            # The reply may have popped the command in the meantime; no other
+            # command can take its id while we hold the lock.
+            return self.commands.pop(command.Id, None) is not None
         finally:
-            self.release()
+            self.commands_lock.release()
+
+    def expire_command(self, command):
+        """Called when a non-blocking command times out.
+        """
+        if not self.remove_command(command):
+            return
+        self.expired_commands += 1
+        self.logger.debug('command timeout %s', repr(command.Command))
+        future = getattr(command, '_future', None)
+        if future is not None:
+            future.set_done(SkypeAPIError('Skype command timeout'))
+
+    def fail_command(self, command, error):
+        """Called by the transports if a non-blocking command could not be delivered.
+
+        :Parameters:
+          command : `Command`
+            The failed command.
+          error : `SkypeAPIError`
+            Exception describing the failure.
+        """
+        if not self.remove_command(command):
+            return
+        self.timeouts.cancel(command)
+        self.logger.debug('command failed %s: %s', repr(command.Command), error)
+        future = getattr(command, '_future', None)
+        if future is not None:
+            future.set_done(error)
 
     def acquire(self):
         self.rlock.acquire()
@@ -151,6 +459,10 @@ class SkypeAPIBase(threading.Thread):
         self.rlock.release()
 
     def close(self):
+        # Fail the commands still waiting for replies, their futures would never
+        # complete otherwise.
+        for command in self.timeouts.close():
+            self.fail_command(command, SkypeAPIError('Skype API closed'))
         self.logger.info('closed')
 
     def set_friendly_name(self, friendly_name):
@@ -26,6 +26,7 @@ import logging
 from Skype4Py.api import Command, SkypeAPIBase, \
                          timeout2float, finalize_opts
 from Skype4Py.errors import SkypeAPIError
+from Skype4Py.protocol import parse
 from Skype4Py.enums import *
 
 
@@ -392,7 +393,7 @@ class SkypeAPI(SkypeAPIBase):
             else:
                 command._loop = EventLoop()
         else:
-            command._timer = timer = threading.Timer(command.timeout2float(), self.pop_command, (command.Id,))
+            self.timeouts.schedule(command)
 
         self.logger.debug('sending %s', repr(cmd))
         userInfo = CFDictionary({CFString('SKYPE_API_COMMAND'): CFString(cmd),
@@ -407,8 +408,6 @@ class SkypeAPI(SkypeAPIBase):
             else:
                 if not EventLoop.run(command.timeout2float()):
                     raise SkypeAPIError('Skype command timeout')
-        else:
-            timer.start()
 
     def init_observer(self):
         if self.has_observer():
@@ -445,23 +444,23 @@ class SkypeAPI(SkypeAPIBase):
         cmd = unicode(CFString(userInfo[CFString('SKYPE_API_NOTIFICATION_STRING')]))
         self.logger.debug('received %s', repr(cmd))
 
-        if cmd.startswith(u'#'):
-            p = cmd.find(u' ')
-            command = self.pop_command(int(cmd[1:p]))
-            if command is not None:
-                command.Reply = cmd[p + 1:]
-                if command.Blocking:
-                    if self.run_main_loop:
-                        command._event.set()
-                    else:
-                        command._loop.stop()
+        message = parse(cmd)
+        command = None
+        if message.Id is not None:
+            command = self.pop_command(message.Id)
+        if command is not None:
+            command.Reply = message
+            if command.Blocking:
+                if self.run_main_loop:
+                    command._event.set()
                 else:
-                    command._timer.cancel()
-                self.notifier.reply_received(command)
+                    command._loop.stop()
             else:
-                self.notifier.notification_received(cmd[p + 1:])
+                self.timeouts.cancel(command)
+                self.complete_command(command)
+            self.notifier.reply_received(command)
         else:
-            self.notifier.notification_received(cmd)
+            self.notifier.notification_received(message)
 
     def SKSkypeWillQuit(self, center, observer, name, obj, userInfo):
         self.logger.debug('received SKSkypeWillQuit')
@@ -19,6 +19,18 @@ The options include:
     Uses *X11* messaging through *Xlib*.
 
     Look into `Skype4Py.api.posix_x11` module for additional options.
+
+  - ``'sim'``
+
+    Uses an in-process simulated Skype client, no Skype client is needed.
+
+    Look into `Skype4Py.api.sim` module for additional options.
+
+  - ``'replay'``
+
+    Feeds a traffic recording made with `Skype4Py.recorder.Recorder` back to Skype4Py.
+
+    Look into `Skype4Py.api.replay` module for additional options.
 """
 __docformat__ = 'restructuredtext en'
 
@@ -35,6 +47,10 @@ def SkypeAPI(opts):
         from posix_dbus import SkypeAPI
     elif trans == 'x11':
         from posix_x11 import SkypeAPI
+    elif trans == 'sim':
+        from sim import SkypeAPI
+    elif trans == 'replay':
+        from replay import SkypeAPI
     else:
         raise SkypeAPIError('Unknown transport: %s' % trans)
     return SkypeAPI(opts)
@@ -9,6 +9,11 @@ for Linux machines when the transport is set to *DBus*. See below.
   Skype4Py events to work properly. Set this option to False if you plan to run the
   loop yourself or if, for example, your GUI framework does it for you.
 
+- ``AsyncInvoke`` (bool) - If set to True, commands are sent using asynchronous DBus
+  calls so many of them may be in flight at once. Replies are received by the GLib
+  main loop which therefore has to be running. Blocking commands still use synchronous
+  calls if ``RunMainLoop`` is False. Defaults to False.
+
 :requires: Skype for Linux 2.0 (beta) or newer.
 """
 __docformat__ = 'restructuredtext en'
@@ -24,6 +29,7 @@ from Skype4Py.api import Command, SkypeAPIBase, \
                          timeout2float, finalize_opts
 from Skype4Py.enums import *
 from Skype4Py.errors import SkypeAPIError
+from Skype4Py.protocol import parse
 from Skype4Py.utils import cndexp
 
 
@@ -69,6 +75,7 @@ class SkypeAPI(SkypeAPIBase):
         SkypeAPIBase.__init__(self)
         self.run_main_loop = opts.pop('RunMainLoop', True)
         system_bus = opts.pop('UseSystemBus', False)
+        self.async_invoke = opts.pop('AsyncInvoke', False)
         finalize_opts(opts)
         self.skype_in = self.skype_out = self.dbus_name_owner_watch = None
 
@@ -209,47 +216,72 @@ class SkypeAPI(SkypeAPIBase):
                 command._loop = loop = gobject.MainLoop()
                 command._set = False
         else:
-            command._timer = timer = threading.Timer(command.timeout2float(), self.pop_command, (command.Id,))
-        try:
-            result = self.skype_out.Invoke(cmd)
-        except dbus.DBusException, err:
-            raise SkypeAPIError(str(err))
-        if result.startswith(u'#%d ' % command.Id):
-            self.notify(result)
+            self.timeouts.schedule(command)
+        if self.async_invoke and (self.run_main_loop or not command.Blocking):
+            self.invoke_async(command, cmd)
+        else:
+            try:
+                result = self.skype_out.Invoke(cmd)
+            except dbus.DBusException, err:
+                raise SkypeAPIError(str(err))
+            if result.startswith(u'#%d ' % command.Id):
+                self.notify(result)
         if command.Blocking:
             if self.run_main_loop:
                 event.wait(command.timeout2float())
                 if not event.isSet():
                     raise SkypeAPIError('Skype command timeout')
+                if getattr(command, '_error', None) is not None:
+                    raise command._error
             elif not command._set:
                 gobject.timeout_add_seconds(int(command.timeout2float()), loop.quit)
                 loop.run()
                 if not command._set:
                     raise SkypeAPIError('Skype command timeout')
-        else:
-            timer.start()
+
+    def invoke_async(self, command, cmd):
+        prefix = u'#%d ' % command.Id
+
+        def reply_handler(result):
+            if result.startswith(prefix):
+                self.notify(result)
+
+        def error_handler(err):
+            error = SkypeAPIError(str(err))
+            if command.Blocking:
+                if self.remove_command(command):
+                    command._error = error
+                    command._event.set()
+            else:
+                self.fail_command(command, error)
+
+        try:
+            self.skype_out.Invoke(cmd, reply_handler=reply_handler, error_handler=error_handler)
+        except dbus.DBusException, err:
+            # The call may fail before it is sent, for example if the bus is disconnected.
+            error_handler(err)
 
     def notify(self, cmd):
         cmd = unicode(cmd)
         self.logger.debug('received %s', repr(cmd))
-        if cmd.startswith(u'#'):
-            p = cmd.find(u' ')
-            command = self.pop_command(int(cmd[1:p]))
-            if command is not None:
-                command.Reply = cmd[p + 1:]
-                if command.Blocking:
-                    if self.run_main_loop:
-                        command._event.set()
-                    else:
-                        command._set = True
-                        command._loop.quit()
+        message = parse(cmd)
+        command = None
+        if message.Id is not None:
+            command = self.pop_command(message.Id)
+        if command is not None:
+            command.Reply = message
+            if command.Blocking:
+                if self.run_main_loop:
+                    command._event.set()
                 else:
-                    command._timer.cancel()
-                self.notifier.reply_received(command)
+                    command._set = True
+                    command._loop.quit()
             else:
-                self.notifier.notification_received(cmd[p + 1:])
+                self.timeouts.cancel(command)
+                self.complete_command(command)
+            self.notifier.reply_received(command)
         else:
-            self.notifier.notification_received(cmd)
+            self.notifier.notification_received(message)
 
     def dbus_name_owner_changed(self, owned, old_owner, new_owner):
         self.logger.debug('received dbus name owner changed')
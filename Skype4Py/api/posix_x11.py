@@ -35,6 +35,9 @@ __docformat__ = 'restructuredtext en'
 import sys
 import threading
 import os
+import select
+import errno
+import fcntl
 from ctypes import *
 
 from ctypes.util import find_library
@@ -45,6 +48,7 @@ from Skype4Py.api import Command, SkypeAPIBase, \
                          timeout2float, finalize_opts
 from Skype4Py.enums import *
 from Skype4Py.errors import SkypeAPIError
+from Skype4Py.protocol import parse
 
 
 __all__ = ['SkypeAPI', 'threads_init']
@@ -163,6 +167,62 @@ class XEvent(Union):
 XEventP = POINTER(XEvent)
 
 
+# Skype messages are sent as sequences of ClientMessage events carrying 20 bytes
+# each. The first one uses the SKYPECONTROLAPI_MESSAGE_BEGIN atom, the rest use
+# SKYPECONTROLAPI_MESSAGE. The message is terminated with a null byte so the last
+# chunk is always shorter than 20 bytes when read back from the event.
+CHUNK_SIZE = 20
+
+
+def encode_message(cmd):
+    """Encodes a message and slices it into ClientMessage chunks.
+
+    :Parameters:
+      cmd : unicode
+        Message to encode.
+
+    :return: Chunks of at most `CHUNK_SIZE` bytes, the last one includes the
+             terminating null byte.
+    :rtype: list of str
+    """
+    data = cmd.encode('utf-8') + '\x00'
+    return [data[i:i + CHUNK_SIZE] for i in xrange(0, len(data), CHUNK_SIZE)]
+
+
+class MessageDecoder(object):
+    """Reassembles messages from ClientMessage chunks. The chunks are collected
+    in a list and joined and decoded only once, when the last one arrives.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def feed(self, chunk, begin):
+        """Adds a chunk to the message being reassembled.
+
+        :Parameters:
+          chunk : str
+            Chunk data as read from the event (without the null terminator).
+          begin : bool
+            True if the chunk starts a new message.
+
+        :return: The decoded message if the chunk was the last one, None otherwise.
+        :rtype: unicode or None
+
+        :raise ValueError: If a middle chunk is received with no beginning.
+        """
+        if begin:
+            self.chunks = [chunk]
+        elif self.chunks:
+            self.chunks.append(chunk)
+        else:
+            raise ValueError('Middle of Skype X11 message received with no beginning!')
+        if len(chunk) < CHUNK_SIZE:
+            data = ''.join(self.chunks)
+            self.chunks = []
+            return data.decode('utf-8')
+
+
 if getattr(sys, 'skype4py_setup', False):
     # we get here if we're building docs; to let the module import without
     # exceptions, we emulate the X11 library using a class:
@@ -186,6 +246,8 @@ else:
 # setup Xlib function prototypes
 x11.XCloseDisplay.argtypes = (DisplayP,)
 x11.XCloseDisplay.restype = None
+x11.XConnectionNumber.argtypes = (DisplayP,)
+x11.XConnectionNumber.restype = c_int
 x11.XCreateSimpleWindow.argtypes = (DisplayP, Window, c_int, c_int, c_uint,
         c_uint, c_uint, c_ulong, c_ulong)
 x11.XCreateSimpleWindow.restype = Window
@@ -195,6 +257,8 @@ x11.XDeleteProperty.argtypes = (DisplayP, Window, Atom)
 x11.XDeleteProperty.restype = None
 x11.XDestroyWindow.argtypes = (DisplayP, Window)
 x11.XDestroyWindow.restype = None
+x11.XFlush.argtypes = (DisplayP,)
+x11.XFlush.restype = c_int
 x11.XFree.argtypes = (c_void_p,)
 x11.XFree.restype = None
 x11.XGetAtomName.argtypes = (DisplayP, Atom)
@@ -248,6 +312,12 @@ class SkypeAPI(SkypeAPIBase):
         # initialize threads if not done already by the user
         threads_init(gtk=False)
 
+        # The main loop blocks on the display connection and this pipe. Writing
+        # to the pipe (see wakeup) lets other threads interrupt the wait.
+        self.wakeup_r, self.wakeup_w = os.pipe()
+        for fd in (self.wakeup_r, self.wakeup_w):
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+
         # init Xlib display
         self.disp = x11.XOpenDisplay(None)
         if not self.disp:
@@ -261,8 +331,6 @@ class SkypeAPI(SkypeAPIBase):
         self.atom_msg = x11.XInternAtom(self.disp, ctrl, False)
         self.atom_msg_begin = x11.XInternAtom(self.disp, ctrl + '_BEGIN', False)
 
-        self.loop_event = threading.Event()
-        self.loop_timeout = 0.0001
         self.loop_break = False
 
     def __del__(self):
@@ -276,26 +344,26 @@ class SkypeAPI(SkypeAPIBase):
         self.logger.info('thread started')
         # main loop
         event = XEvent()
-        data = ''
+        feed = MessageDecoder().feed
+        fds = [x11.XConnectionNumber(self.disp), self.wakeup_r]
         while not self.loop_break and x11:
             while x11.XPending(self.disp):
-                self.loop_timeout = 0.0001
                 x11.XNextEvent(self.disp, byref(event))
                 # events we get here are already prefiltered by the predicate function
                 if event.type == ClientMessage:
-                    if event.xclient.format == 8:
-                        if event.xclient.message_type == self.atom_msg_begin:
-                            data = str(event.xclient.data)
-                        elif event.xclient.message_type == self.atom_msg:
-                            if data != '':
-                                data += str(event.xclient.data)
-                            else:
-                                self.logger.warning('Middle of Skype X11 message received with no beginning!')
-                        else:
+                    # Every access to a ctypes field builds a new object, read them once.
+                    xclient = event.xclient
+                    if xclient.format == 8:
+                        message_type = xclient.message_type
+                        if message_type != self.atom_msg_begin and message_type != self.atom_msg:
                             continue
-                        if len(event.xclient.data) != 20 and data:
-                            self.notify(data.decode('utf-8'))
-                            data = ''
+                        try:
+                            cmd = feed(xclient.data, message_type == self.atom_msg_begin)
+                        except ValueError, err:
+                            self.logger.warning(str(err))
+                            continue
+                        if cmd is not None:
+                            self.notify(cmd)
                 elif event.type == PropertyNotify:
                     namep = x11.XGetAtomName(self.disp, event.xproperty.atom)
                     is_inst = (c_char_p(namep).value == '_SKYPE_INSTANCE')
@@ -312,14 +380,35 @@ class SkypeAPI(SkypeAPIBase):
                         elif event.xproperty.state == PropertyDelete:
                             self.win_skype = None
                             self.set_attachment_status(apiAttachNotAvailable)
-            self.loop_event.wait(self.loop_timeout)
-            if self.loop_event.isSet():
-                self.loop_timeout = 0.0001
-            elif self.loop_timeout < 1.0:
-                self.loop_timeout *= 2
-            self.loop_event.clear()
+            if self.loop_break:
+                break
+            try:
+                ready = select.select(fds, [], [])[0]
+            except select.error, err:
+                if err.args[0] == errno.EINTR:
+                    continue
+                raise
+            if self.wakeup_r in ready:
+                try:
+                    while os.read(self.wakeup_r, 4096):
+                        pass
+                except OSError, err:
+                    if err.errno != errno.EAGAIN:
+                        raise
         self.logger.info('thread finished')
-   
+
+    def wakeup(self):
+        """Interrupts the wait of the main loop. Has to be called after Xlib calls made
+        on other threads because they may read events into the Xlib queue or leave
+        requests in the output buffer which the loop would not notice otherwise.
+        """
+        try:
+            os.write(self.wakeup_w, '\0')
+        except OSError, err:
+            # A full pipe means the loop has been woken up already.
+            if err.errno != errno.EAGAIN:
+                raise
+
     def get_skype(self):
         """Returns Skype window ID or None if Skype not running."""
         skype_inst = x11.XInternAtom(self.disp, '_SKYPE_INSTANCE', True)
@@ -333,14 +422,17 @@ class SkypeAPI(SkypeAPIBase):
         fail = x11.XGetWindowProperty(self.disp, self.win_root, skype_inst,
                             0, 1, False, 33, byref(type_ret), byref(format_ret),
                             byref(nitems_ret), byref(bytes_after_ret), byref(winp))
+        self.wakeup()
         if not fail and format_ret.value == 32 and nitems_ret.value == 1:
             return winp.contents.value
 
     def close(self):
         self.loop_break = True
-        self.loop_event.set()
+        self.wakeup()
         while self.isAlive():
             time.sleep(0.01)
+        os.close(self.wakeup_r)
+        os.close(self.wakeup_w)
         SkypeAPIBase.close(self)
 
     def set_friendly_name(self, friendly_name):
@@ -413,6 +505,7 @@ class SkypeAPI(SkypeAPIBase):
             skype_inst = x11.XInternAtom(self.disp, '_SKYPE_INSTANCE', True)
             if skype_inst:
                 x11.XDeleteProperty(self.disp, self.win_root, skype_inst)
+            self.wakeup()
             self.win_skype = None
             self.set_attachment_status(apiAttachNotAvailable)
 
@@ -426,40 +519,45 @@ class SkypeAPI(SkypeAPIBase):
         if command.Blocking:
             command._event = bevent = threading.Event()
         else:
-            command._timer = timer = threading.Timer(command.timeout2float(), self.pop_command, (command.Id,))
+            self.timeouts.schedule(command)
         event = XEvent()
         event.xclient.type = ClientMessage
         event.xclient.display = self.disp
         event.xclient.window = self.win_self
         event.xclient.message_type = self.atom_msg_begin
         event.xclient.format = 8
-        cmd = cmd.encode('utf-8') + '\x00'
-        for i in xrange(0, len(cmd), 20):
-            event.xclient.data = cmd[i:i + 20]
-            x11.XSendEvent(self.disp, self.win_skype, False, 0, byref(event))
-            event.xclient.message_type = self.atom_msg
-        self.loop_event.set()
+        chunks = encode_message(cmd)
+        pevent = byref(event)
+        # Queue all chunks under a single display lock and flush them at once.
+        x11.XLockDisplay(self.disp)
+        try:
+            for chunk in chunks:
+                event.xclient.data = chunk
+                x11.XSendEvent(self.disp, self.win_skype, False, 0, pevent)
+                event.xclient.message_type = self.atom_msg
+            x11.XFlush(self.disp)
+        finally:
+            x11.XUnlockDisplay(self.disp)
+        self.wakeup()
         if command.Blocking:
             bevent.wait(command.timeout2float())
             if not bevent.isSet():
                 raise SkypeAPIError('Skype command timeout')
-        else:
-            timer.start()
 
     def notify(self, cmd):
         self.logger.debug('received %s', repr(cmd))
         # Called by main loop for all received Skype commands.
-        if cmd.startswith(u'#'):
-            p = cmd.find(u' ')
-            command = self.pop_command(int(cmd[1:p]))
-            if command is not None:
-                command.Reply = cmd[p + 1:]
-                if command.Blocking:
-                    command._event.set()
-                else:
-                    command._timer.cancel()
-                self.notifier.reply_received(command)
+        message = parse(cmd)
+        command = None
+        if message.Id is not None:
+            command = self.pop_command(message.Id)
+        if command is not None:
+            command.Reply = message
+            if command.Blocking:
+                command._event.set()
             else:
-                self.notifier.notification_received(cmd[p + 1:])
+                self.timeouts.cancel(command)
+                self.complete_command(command)
+            self.notifier.reply_received(command)
         else:
-            self.notifier.notification_received(cmd)
+            self.notifier.notification_received(message)
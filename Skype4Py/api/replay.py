@@ -0,0 +1,142 @@
+"""
+Low level *traffic replay* interface.
+
+This module feeds a recording made with `Skype4Py.recorder.Recorder` back to Skype4Py.
+The recorded notifications are delivered by a thread started when Skype4Py attaches.
+Commands sent by the application are answered with the replies recorded for the same
+commands (the first recorded reply first, the last one is then repeated). Commands that
+were never recorded fail with the *Unknown command* error.
+
+This module handles the options that you can pass to `Skype.__init__` for Linux
+machines when the transport is set to *replay*:
+
+- ``Recording`` (str) - Path of the recording file. Required.
+
+- ``Speed`` (float) - Replay speed, 1.0 replays the notifications with the recorded
+  timing, 2.0 twice as fast and so on. Defaults to 0 in which case the notifications
+  are replayed as fast as possible.
+
+After all notifications are delivered the thread finishes, use ``join()`` on the API
+object to wait for it:
+
+.. python::
+
+    from Skype4Py.api.replay import SkypeAPI
+
+    api = SkypeAPI({'Recording': 'traffic.rec'})
+    skype = Skype4Py.Skype(Api=api)
+    skype.Attach()
+    api.join()
+"""
+__docformat__ = 'restructuredtext en'
+
+
+import threading
+import time
+import logging
+from collections import deque
+
+from Skype4Py.api import SkypeAPIBase, finalize_opts
+from Skype4Py.enums import *
+from Skype4Py.errors import SkypeAPIError
+from Skype4Py.recorder import read_recording
+
+
+__all__ = ['SkypeAPI']
+
+
+class SkypeAPI(SkypeAPIBase):
+    def __init__(self, opts):
+        self.logger = logging.getLogger('Skype4Py.api.replay.SkypeAPI')
+        SkypeAPIBase.__init__(self)
+        try:
+            path = opts.pop('Recording')
+        except KeyError:
+            raise TypeError('Recording option is required')
+        self.speed = float(opts.pop('Speed', 0.0))
+        finalize_opts(opts)
+        # List of (time, notification) tuples, times relative to the first record.
+        self.notifications = []
+        # Dictionary mapping command strings to queues of their replies.
+        self.replies = {}
+        commands = {}
+        start = None
+        for t, kind, data in read_recording(path):
+            if start is None:
+                start = t
+            if kind == 'N':
+                self.notifications.append((t - start, data))
+            elif kind == 'C':
+                id_, cmd = data.split(u' ', 1)
+                commands[id_] = cmd
+            elif kind == 'R':
+                id_, reply = data.split(u' ', 1)
+                cmd = commands.pop(id_, None)
+                if cmd is not None:
+                    self.replies.setdefault(cmd, deque()).append(reply)
+        self.stop = threading.Event()
+
+    def run(self):
+        self.logger.info('thread started')
+        start = time.time()
+        for t, notification in self.notifications:
+            if self.stop.isSet():
+                break
+            if self.speed > 0:
+                delay = start + t / self.speed - time.time()
+                if delay > 0:
+                    self.stop.wait(delay)
+                    if self.stop.isSet():
+                        break
+            self.notifier.notification_received(notification)
+        self.logger.info('thread finished')
+
+    def close(self):
+        self.stop.set()
+        if self.isAlive() and threading.currentThread() is not self:
+            self.join()
+        SkypeAPIBase.close(self)
+
+    def attach(self, timeout, wait=True):
+        if self.attachment_status == apiAttachSuccess:
+            return
+        self.acquire()
+        try:
+            if not self.isAlive():
+                try:
+                    self.start()
+                except (AssertionError, RuntimeError):
+                    raise SkypeAPIError('Skype API closed')
+            self.set_attachment_status(apiAttachSuccess)
+        finally:
+            self.release()
+
+    def is_running(self):
+        return True
+
+    def startup(self, minimized, nosplash):
+        pass
+
+    def shutdown(self):
+        self.set_attachment_status(apiAttachNotAvailable)
+
+    def send_command(self, command):
+        if self.attachment_status != apiAttachSuccess:
+            self.attach(command.Timeout)
+        self.push_command(command)
+        self.notifier.sending_command(command)
+        self.logger.debug('sending %s', repr(command.Command))
+        replies = self.replies.get(command.Command)
+        if replies:
+            if len(replies) > 1:
+                reply = replies.popleft()
+            else:
+                reply = replies[0]
+        else:
+            reply = u'ERROR 2 Unknown command'
+        self.logger.debug('received %s', repr(reply))
+        if self.pop_command(command.Id) is command:
+            command.Reply = reply
+            if not command.Blocking:
+                self.complete_command(command)
+            self.notifier.reply_received(command)
@@ -0,0 +1,752 @@
+"""
+Low level *Skype client simulator*.
+
+This module implements an in-process fake Skype client. It keeps a model of users,
+contact groups, chats, chat messages, calls and APP2APP applications, answers the
+``GET``, ``SET``, ``ALTER`` and ``SEARCH`` commands and emits notifications. It lets
+Skype4Py applications run without the Skype client, for example to benchmark them
+on a headless machine.
+
+This module handles the options that you can pass to `Skype.__init__` for Linux
+machines when the transport is set to *sim*:
+
+- ``Model`` (`SkypeModel`) - The simulated client state. If not given, a model with
+  ``Contacts`` synthetic contacts is created.
+
+- ``Contacts`` (int) - Number of synthetic contacts in the default model. Defaults
+  to 100.
+
+- ``Seed`` - Seed of the random number generator used by the default model.
+
+- ``Latency`` (float) - Number of seconds after which the replies and notifications
+  caused by a command are delivered. Defaults to 0 in which case they are delivered
+  before the command is sent.
+
+- ``NotificationRate`` (float) - Number of random notifications (contacts changing
+  their online status and incoming chat messages) emitted per second. Defaults to 0.
+
+The simulator does not depend on the platform, on other platforms it can be used by
+passing the API object directly:
+
+.. python::
+
+    from Skype4Py.api.sim import SkypeAPI
+
+    skype = Skype4Py.Skype(Api=SkypeAPI({'Contacts': 5000}))
+"""
+__docformat__ = 'restructuredtext en'
+
+
+import threading
+import time
+import heapq
+import random
+import logging
+
+from Skype4Py.api import Command, SkypeAPIBase, finalize_opts
+from Skype4Py.enums import *
+from Skype4Py.errors import SkypeAPIError
+from Skype4Py.protocol import parse
+from Skype4Py.utils import chop, split, cndexp
+
+
+__all__ = ['SkypeAPI', 'SkypeModel']
+
+
+# Properties holding lists which are separated with spaces instead of commas.
+SPACE_SEPARATED = ('MEMBERS', 'ACTIVEMEMBERS', 'POSTERS', 'APPLICANTS', 'ALIASES')
+
+# Online statuses the random notifications choose from.
+ONLINE_STATUSES = (olsOnline, olsAway, olsNotAvailable, olsDoNotDisturb, olsOffline)
+
+# Errors returned when a queried object does not exist.
+INVALID_OBJECT = {
+    'USER': (26, 'Invalid user handle'),
+    'CALL': (11, 'Invalid call id'),
+    'CHAT': (105, 'Invalid chat name'),
+    'CHATMESSAGE': (14, 'Invalid message id'),
+    'CHATMEMBER': (14, 'Invalid chatmember id'),
+    'GROUP': (541, 'Invalid group id'),
+    'APPLICATION': (541, 'Invalid application name'),
+}
+
+# Number of messages kept in the RECENTCHATMESSAGES chat property.
+RECENT_MESSAGES = 20
+
+
+class CommandError(Exception):
+    """Raised by the model if a command fails. Turned into an ``ERROR`` reply.
+    """
+
+    def __init__(self, code, text):
+        Exception.__init__(self, code, text)
+
+    def reply(self):
+        return u'ERROR %d %s' % self.args
+
+
+class SkypeModel(object):
+    """State of the simulated Skype client.
+
+    Objects are stored as dictionaries of property values keyed by the object type
+    and id. Values are unicode strings or lists which are joined when queried.
+    All methods are thread-safe.
+    """
+
+    def __init__(self, contacts=100, seed=None):
+        """Initializes the object.
+
+        :Parameters:
+          contacts : int
+            Number of synthetic contacts to create.
+          seed
+            Seed of the random number generator.
+        """
+        self.lock = threading.RLock()
+        self.random = random.Random(seed)
+        self.objects = {}
+        self.next_id = 100
+        self.current_user = 'skype4py.sim'
+        self.variables = {
+            'CURRENTUSERHANDLE': self.current_user,
+            'USERSTATUS': cusOnline,
+            'CONNSTATUS': conOnline,
+            'SKYPEVERSION': '2.2.0.35',
+            'MUTE': 'OFF',
+            'SILENT_MODE': 'OFF',
+            'AUTOAWAY': 'ON',
+            'WINDOWSTATE': 'NORMAL',
+            'PREDICTIVE_DIALER_COUNTRY': 'us',
+            'AUDIO_IN': '',
+            'AUDIO_OUT': '',
+            'RINGER': '',
+        }
+        self.profile = {
+            'FULLNAME': 'Skype4Py Simulator',
+            'PSTN_BALANCE': '0',
+            'PSTN_BALANCE_CURRENCY': 'EUR',
+        }
+        self.privileges = {
+            'SKYPEOUT': 'TRUE',
+            'SKYPEIN': 'FALSE',
+            'VOICEMAIL': 'FALSE',
+        }
+        self.friends = []
+        self.chats = []
+        self.messages = []
+        self.calls = []
+        self.groups = []
+        self.all_friends = self.add_group(grpAllFriends, 'All Contacts')
+        # The group shares the list of friends, add_user keeps NROFUSERS current.
+        self.get_object('GROUP', self.all_friends)['USERS'] = self.friends
+        for i in xrange(contacts):
+            self.add_user('user%d' % i)
+
+    def new_id(self):
+        self.next_id += 1
+        return self.next_id
+
+    def get_object(self, object_type, object_id):
+        try:
+            return self.objects[object_type, str(object_id)]
+        except KeyError:
+            code, text = INVALID_OBJECT.get(object_type, (7, 'GET: invalid WHAT'))
+            raise CommandError(code, text)
+
+    def format(self, prop_name, value):
+        if isinstance(value, list):
+            return cndexp(prop_name in SPACE_SEPARATED, u' ', u', ').join(map(unicode, value))
+        return unicode(value)
+
+    def add_user(self, handle, **props):
+        """Adds a contact.
+
+        :Parameters:
+          handle : str
+            Skypename of the user.
+          props
+            Property values overriding the defaults.
+        """
+        self.lock.acquire()
+        try:
+            user = {
+                'HANDLE': handle,
+                'FULLNAME': 'User %s' % handle,
+                'DISPLAYNAME': '',
+                'ONLINESTATUS': self.random.choice(ONLINE_STATUSES),
+                'BUDDYSTATUS': str(budFriend),
+                'ISAUTHORIZED': 'TRUE',
+                'ISBLOCKED': 'FALSE',
+                'MOOD_TEXT': '',
+                'RICH_MOOD_TEXT': '',
+                'LANGUAGE': 'en English',
+                'COUNTRY': 'us United States',
+                'CITY': '',
+                'LASTONLINETIMESTAMP': str(int(time.time())),
+                'TIMEZONE': '86400',
+            }
+            user.update(props)
+            self.objects['USER', handle] = user
+            self.friends.append(handle)
+            self.get_object('GROUP', self.all_friends)['NROFUSERS'] = len(self.friends)
+        finally:
+            self.lock.release()
+
+    def add_group(self, group_type, display_name, users=None):
+        """Adds a contact group.
+
+        :return: Group id.
+        :rtype: int
+        """
+        self.lock.acquire()
+        try:
+            group_id = self.new_id()
+            self.objects['GROUP', str(group_id)] = {
+                'TYPE': group_type,
+                'DISPLAYNAME': display_name,
+                'CUSTOM_GROUP_ID': str(group_id),
+                'USERS': list(users or []),
+                'NROFUSERS': len(users or []),
+                'VISIBLE': 'TRUE',
+                'EXPANDED': 'TRUE',
+            }
+            self.groups.append(group_id)
+            return group_id
+        finally:
+            self.lock.release()
+
+    def add_chat(self, members, topic=u''):
+        """Adds a chat with the current user and the given members.
+
+        :return: Chat name.
+        :rtype: str
+        """
+        self.lock.acquire()
+        try:
+            name = '#%s/$%x' % (self.current_user, self.new_id())
+            members = [self.current_user] + list(members)
+            self.objects['CHAT', name] = {
+                'NAME': name,
+                'TIMESTAMP': str(int(time.time())),
+                'ADDER': '',
+                'STATUS': cndexp(len(members) > 2, 'MULTI_SUBSCRIBED', 'DIALOG'),
+                'TYPE': cndexp(len(members) > 2, 'MULTICHAT', 'DIALOG'),
+                'TOPIC': topic,
+                'FRIENDLYNAME': topic or ', '.join(members[1:]),
+                'MEMBERS': members,
+                'ACTIVEMEMBERS': list(members),
+                'POSTERS': [],
+                'CHATMESSAGES': [],
+                'RECENTCHATMESSAGES': [],
+                'BOOKMARKED': 'FALSE',
+                'ACTIVITY_TIMESTAMP': str(int(time.time())),
+            }
+            self.chats.append(name)
+            return name
+        finally:
+            self.lock.release()
+
+    def add_message(self, chat, from_handle, body, status=cmsReceived):
+        """Adds a chat message.
+
+        :return: Message id.
+        :rtype: int
+        """
+        self.lock.acquire()
+        try:
+            obj = self.get_object('CHAT', chat)
+            message_id = self.new_id()
+            self.objects['CHATMESSAGE', str(message_id)] = {
+                'TIMESTAMP': str(int(time.time())),
+                'FROM_HANDLE': from_handle,
+                'FROM_DISPNAME': from_handle,
+                'TYPE': cmeSaid,
+                'STATUS': status,
+                'LEAVEREASON': '',
+                'CHATNAME': chat,
+                'USERS': '',
+                'IS_EDITABLE': 'FALSE',
+                'BODY': body,
+                'EDITED_BY': '',
+                'EDITED_TIMESTAMP': '0',
+                'SEEN': cndexp(status == cmsReceived, 'FALSE', 'TRUE'),
+            }
+            obj['CHATMESSAGES'].append(message_id)
+            recent = obj['RECENTCHATMESSAGES']
+            recent.append(message_id)
+            del recent[:-RECENT_MESSAGES]
+            if from_handle not in obj['POSTERS']:
+                obj['POSTERS'].append(from_handle)
+            obj['ACTIVITY_TIMESTAMP'] = str(int(time.time()))
+            self.messages.append(message_id)
+            return message_id
+        finally:
+            self.lock.release()
+
+    def add_call(self, partner, call_type=cltOutgoingP2P, status=clsUnplaced):
+        """Adds a call.
+
+        :return: Call id.
+        :rtype: int
+        """
+        self.lock.acquire()
+        try:
+            call_id = self.new_id()
+            self.objects['CALL', str(call_id)] = {
+                'TIMESTAMP': str(int(time.time())),
+                'PARTNER_HANDLE': partner,
+                'PARTNER_DISPNAME': partner,
+                'TARGET_IDENTITY': '',
+                'CONF_ID': '0',
+                'TYPE': call_type,
+                'STATUS': status,
+                'FAILUREREASON': '0',
+                'SUBJECT': '',
+                'PSTN_NUMBER': '',
+                'DURATION': '0',
+                'PSTN_STATUS': '',
+                'CONF_PARTICIPANTS_COUNT': '0',
+                'VM_DURATION': '0',
+                'VM_ALLOWED_DURATION': '0',
+                'SEEN': 'TRUE',
+            }
+            self.calls.append(call_id)
+            return call_id
+        finally:
+            self.lock.release()
+
+    def set_property(self, object_type, object_id, prop_name, value):
+        """Sets an object property.
+
+        :return: The notification reporting the change.
+        :rtype: unicode
+        """
+        self.lock.acquire()
+        try:
+            self.get_object(object_type, object_id)[prop_name] = value
+            return u'%s %s %s %s' % (object_type, object_id, prop_name,
+                                     self.format(prop_name, value))
+        finally:
+            self.lock.release()
+
+    def random_notification(self):
+        """Changes the model randomly, either a contact changes the online status or
+        a chat message is received.
+
+        :return: The notification reporting the change.
+        :rtype: unicode
+        """
+        self.lock.acquire()
+        try:
+            if self.chats and self.random.random() < 0.2:
+                chat = self.random.choice(self.chats)
+                members = self.objects['CHAT', chat]['MEMBERS']
+                message_id = self.add_message(chat, self.random.choice(members[1:] or members),
+                                              u'Message %d' % self.next_id)
+                return u'CHATMESSAGE %d STATUS %s' % (message_id, cmsReceived)
+            if not self.friends:
+                return u'CONNSTATUS %s' % self.variables['CONNSTATUS']
+            handle = self.random.choice(self.friends)
+            return self.set_property('USER', handle, 'ONLINESTATUS',
+                                     self.random.choice(ONLINE_STATUSES))
+        finally:
+            self.lock.release()
+
+    def execute(self, cmd):
+        """Executes a command.
+
+        :Parameters:
+          cmd : unicode
+            Command string without the ``#id`` prefix.
+
+        :return: The reply and a list of notifications caused by the command.
+        :rtype: tuple(unicode, list of unicode)
+        """
+        self.lock.acquire()
+        try:
+            verb, args = chop(cmd.strip() or u'?')
+            notifications = []
+            try:
+                handler = getattr(self, 'cmd_%s' % str(verb.lower()), None)
+                if handler is None:
+                    raise CommandError(2, 'Unknown command')
+                reply = handler(args, notifications)
+            except CommandError, err:
+                return err.reply(), []
+            except (ValueError, KeyError):
+                return CommandError(7, 'Invalid command arguments').reply(), []
+            return reply, notifications
+        finally:
+            self.lock.release()
+
+    def cmd_name(self, args, notifications):
+        return u'OK'
+
+    def cmd_ping(self, args, notifications):
+        return u'PONG'
+
+    def cmd_protocol(self, args, notifications):
+        return u'PROTOCOL %d' % min(int(args), 8)
+
+    def cmd_get(self, args, notifications):
+        what, rest = chop(args)
+        what = what.upper()
+        if what in self.variables:
+            return u'%s %s' % (what, self.variables[what])
+        if what == 'PROFILE':
+            return u'PROFILE %s %s' % (rest, self.profile.get(rest, u''))
+        if what == 'PRIVILEGE':
+            return u'PRIVILEGE %s %s' % (rest, self.privileges.get(rest, u'FALSE'))
+        object_id, prop_name = chop(rest)
+        obj = self.get_object(what, object_id)
+        prop_name = prop_name.upper()
+        if what == 'USER' and prop_name.startswith('AVATAR'):
+            return u'USER %s %s' % (object_id, prop_name)
+        return u'%s %s %s %s' % (what, object_id, prop_name,
+                                 self.format(prop_name, obj.get(prop_name, u'')))
+
+    def cmd_set(self, args, notifications):
+        what, rest = chop(args)
+        what = what.upper()
+        if what in self.variables:
+            self.variables[what] = rest
+            reply = u'%s %s' % (what, rest)
+        elif what == 'PROFILE':
+            prop_name, value = chop(rest)
+            self.profile[prop_name] = value
+            reply = u'PROFILE %s %s' % (prop_name, value)
+        elif what == 'CHATMESSAGE' and rest.upper().endswith(' SEEN'):
+            message_id = chop(rest)[0]
+            self.set_property(what, message_id, 'SEEN', 'TRUE')
+            reply = self.set_property(what, message_id, 'STATUS', cmsRead)
+        else:
+            object_id, prop_name, value = chop(rest, 2)
+            reply = self.set_property(what, object_id, prop_name.upper(), value)
+        notifications.append(reply)
+        return reply
+
+    def cmd_alter(self, args, notifications):
+        what, object_id, action = chop(args, 2)
+        action, action_args = chop(action)
+        what, action = what.upper(), action.upper()
+        obj = self.get_object(what, object_id)
+        reply = u'ALTER %s' % args
+        if what == 'CHAT':
+            # ALTER CHAT replies do not include the chat name.
+            reply = u'ALTER CHAT %s' % chop(args, 2)[2]
+            if action == 'SETTOPIC':
+                notifications.append(self.set_property(what, object_id, 'TOPIC', action_args))
+            elif action == 'ADDMEMBERS':
+                obj['MEMBERS'].extend(x for x in split(action_args, ', ') if x not in obj['MEMBERS'])
+                notifications.append(self.set_property(what, object_id, 'MEMBERS', obj['MEMBERS']))
+            elif action in ('BOOKMARK', 'UNBOOKMARK'):
+                notifications.append(self.set_property(what, object_id, 'BOOKMARKED',
+                                                       cndexp(action == 'BOOKMARK', 'TRUE', 'FALSE')))
+            elif action == 'LEAVE':
+                notifications.append(self.set_property(what, object_id, 'STATUS', 'UNSUBSCRIBED'))
+        elif what == 'CALL':
+            status = {'ANSWER': clsInProgress, 'RESUME': clsInProgress,
+                      'HOLD': clsLocalHold, 'END': clsFinished}.get(action)
+            if status is not None:
+                notifications.append(self.set_property(what, object_id, 'STATUS', status))
+        elif what == 'GROUP':
+            users = obj['USERS']
+            if action == 'ADDUSER' and action_args not in users:
+                users.append(action_args)
+            elif action == 'REMOVEUSER' and action_args in users:
+                users.remove(action_args)
+            else:
+                return reply
+            notifications.append(self.set_property(what, object_id, 'USERS', users))
+            notifications.append(self.set_property(what, object_id, 'NROFUSERS', len(users)))
+        elif what == 'APPLICATION':
+            return self.alter_application(object_id, obj, action, action_args, reply,
+                                          notifications)
+        return reply
+
+    def alter_application(self, name, obj, action, args, reply, notifications):
+        # The other side of every stream is simulated as a loopback peer which
+        # sends back everything it receives.
+        if action == 'CONNECT':
+            obj['COUNTER'] = obj.get('COUNTER', 0) + 1
+            stream = u'%s:%d' % (args, obj['COUNTER'])
+            notifications.append(self.set_property('APPLICATION', name, 'CONNECTING', args))
+            notifications.append(self.set_property('APPLICATION', name, 'CONNECTING', u''))
+            obj['STREAMS'].append(stream)
+            notifications.append(self.set_property('APPLICATION', name, 'STREAMS', obj['STREAMS']))
+        elif action == 'DISCONNECT':
+            if args in obj['STREAMS']:
+                obj['STREAMS'].remove(args)
+            notifications.append(self.set_property('APPLICATION', name, 'STREAMS', obj['STREAMS']))
+        elif action == 'WRITE':
+            stream, data = chop(args)
+            obj['BUFFERS'][stream] = obj['BUFFERS'].get(stream, u'') + data
+            notifications.append(self.set_property('APPLICATION', name, 'RECEIVED',
+                                 u'%s=%d' % (stream, len(obj['BUFFERS'][stream]))))
+        elif action == 'READ':
+            data = obj['BUFFERS'].pop(args, u'')
+            notifications.append(self.set_property('APPLICATION', name, 'RECEIVED', u''))
+            return u'%s %s' % (reply, data)
+        elif action == 'DATAGRAM':
+            stream, data = chop(args)
+            notifications.append(u'APPLICATION %s DATAGRAM %s %s' % (name, stream, data))
+        return reply
+
+    def cmd_search(self, args, notifications):
+        what, target = chop(args)
+        what = what.upper()
+        if what == 'FRIENDS':
+            return u'USERS %s' % u', '.join(self.friends)
+        if what == 'USERS':
+            target = target.lower()
+            return u'USERS %s' % u', '.join(x for x in self.friends
+                if target in x.lower() or target in self.objects['USER', x]['FULLNAME'].lower())
+        if what == 'USERSWAITINGMYAUTHORIZATION':
+            return u'USERS '
+        if what in ('CHATS', 'ACTIVECHATS', 'RECENTCHATS', 'MISSEDCHATS', 'BOOKMARKEDCHATS'):
+            chats = self.chats
+            if what == 'BOOKMARKEDCHATS':
+                chats = [x for x in chats if self.objects['CHAT', x]['BOOKMARKED'] == 'TRUE']
+            elif what == 'MISSEDCHATS':
+                chats = [x for x in chats if self.missed_messages(x)]
+            return u'CHATS %s' % u', '.join(chats)
+        if what == 'CHATMESSAGES':
+            messages = self.messages
+            if target:
+                messages = [x for x in messages if target in
+                            self.objects['CHAT', self.objects['CHATMESSAGE', str(x)]['CHATNAME']]['MEMBERS']]
+            return u'CHATMESSAGES %s' % u', '.join(map(unicode, messages))
+        if what == 'MISSEDCHATMESSAGES':
+            return u'CHATMESSAGES %s' % u', '.join(map(unicode, self.missed_messages()))
+        if what in ('CALLS', 'ACTIVECALLS', 'MISSEDCALLS'):
+            calls = self.calls
+            if what == 'ACTIVECALLS':
+                calls = [x for x in calls if self.objects['CALL', str(x)]['STATUS'] in
+                         (clsRouting, clsRinging, clsInProgress, clsLocalHold, clsOnHold)]
+            elif what == 'MISSEDCALLS':
+                calls = [x for x in calls if self.objects['CALL', str(x)]['STATUS'] == clsMissed]
+            elif target:
+                calls = [x for x in calls if self.objects['CALL', str(x)]['PARTNER_HANDLE'] == target]
+            return u'CALLS %s' % u', '.join(map(unicode, calls))
+        if what == 'GROUPS':
+            groups = self.groups
+            target = target.upper()
+            if target == 'CUSTOM':
+                groups = [x for x in groups if self.objects['GROUP', str(x)]['TYPE'] == grpCustomGroup]
+            elif target == 'HARDWIRED':
+                groups = [x for x in groups if self.objects['GROUP', str(x)]['TYPE'] != grpCustomGroup]
+            return u'GROUPS %s' % u', '.join(map(unicode, groups))
+        if what in ('VOICEMAILS', 'MISSEDVOICEMAILS'):
+            return u'VOICEMAILS '
+        if what in ('SMSS', 'MISSEDSMSS'):
+            return u'SMSS '
+        if what in ('FILETRANSFERS', 'ACTIVEFILETRANSFERS'):
+            return u'FILETRANSFERS '
+        raise CommandError(7, 'SEARCH: invalid WHAT')
+
+    def missed_messages(self, chat=None):
+        if chat is None:
+            messages = self.messages
+        else:
+            messages = self.objects['CHAT', chat]['CHATMESSAGES']
+        return [x for x in messages if self.objects['CHATMESSAGE', str(x)]['STATUS'] == cmsReceived]
+
+    def cmd_chat(self, args, notifications):
+        action, rest = chop(args)
+        if action.upper() != 'CREATE':
+            raise CommandError(2, 'Unknown command')
+        name = self.add_chat(split(rest, ', '))
+        return u'CHAT %s STATUS %s' % (name, self.objects['CHAT', name]['STATUS'])
+
+    def cmd_chatmessage(self, args, notifications):
+        chat, body = chop(args)
+        message_id = self.add_message(chat, self.current_user, body, cmsSending)
+        notifications.append(self.set_property('CHATMESSAGE', message_id, 'STATUS', cmsSent))
+        return u'CHATMESSAGE %d STATUS %s' % (message_id, cmsSending)
+
+    def cmd_call(self, args, notifications):
+        call_id = self.add_call(split(args, ', ')[0])
+        for status in (clsRouting, clsRinging, clsInProgress):
+            notifications.append(self.set_property('CALL', call_id, 'STATUS', status))
+        return u'CALL %d STATUS %s' % (call_id, clsUnplaced)
+
+    def cmd_create(self, args, notifications):
+        what, name = chop(args)
+        what = what.upper()
+        if what == 'APPLICATION':
+            self.objects['APPLICATION', name] = {
+                'CONNECTABLE': u'',
+                'CONNECTING': u'',
+                'STREAMS': [],
+                'SENDING': u'',
+                'RECEIVED': u'',
+                'BUFFERS': {},
+            }
+        elif what == 'GROUP':
+            group_id = self.add_group(grpCustomGroup, name)
+            notifications.append(u'GROUP %d NROFUSERS 0' % group_id)
+        else:
+            raise CommandError(2, 'Unknown command')
+        return u'CREATE %s' % args
+
+    def cmd_delete(self, args, notifications):
+        what, name = chop(args)
+        what = what.upper()
+        self.get_object(what, name)
+        if what == 'APPLICATION':
+            del self.objects[what, name]
+        elif what == 'GROUP':
+            del self.objects[what, name]
+            self.groups.remove(int(name))
+            notifications.append(u'DELETED GROUP %s' % name)
+        else:
+            raise CommandError(2, 'Unknown command')
+        return u'DELETE %s' % args
+
+
+class SkypeAPI(SkypeAPIBase):
+    def __init__(self, opts):
+        self.logger = logging.getLogger('Skype4Py.api.sim.SkypeAPI')
+        SkypeAPIBase.__init__(self)
+        self.model = opts.pop('Model', None)
+        contacts = opts.pop('Contacts', 100)
+        seed = opts.pop('Seed', None)
+        self.latency = float(opts.pop('Latency', 0.0))
+        self.notification_rate = float(opts.pop('NotificationRate', 0.0))
+        finalize_opts(opts)
+        if self.model is None:
+            self.model = SkypeModel(contacts, seed)
+        # Heap of (time, sequence number, message) tuples delivered by the thread.
+        self.queue = []
+        self.seq = 0
+        self.cond = threading.Condition(threading.Lock())
+        self.loop_break = False
+
+    def run(self):
+        self.logger.info('thread started')
+        next_notification = time.time()
+        while True:
+            self.cond.acquire()
+            try:
+                message = None
+                while not self.loop_break:
+                    now = time.time()
+                    if self.queue and self.queue[0][0] <= now:
+                        message = heapq.heappop(self.queue)[2]
+                        break
+                    if self.notification_rate > 0:
+                        if next_notification <= now:
+                            break
+                        deadline = next_notification
+                        if self.queue:
+                            deadline = min(deadline, self.queue[0][0])
+                        self.cond.wait(deadline - now)
+                    elif self.queue:
+                        self.cond.wait(self.queue[0][0] - now)
+                    else:
+                        self.cond.wait()
+                if self.loop_break:
+                    break
+            finally:
+                self.cond.release()
+            if message is None:
+                next_notification += 1.0 / self.notification_rate
+                message = self.model.random_notification()
+            self.notify(message)
+        self.logger.info('thread finished')
+
+    def post(self, messages, delay):
+        """Queues messages to be delivered by the thread after a delay.
+
+        :Parameters:
+          messages : list of unicode
+            Messages to deliver.
+          delay : float
+            Delay in seconds.
+        """
+        self.cond.acquire()
+        try:
+            due = time.time() + delay
+            for message in messages:
+                heapq.heappush(self.queue, (due, self.seq, message))
+                self.seq += 1
+            self.cond.notify()
+        finally:
+            self.cond.release()
+
+    def close(self):
+        self.cond.acquire()
+        try:
+            self.loop_break = True
+            self.cond.notify()
+        finally:
+            self.cond.release()
+        while self.isAlive():
+            time.sleep(0.01)
+        SkypeAPIBase.close(self)
+
+    def attach(self, timeout, wait=True):
+        if self.attachment_status == apiAttachSuccess:
+            return
+        self.acquire()
+        try:
+            if not self.isAlive():
+                try:
+                    self.start()
+                except (AssertionError, RuntimeError):
+                    raise SkypeAPIError('Skype API closed')
+            self.set_attachment_status(apiAttachSuccess)
+        finally:
+            self.release()
+        command = Command('PROTOCOL %s' % self.protocol, Blocking=True)
+        self.send_command(command)
+        self.protocol = int(command.Reply.rsplit(None, 1)[-1])
+
+    def is_running(self):
+        return True
+
+    def startup(self, minimized, nosplash):
+        pass
+
+    def shutdown(self):
+        self.set_attachment_status(apiAttachNotAvailable)
+
+    def send_command(self, command):
+        if self.attachment_status != apiAttachSuccess:
+            self.attach(command.Timeout)
+        self.push_command(command)
+        self.notifier.sending_command(command)
+        cmd = u'#%d %s' % (command.Id, command.Command)
+        self.logger.debug('sending %s', repr(cmd))
+        if command.Blocking:
+            command._event = event = threading.Event()
+        else:
+            self.timeouts.schedule(command)
+        reply, notifications = self.model.execute(command.Command)
+        messages = [u'#%d %s' % (command.Id, reply)] + notifications
+        if self.latency > 0:
+            self.post(messages, self.latency)
+        else:
+            for message in messages:
+                self.notify(message)
+        if command.Blocking:
+            event.wait(command.timeout2float())
+            if not event.isSet():
+                raise SkypeAPIError('Skype command timeout')
+
+    def notify(self, cmd):
+        self.logger.debug('received %s', repr(cmd))
+        message = parse(cmd)
+        command = None
+        if message.Id is not None:
+            command = self.pop_command(message.Id)
+        if command is not None:
+            command.Reply = message
+            if command.Blocking:
+                command._event.set()
+            else:
+                self.timeouts.cancel(command)
+                self.complete_command(command)
+            self.notifier.reply_received(command)
+        else:
+            self.notifier.notification_received(message)
@@ -21,6 +21,7 @@ from Skype4Py.api import Command, SkypeAPIBase, \
                          DEFAULT_TIMEOUT
 from Skype4Py.enums import *
 from Skype4Py.errors import SkypeAPIError
+from Skype4Py.protocol import parse
 
 
 __all__ = ['SkypeAPI']
@@ -285,20 +286,20 @@ class SkypeAPI(SkypeAPIBase):
             cmd8 = copydata.lpData[:copydata.cbData - 1]
             cmd = cmd8.decode('utf-8')
             self.logger.debug('received %s', repr(cmd))
-            if cmd.startswith(u'#'):
-                p = cmd.find(u' ')
-                command = self.pop_command(int(cmd[1:p]))
-                if command is not None:
-                    command.Reply = cmd[p + 1:]
-                    if command.Blocking:
-                        command._event.set()
-                    else:
-                        command._timer.cancel()
-                    self.notifier.reply_received(command)
+            message = parse(cmd)
+            command = None
+            if message.Id is not None:
+                command = self.pop_command(message.Id)
+            if command is not None:
+                command.Reply = message
+                if command.Blocking:
+                    command._event.set()
                 else:
-                    self.notifier.notification_received(cmd[p + 1:])
+                    self.timeouts.cancel(command)
+                    self.complete_command(command)
+                self.notifier.reply_received(command)
             else:
-                self.notifier.notification_received(cmd)
+                self.notifier.notification_received(message)
             return 1
         elif umsg == apiAttachAvailable:
             self.logger.debug('received apiAttachAvailable')
@@ -319,7 +320,7 @@ class SkypeAPI(SkypeAPIBase):
             if command.Blocking:
                 command._event = event = threading.Event()
             else:
-                command._timer = timer = threading.Timer(command.timeout2float(), self.pop_command, (command.Id,))
+                self.timeouts.schedule(command)
             self.logger.debug('sending %s', repr(cmd))
             fhwnd = self.get_foreground_window()
             try:
@@ -330,12 +331,11 @@ class SkypeAPI(SkypeAPIBase):
                         event.wait(command.timeout2float())
                         if not event.isSet():
                             raise SkypeAPIError('Skype command timeout')
-                    else:
-                        timer.start()
                     break
                 else:
                     # SendMessage failed
                     self.pop_command(command.Id)
+                    self.timeouts.cancel(command)
                     self.skype = None
                     # let the loop go back and try to reattach but only once
             finally:
@@ -13,6 +13,7 @@ class Application(Cached):
     """Represents an application in APP2APP protocol. Use `skype.Skype.Application` to instantiate.
     """
     _ValidateHandle = staticmethod(tounicode)
+    _ObjectType = 'APPLICATION'
 
     def __repr__(self):
         return Cached.__repr__(self, 'Name')
@@ -0,0 +1,610 @@
+"""Property value cache.
+"""
+__docformat__ = 'restructuredtext en'
+
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+__all__ = ['PropertyCache', 'CachePolicy', 'CACHE_NEVER', 'CACHE_UNTIL_NOTIFIED']
+
+
+# Marks arguments which were not given.
+DEFAULT = object()
+
+# Policy of properties which are always queried from the client.
+CACHE_NEVER = 0
+
+# Policy of properties which are cached until the client notifies about a change.
+CACHE_UNTIL_NOTIFIED = None
+
+# Properties which change without notifications or whose values are too large
+# or too short lived to be worth caching.
+DEFAULT_POLICIES = {
+    ('CALL', 'DURATION'): CACHE_NEVER,
+    ('CALL', 'CAPTURE_MIC'): CACHE_NEVER,
+    ('CALL', 'INPUT'): CACHE_NEVER,
+    ('CALL', 'OUTPUT'): CACHE_NEVER,
+    ('VOICEMAIL', 'CAPTURE_MIC'): CACHE_NEVER,
+    ('VOICEMAIL', 'INPUT'): CACHE_NEVER,
+    ('VOICEMAIL', 'OUTPUT'): CACHE_NEVER,
+    ('CHAT', 'ACTIVEMEMBERS'): CACHE_NEVER,
+    ('CHAT', 'CHATMESSAGES'): CACHE_NEVER,
+    ('CHAT', 'RECENTCHATMESSAGES'): CACHE_NEVER,
+    ('CHAT', 'MEMBERS'): CACHE_UNTIL_NOTIFIED,
+    ('GROUP', 'USERS'): CACHE_NEVER,
+    ('SMS', 'CHUNKING'): CACHE_NEVER,
+    ('SILENT_MODE', ''): CACHE_NEVER,
+}
+
+
+class Entry(object):
+    """A cached value with an expiration time or a size. Values without either are
+    stored in the cache directly.
+    """
+
+    __slots__ = ('value', 'expires', 'size')
+
+    def __init__(self, value, expires, size):
+        self.value = value
+        self.expires = expires
+        self.size = size
+
+
+class PropertyCache(object):
+    """Cache of the Skype object properties used by `Skype`, see `Skype.PropertyCache`.
+
+    Maps (object type, object id, property name) keys to property values. By default the
+    cache is unbounded and entries never expire, like a dictionary. The size of the cache
+    can be limited in which case the least recently used entries are evicted when the
+    limit is exceeded. Entries can also be given a time to live after which they are
+    treated as missing.
+
+    The keys are indexed by object type and object id so that the values of a single
+    object or of all objects of a type can be removed without scanning the whole cache,
+    see `invalidate`. The keys of the same object share the type and id strings.
+
+    The values can be saved to a file and loaded by another process to avoid querying
+    them from the client again, see `save` and `load`. Loaded values are tentative until
+    they are replaced by a notification or confirmed, see `confirm`.
+
+    The cache counts hits, misses, evictions and expirations, see `stats`. All methods
+    are thread-safe.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None):
+        """Initializes the object.
+
+        :Parameters:
+          max_entries : int or None
+            Maximum number of entries.
+          max_bytes : int or None
+            Maximum total size of the cached values in bytes as reported by
+            ``sys.getsizeof``. The size of the keys is not counted.
+          ttl : float or None
+            Default number of seconds after which the entries expire. None if they
+            never expire.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bytes = 0
+        # Maps object types to dictionaries mapping object ids to lists of keys.
+        # Lists take less memory than sets and objects have few properties.
+        self.index = {}
+        # Maps the keys of tentative values to the times they were saved at.
+        self.tentative = {}
+        # Maps the keys of the updates in progress to their numbers and the keys
+        # changed meanwhile to the last token issued before the change, see
+        # begin_update.
+        self.updating = {}
+        self.changed = {}
+        self.last_token = 0
+        self.lru = max_entries is not None or max_bytes is not None
+        if self.lru:
+            self.data = OrderedDict()
+        else:
+            self.data = {}
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        entry = self.data.get(key, DEFAULT)
+        if entry is DEFAULT:
+            return False
+        return entry.__class__ is not Entry or entry.expires is None or entry.expires > time.time()
+
+    def __getitem__(self, key):
+        value = self.get(key, DEFAULT)
+        if value is DEFAULT:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if self.pop(key, DEFAULT) is DEFAULT:
+            raise KeyError(key)
+
+    def _index(self, key):
+        # Returns the key to store, made of the type and id objects of the keys
+        # already stored for the same object so that they are shared.
+        if key.__class__ is tuple:
+            objects = self.index.get(key[0])
+            if objects is None:
+                objects = self.index[key[0]] = {}
+            keys = objects.get(key[1])
+            if keys is None:
+                keys = objects[key[1]] = []
+            else:
+                other = keys[0]
+                key = (other[0], other[1]) + key[2:]
+            keys.append(key)
+        return key
+
+    def _unindex(self, key):
+        if key.__class__ is tuple:
+            objects = self.index[key[0]]
+            keys = objects[key[1]]
+            keys.remove(key)
+            if not keys:
+                del objects[key[1]]
+                if not objects:
+                    del self.index[key[0]]
+
+    def _remove(self, key):
+        entry = self.data.pop(key)
+        if entry.__class__ is Entry:
+            self.bytes -= entry.size
+        self._unindex(key)
+        if self.tentative:
+            self.tentative.pop(key, None)
+        return entry
+
+    def get(self, key, default=None):
+        """Returns a cached value.
+
+        :Parameters:
+          key : tuple
+            (object type, object id, property name) tuple.
+          default
+            Returned if the value isn't cached or has expired.
+
+        :return: The cached value or default.
+        """
+        self.lock.acquire()
+        try:
+            try:
+                entry = self.data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if entry.__class__ is Entry:
+                if entry.expires is not None and entry.expires <= time.time():
+                    self._remove(key)
+                    self.expirations += 1
+                    self.misses += 1
+                    return default
+                value = entry.value
+            else:
+                value = entry
+            if self.lru:
+                # Move the entry to the end of the eviction order.
+                del self.data[key]
+                self.data[key] = entry
+            self.hits += 1
+            return value
+        finally:
+            self.lock.release()
+
+    def set(self, key, value, ttl=DEFAULT, token=None):
+        """Caches a value.
+
+        :Parameters:
+          key : tuple
+            (object type, object id, property name) tuple.
+          value
+            Value to cache.
+          ttl : float or None
+            Number of seconds after which the entry expires, None if it never expires.
+            Defaults to the ``ttl`` given to the constructor.
+          token : int or None
+            If given, the value is the result of the update started by `begin_update`
+            which returned the token. The value isn't cached if the key was set without
+            a token (by a notification) after the update was started, it would be older.
+
+        :return: True if the value was cached, False if it was older than the cached one.
+        :rtype: bool
+        """
+        entry, size = self._entry(value, ttl)
+        self.lock.acquire()
+        try:
+            if self.updating:
+                if token is None:
+                    if key in self.updating:
+                        self.changed[key] = self.last_token
+                elif self.changed.get(key, 0) >= token:
+                    return False
+            self._store(key, entry, size)
+            return True
+        finally:
+            self.lock.release()
+
+    def _entry(self, value, ttl):
+        # Returns the object stored in self.data for a value and its size.
+        if ttl is DEFAULT:
+            ttl = self.ttl
+        size = 0
+        if self.max_bytes is not None:
+            size = sys.getsizeof(value)
+        if ttl is None and not size:
+            return value, size
+        elif ttl is None:
+            return Entry(value, None, size), size
+        return Entry(value, time.time() + ttl, size), size
+
+    def _store(self, key, entry, size):
+        # Stores an entry made by _entry and evicts the old ones. Called with the lock held.
+        old = self.data.get(key, DEFAULT)
+        if old is DEFAULT:
+            key = self._index(key)
+        else:
+            if old.__class__ is Entry:
+                self.bytes -= old.size
+            if self.lru:
+                del self.data[key]
+            if self.tentative:
+                self.tentative.pop(key, None)
+        self.data[key] = entry
+        self.bytes += size
+        if self.lru:
+            while (self.max_entries is not None and len(self.data) > self.max_entries) or \
+                  (self.max_bytes is not None and self.bytes > self.max_bytes and len(self.data) > 1):
+                key, entry = self.data.popitem(last=False)
+                if entry.__class__ is Entry:
+                    self.bytes -= entry.size
+                self._unindex(key)
+                if self.tentative:
+                    self.tentative.pop(key, None)
+                self.evictions += 1
+
+    def begin_update(self, key):
+        """Registers an update of a value, for example a command setting it, whose
+        result is cached when the reply arrives. Pass the returned token to `set` and
+        call `end_update` when the update is finished, whether it succeeded or not.
+
+        :Parameters:
+          key : tuple
+            (object type, object id, property name) tuple.
+
+        :return: Update token.
+        :rtype: int
+        """
+        self.lock.acquire()
+        try:
+            self.last_token += 1
+            self.updating[key] = self.updating.get(key, 0) + 1
+            return self.last_token
+        finally:
+            self.lock.release()
+
+    def end_update(self, key, token):
+        """Unregisters an update registered by `begin_update`.
+
+        :Parameters:
+          key : tuple
+            (object type, object id, property name) tuple.
+          token : int
+            Token returned by `begin_update`.
+        """
+        self.lock.acquire()
+        try:
+            count = self.updating.pop(key, 0) - 1
+            if count > 0:
+                self.updating[key] = count
+            else:
+                self.changed.pop(key, None)
+        finally:
+            self.lock.release()
+
+    def pop(self, key, default=None):
+        """Removes a value from the cache.
+
+        :Parameters:
+          key : tuple
+            (object type, object id, property name) tuple.
+          default
+            Returned if the value isn't cached.
+
+        :return: The removed value or default.
+        """
+        self.lock.acquire()
+        try:
+            if key not in self.data:
+                return default
+            entry = self._remove(key)
+            if entry.__class__ is Entry:
+                return entry.value
+            return entry
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        """Removes all values from the cache. The counters are not reset.
+        """
+        self.lock.acquire()
+        try:
+            self.data.clear()
+            self.index.clear()
+            self.tentative.clear()
+            self.bytes = 0
+        finally:
+            self.lock.release()
+
+    def invalidate(self, object_type, object_id=None, prop_name=None):
+        """Removes the values of all objects of a type, of a single object or a single
+        property. Takes time proportional to the number of removed values.
+
+        :Parameters:
+          object_type : str
+            Object type.
+          object_id : str or None
+            Object id. If None, the values of all objects of the type are removed.
+          prop_name : str or None
+            Property name. If None, all values of the object are removed.
+
+        :return: Number of removed values.
+        :rtype: int
+        """
+        self.lock.acquire()
+        try:
+            objects = self.index.get(object_type, {})
+            if object_id is None:
+                keys = [key for keys in objects.itervalues() for key in keys]
+            elif prop_name is None:
+                keys = list(objects.get(object_id, ()))
+            else:
+                keys = [(object_type, object_id, prop_name)]
+                if keys[0] not in self.data:
+                    return 0
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+        finally:
+            self.lock.release()
+
+    def invalidate_prefix(self, object_type, prefix):
+        """Removes the values of all objects of a type whose ids start with a prefix.
+        Takes time proportional to the number of objects of the type.
+
+        :Parameters:
+          object_type : str
+            Object type.
+          prefix : str
+            Object id prefix, for example ``'#echo123/'`` to remove the values of all
+            chats created by echo123.
+
+        :return: Number of removed values.
+        :rtype: int
+        """
+        self.lock.acquire()
+        try:
+            objects = self.index.get(object_type, {})
+            keys = [key for object_id, keys in objects.iteritems()
+                    if object_id.startswith(prefix) for key in keys]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+        finally:
+            self.lock.release()
+
+    def keys(self):
+        """Returns the keys of the cached values, including the expired ones not
+        removed yet.
+
+        :rtype: list of tuple
+        """
+        self.lock.acquire()
+        try:
+            return self.data.keys()
+        finally:
+            self.lock.release()
+
+    def purge(self):
+        """Removes the expired entries.
+
+        :return: Number of removed entries.
+        :rtype: int
+        """
+        now = time.time()
+        self.lock.acquire()
+        try:
+            expired = [key for key, entry in self.data.iteritems()
+                       if entry.__class__ is Entry and entry.expires is not None and entry.expires <= now]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+            return len(expired)
+        finally:
+            self.lock.release()
+
+    def confirm(self, key):
+        """Marks a value loaded by `load` as confirmed.
+
+        :Parameters:
+          key : tuple
+            (object type, object id, property name) tuple.
+
+        :return: True if the value was tentative, False otherwise.
+        :rtype: bool
+        """
+        return self.tentative.pop(key, None) is not None
+
+    def save(self, path):
+        """Saves the cached values to an sqlite database. Expired values and keys other
+        than (object type, object id, property name) tuples are skipped. Existing contents
+        of the database are replaced.
+
+        Values are saved with the time they were saved at, tentative values keep the
+        time they were originally saved at.
+
+        :Parameters:
+          path : str
+            Path to the database file.
+
+        :return: Number of saved values.
+        :rtype: int
+        """
+        import sqlite3
+        now = time.time()
+        self.lock.acquire()
+        try:
+            rows = []
+            for key, entry in self.data.iteritems():
+                if key.__class__ is not tuple:
+                    continue
+                if entry.__class__ is Entry:
+                    if entry.expires is not None and entry.expires <= now:
+                        continue
+                    value, expires = entry.value, entry.expires
+                else:
+                    value, expires = entry, None
+                rows.append(key + (value, self.tentative.get(key, now), expires))
+        finally:
+            self.lock.release()
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute('CREATE TABLE IF NOT EXISTS properties (object_type TEXT, object_id TEXT, '
+                         'prop_name TEXT, value TEXT, saved REAL, expires REAL, '
+                         'PRIMARY KEY (object_type, object_id, prop_name))')
+            conn.execute('DELETE FROM properties')
+            conn.executemany('INSERT INTO properties VALUES (?, ?, ?, ?, ?, ?)', rows)
+            conn.commit()
+        finally:
+            conn.close()
+        return len(rows)
+
+    def load(self, path, max_age=None):
+        """Loads values saved by `save`. The values are cached as tentative. Values which
+        are already cached, have expired or are too old are skipped.
+
+        :Parameters:
+          path : str
+            Path to the database file. Nothing is loaded if it doesn't exist.
+          max_age : float or None
+            Maximal age of the loaded values in seconds. None if the age doesn't matter.
+
+        :return: Number of loaded values.
+        :rtype: int
+        """
+        import sqlite3
+        if not os.path.exists(path):
+            return 0
+        conn = sqlite3.connect(path)
+        try:
+            rows = conn.execute('SELECT object_type, object_id, prop_name, value, saved, expires '
+                                'FROM properties').fetchall()
+        finally:
+            conn.close()
+        now = time.time()
+        count = 0
+        for object_type, object_id, prop_name, value, saved, expires in rows:
+            if max_age is not None and saved < now - max_age:
+                continue
+            if expires is None:
+                # Saved without an expiration time, keep it that way.
+                ttl = None
+            elif expires > now:
+                ttl = expires - now
+            else:
+                continue
+            # Keys are str elsewhere, Python 2 sqlite returns unicode.
+            key = (str(object_type), object_id, str(prop_name))
+            entry, size = self._entry(value, ttl)
+            # A value cached by another thread in the meantime is newer, the check
+            # and the store must not be separated.
+            self.lock.acquire()
+            try:
+                if key in self.data:
+                    continue
+                self._store(key, entry, size)
+                self.tentative[key] = saved
+            finally:
+                self.lock.release()
+            count += 1
+        return count
+
+    def stats(self):
+        """Returns the counters.
+
+        :return: Dictionary with ``entries``, ``bytes``, ``hits``, ``misses``, ``evictions``,
+                 ``expirations`` and ``tentative`` keys. Bytes are only counted if ``max_bytes``
+                 is set.
+        :rtype: dict
+        """
+        return dict(entries=len(self.data), bytes=self.bytes, hits=self.hits,
+                    misses=self.misses, evictions=self.evictions, expirations=self.expirations,
+                    tentative=len(self.tentative))
+
+
+class CachePolicy(dict):
+    """Table of cache policies consulted by `Skype` before caching a property, see
+    `Skype.CachePolicy`.
+
+    Maps (object type, property name) keys to the number of seconds the values of the
+    property are cached for. The property name can be ``'*'`` to set the policy of all
+    properties of an object type which have no policy of their own. Client variables
+    like ``SILENT_MODE`` are keyed with an empty property name. Besides a number of
+    seconds, a policy can be one of:
+
+    - `CACHE_NEVER` - The property is always queried from the client.
+    - `CACHE_UNTIL_NOTIFIED` - The value is cached until the client notifies about a
+      change, regardless of the ``ttl`` of the `PropertyCache`.
+
+    Properties without a policy are cached according to the `PropertyCache` settings.
+    The table may be changed at any time, for example:
+
+    .. python::
+
+        skype.CachePolicy['USER', 'FULLNAME'] = 3600
+        skype.CachePolicy['CALL', '*'] = Skype4Py.cache.CACHE_NEVER
+    """
+
+    def __init__(self, policies=DEFAULT_POLICIES):
+        """Initializes the object.
+
+        :Parameters:
+          policies : dict
+            Initial policies. By default the properties which were never cached by the
+            earlier versions of Skype4Py get the `CACHE_NEVER` policy.
+        """
+        dict.__init__(self, policies)
+
+    def lookup(self, object_type, prop_name):
+        """Returns the policy of a property.
+
+        :Parameters:
+          object_type : str
+            Object type.
+          prop_name : str
+            Property name.
+
+        :return: Number of seconds, `CACHE_NEVER`, `CACHE_UNTIL_NOTIFIED` or ``DEFAULT``
+                 if the property has no policy.
+        :rtype: float, int, None or object
+        """
+        policy = self.get((object_type, prop_name), DEFAULT)
+        if policy is DEFAULT:
+            policy = self.get((object_type, '*'), DEFAULT)
+        return policy
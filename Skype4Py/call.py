@@ -11,7 +11,7 @@ from enums import *
 
 class DeviceMixin(object):
     def _Device(self, Name, DeviceType=None, Set=NoneType):
-        args = args2dict(self._Property(Name, Cache=False))
+        args = args2dict(self._Property(Name))
         if Set is NoneType:
             for dev, value in args.items():
                 try:
@@ -124,6 +124,37 @@ class Call(Cached, DeviceMixin):
     """Represents a voice/video call.
     """
     _ValidateHandle = int
+    _ObjectType = 'CALL'
+    _SnapshotProperties = (
+        ('Id', None),
+        ('ConferenceId', 'CONF_ID'),
+        ('Duration', 'DURATION'),
+        ('FailureReason', 'FAILUREREASON'),
+        ('ForwardedBy', 'FORWARDED_BY'),
+        ('InputStatus', 'VAA_INPUT_STATUS'),
+        ('PartnerDisplayName', 'PARTNER_DISPNAME'),
+        ('PartnerHandle', 'PARTNER_HANDLE'),
+        ('PstnNumber', 'PSTN_NUMBER'),
+        ('PstnStatus', 'PSTN_STATUS'),
+        ('Rate', 'RATE'),
+        ('RateCurrency', 'RATE_CURRENCY'),
+        ('RatePrecision', 'RATE_PRECISION'),
+        ('Seen', 'SEEN'),
+        ('Status', 'STATUS'),
+        ('Subject', 'SUBJECT'),
+        ('TargetIdentity', 'TARGET_IDENTITY'),
+        ('Timestamp', 'TIMESTAMP'),
+        ('TransferActive', 'TRANSFER_ACTIVE'),
+        ('TransferStatus', 'TRANSFER_STATUS'),
+        ('TransferredBy', 'TRANSFERRED_BY'),
+        ('TransferredTo', 'TRANSFERRED_TO'),
+        ('Type', 'TYPE'),
+        ('VideoReceiveStatus', 'VIDEO_RECEIVE_STATUS'),
+        ('VideoSendStatus', 'VIDEO_SEND_STATUS'),
+        ('VideoStatus', 'VIDEO_STATUS'),
+        ('VmAllowedDuration', 'VM_ALLOWED_DURATION'),
+        ('VmDuration', 'VM_DURATION'),
+    )
 
     def __repr__(self):
         return Cached.__repr__(self, 'Id')
@@ -269,7 +300,7 @@ class Call(Cached, DeviceMixin):
     """)
 
     def _GetDuration(self):
-        return int(self._Property('DURATION', Cache=False))
+        return int(self._Property('DURATION'))
 
     Duration = property(_GetDuration,
     doc="""Duration of the call in seconds.
@@ -563,8 +594,12 @@ class Call(Cached, DeviceMixin):
     """)
 
 
+CallSnapshot = snapshot_type(Call)
+
+
 class CallCollection(CachedCollection):
     _CachedType = Call
+    _HandleTypecode = 'l'
 
 
 class Participant(Cached):
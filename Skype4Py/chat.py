@@ -12,6 +12,26 @@ class Chat(Cached):
     """Represents a Skype chat.
     """
     _ValidateHandle = str
+    _ObjectType = 'CHAT'
+    _SnapshotProperties = (
+        ('Name', None),
+        ('ActivityTimestamp', 'ACTIVITY_TIMESTAMP'),
+        ('Blob', 'BLOB'),
+        ('Bookmarked', 'BOOKMARKED'),
+        ('Description', 'DESCRIPTION'),
+        ('DialogPartner', 'DIALOG_PARTNER'),
+        ('FriendlyName', 'FRIENDLYNAME'),
+        ('GuideLines', 'GUIDELINES'),
+        ('MyRole', 'MYROLE'),
+        ('MyStatus', 'MYSTATUS'),
+        ('Options', 'OPTIONS'),
+        ('PasswordHint', 'PASSWORDHINT'),
+        ('Status', 'STATUS'),
+        ('Timestamp', 'TIMESTAMP'),
+        ('Topic', 'TOPIC'),
+        ('TopicXML', 'TOPICXML'),
+        ('Type', 'TYPE'),
+    )
 
     def __repr__(self):
         return Cached.__repr__(self, 'Name')
@@ -135,7 +155,7 @@ class Chat(Cached):
         self._Alter('UNBOOKMARK')
 
     def _GetActiveMembers(self):
-        return UserCollection(self._Owner, split(self._Property('ACTIVEMEMBERS', Cache=False)))
+        return UserCollection(self._Owner, split(self._Property('ACTIVEMEMBERS')))
 
     ActiveMembers = property(_GetActiveMembers,
     doc="""Active members of a chat.
@@ -281,7 +301,7 @@ class Chat(Cached):
     """)
 
     def _GetMessages(self):
-        return ChatMessageCollection(self._Owner, split(self._Property('CHATMESSAGES', Cache=False), ', '))
+        return ChatMessageCollection(self._Owner, split(self._Property('CHATMESSAGES'), ', '))
 
     Messages = property(_GetMessages,
     doc="""All chat messages.
@@ -347,7 +367,7 @@ class Chat(Cached):
     """)
 
     def _GetRecentMessages(self):
-        return ChatMessageCollection(self._Owner, split(self._Property('RECENTCHATMESSAGES', Cache=False), ', '))
+        return ChatMessageCollection(self._Owner, split(self._Property('RECENTCHATMESSAGES'), ', '))
 
     RecentMessages = property(_GetRecentMessages,
     doc="""Most recent chat messages.
@@ -411,6 +431,9 @@ class Chat(Cached):
     """)
 
 
+ChatSnapshot = snapshot_type(Chat)
+
+
 class ChatCollection(CachedCollection):
     _CachedType = Chat
 
@@ -419,6 +442,21 @@ class ChatMessage(Cached):
     """Represents a single chat message.
     """
     _ValidateHandle = int
+    _ObjectType = 'CHATMESSAGE'
+    _SnapshotProperties = (
+        ('Id', None),
+        ('Body', 'BODY'),
+        ('ChatName', 'CHATNAME'),
+        ('EditedBy', 'EDITED_BY'),
+        ('EditedTimestamp', 'EDITED_TIMESTAMP'),
+        ('FromDisplayName', 'FROM_DISPNAME'),
+        ('FromHandle', 'FROM_HANDLE'),
+        ('IsEditable', 'IS_EDITABLE'),
+        ('LeaveReason', 'LEAVEREASON'),
+        ('Status', 'STATUS'),
+        ('Timestamp', 'TIMESTAMP'),
+        ('Type', 'TYPE'),
+    )
 
     def __repr__(self):
         return Cached.__repr__(self, 'Id')
@@ -608,14 +646,19 @@ class ChatMessage(Cached):
     """)
 
 
+ChatMessageSnapshot = snapshot_type(ChatMessage)
+
+
 class ChatMessageCollection(CachedCollection):
     _CachedType = ChatMessage
+    _HandleTypecode = 'l'
 
 
 class ChatMember(Cached):
     """Represents a member of a public chat.
     """
     _ValidateHandle = int
+    _ObjectType = 'CHATMEMBER'
 
     def __repr__(self):
         return Cached.__repr__(self, 'Id')
@@ -692,3 +735,4 @@ class ChatMember(Cached):
 
 class ChatMemberCollection(CachedCollection):
     _CachedType = ChatMember
+    _HandleTypecode = 'l'
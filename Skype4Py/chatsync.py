@@ -0,0 +1,225 @@
+"""Incremental chat history synchronization.
+
+A `ChatSync` remembers the newest message seen in every chat, a high-water mark made
+of the message timestamp and id, and returns only the messages received after it.
+The marks can be saved to a checkpoint file so that a restarted process continues
+where the previous one stopped.
+"""
+__docformat__ = 'restructuredtext en'
+
+
+import os
+import threading
+
+from utils import split
+from chat import Chat, ChatMessage, ChatMessageCollection
+
+
+__all__ = ['ChatSync']
+
+
+# Properties of the new messages queried by default.
+DEFAULT_PROPERTIES = ('TIMESTAMP', 'FROM_HANDLE', 'FROM_DISPNAME', 'TYPE', 'BODY')
+
+
+class ChatSync(object):
+    """Fetches the chat messages received since the last synchronization.
+
+    Usage:
+
+    .. python::
+
+        skype = Skype4Py.Skype()
+        skype.Attach()
+        sync = Skype4Py.ChatSync(skype, 'chats.db')
+        for chat, messages in sync.Sync():
+            for message in messages:
+                archive(chat.Name, message.Timestamp, message.FromHandle, message.Body)
+        sync.Checkpoint()
+
+    A synchronization queries the message ids of every chat, pipelining the queries,
+    and keeps the ids above the high-water mark of the chat. The properties of all new
+    messages are then prefetched at once (see `Skype4Py.utils.Cached.Prefetch`), so
+    reading them doesn't wait for the client. The messages before the mark are never
+    read.
+
+    Message ids grow with time. If the newest id of a chat is below its mark, the ids
+    were assigned again (for example after the history was restored), all messages of
+    the chat are read and the ones at or after the mark timestamp are returned, except
+    the marked message itself which is recognized by its body.
+
+    The marks advance in memory when the messages are returned and are written to the
+    checkpoint file by `Checkpoint`. Calling it after the messages are processed
+    makes sure none is lost if the process dies, at worst some are returned again.
+
+    The object is thread-safe.
+    """
+
+    def __init__(self, Skype, Path=None, PropNames=DEFAULT_PROPERTIES):
+        """Initializes the object and loads the checkpoint.
+
+        :Parameters:
+          Skype : `Skype`
+            Attached Skype object.
+          Path : str or None
+            Path of the checkpoint file, an sqlite database. The marks are loaded from
+            it if it exists. If None, the marks are kept in memory only.
+          PropNames : sequence of str
+            Names of the ``CHATMESSAGE`` properties to prefetch. ``TIMESTAMP`` and
+            ``BODY`` are always prefetched.
+        """
+        self._Skype = Skype
+        self._Path = Path
+        self._PropNames = ['TIMESTAMP', 'BODY'] + [str(x).upper() for x in PropNames
+                                                   if str(x).upper() not in ('TIMESTAMP', 'BODY')]
+        self._Lock = threading.Lock()
+        # Chat name -> (timestamp, message id, body).
+        self._Marks = {}
+        if Path is not None and os.path.exists(Path):
+            self._Load()
+
+    def _Load(self):
+        import sqlite3
+        conn = sqlite3.connect(self._Path)
+        try:
+            rows = conn.execute('SELECT chat, timestamp, message_id, body FROM marks').fetchall()
+        finally:
+            conn.close()
+        self._Marks = dict((row[0], row[1:]) for row in rows)
+
+    def _ChatName(self, Chat):
+        return getattr(Chat, 'Name', Chat)
+
+    def _NewMessages(self, Ids, Mark):
+        # Returns the ids of the messages after the mark, ascending.
+        if Mark is None:
+            return Ids
+        timestamp, last_id, body = Mark
+        if not Ids or Ids[-1] >= last_id:
+            return [x for x in Ids if x > last_id]
+        # The ids were assigned again, compare the timestamps. Other messages may have
+        # the mark timestamp too, the marked one is told apart by its body.
+        skype = self._Skype
+        timestamps = skype._Prefetch('CHATMESSAGE', Ids, ['TIMESTAMP'], True)
+        timestamps = [float(x) for x in timestamps]
+        new = [x for x, y in zip(Ids, timestamps) if y >= timestamp]
+        same = [x for x, y in zip(Ids, timestamps) if y == timestamp]
+        bodies = skype._Prefetch('CHATMESSAGE', same, ['BODY'], True)
+        for message_id, message_body in zip(same, bodies):
+            if message_body == body:
+                new.remove(message_id)
+                break
+        return new
+
+    def Checkpoint(self):
+        """Writes the marks to the checkpoint file.
+        """
+        if self._Path is None:
+            raise TypeError('ChatSync has no checkpoint file')
+        import sqlite3
+        self._Lock.acquire()
+        try:
+            rows = [(chat,) + mark for chat, mark in self._Marks.iteritems()]
+        finally:
+            self._Lock.release()
+        conn = sqlite3.connect(self._Path)
+        try:
+            conn.execute('DROP TABLE IF EXISTS marks')
+            conn.execute('CREATE TABLE marks (chat TEXT PRIMARY KEY, '
+                         'timestamp REAL, message_id INTEGER, body TEXT)')
+            conn.executemany('INSERT INTO marks VALUES (?, ?, ?, ?)', rows)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def Mark(self, Chat):
+        """Returns the high-water mark of a chat.
+
+        :Parameters:
+          Chat : `Chat` or unicode
+            Chat object or name.
+
+        :return: Timestamp and id of the newest message returned so far, None if the chat
+                 wasn't synchronized yet.
+        :rtype: tuple(float, int) or None
+        """
+        self._Lock.acquire()
+        try:
+            mark = self._Marks.get(self._ChatName(Chat))
+        finally:
+            self._Lock.release()
+        if mark is not None:
+            return mark[:2]
+
+    def Reset(self, Chat=None):
+        """Forgets the high-water marks. The next synchronization returns all messages.
+
+        :Parameters:
+          Chat : `Chat`, unicode or None
+            Chat object or name, None to forget the marks of all chats.
+        """
+        self._Lock.acquire()
+        try:
+            if Chat is None:
+                self._Marks.clear()
+            else:
+                self._Marks.pop(self._ChatName(Chat), None)
+        finally:
+            self._Lock.release()
+
+    def Sync(self, Chats=None):
+        """Fetches the new messages.
+
+        :Parameters:
+          Chats : sequence of `Chat` or unicode or None
+            Chat objects or names, None to synchronize all chats.
+
+        :return: Chats with new messages and the new messages in the order they were
+                 received.
+        :rtype: list of tuple(`Chat`, `ChatMessageCollection`)
+        """
+        skype = self._Skype
+        if Chats is None:
+            names = skype._Search('CHATS')
+        else:
+            names = [self._ChatName(x) for x in Chats]
+        values = skype._Prefetch('CHAT', names, ['CHATMESSAGES'], True)
+        self._Lock.acquire()
+        try:
+            marks = [self._Marks.get(x) for x in names]
+        finally:
+            self._Lock.release()
+        found = []
+        for name, value, mark in zip(names, values, marks):
+            ids = sorted(int(x) for x in split(value, ', '))
+            new = self._NewMessages(ids, mark)
+            if new:
+                found.append((name, new))
+        skype._Prefetch('CHATMESSAGE', [x for name, new in found for x in new], self._PropNames)
+        result = []
+        marks = []
+        for name, new in found:
+            last = ChatMessage(skype, new[-1])
+            marks.append((name, (last.Timestamp, last.Id, last.Body)))
+            result.append((Chat(skype, name), ChatMessageCollection(skype, new)))
+        self._Lock.acquire()
+        try:
+            self._Marks.update(marks)
+        finally:
+            self._Lock.release()
+        return result
+
+    def SyncChat(self, Chat):
+        """Fetches the new messages of one chat.
+
+        :Parameters:
+          Chat : `Chat` or unicode
+            Chat object or name.
+
+        :return: New messages in the order they were received.
+        :rtype: `ChatMessageCollection`
+        """
+        result = self.Sync([Chat])
+        if result:
+            return result[0][1]
+        return ChatMessageCollection(self._Skype)
@@ -409,3 +409,12 @@ wndNormal = 'NORMAL'
 wndMinimized = 'MINIMIZED'
 wndMaximized = 'MAXIMIZED'
 wndHidden = 'HIDDEN'
+
+#{ Event delivery mode
+evdInline = 'INLINE'
+evdPooled = 'POOLED'
+evdQueue = 'QUEUE'
+
+#{ Event queue overflow policy
+eqoDropNewest = 'DROP_NEWEST'
+eqoDropOldest = 'DROP_OLDEST'
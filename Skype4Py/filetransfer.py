@@ -12,6 +12,7 @@ class FileTransfer(Cached):
     """Represents a file transfer.
     """
     _ValidateHandle = int
+    _ObjectType = 'FILETRANSFER'
 
     def __repr__(self):
         return Cached.__repr__(self, 'Id')
@@ -162,3 +163,4 @@ class FileTransfer(Cached):
 
 class FileTransferCollection(CachedCollection):
     _CachedType = FileTransfer
+    _HandleTypecode = 'l'
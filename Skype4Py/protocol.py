@@ -0,0 +1,170 @@
+"""Skype API wire protocol.
+
+Every message received from the Skype client is tokenized once by `parse` into a
+`Message`. The transports use it to match replies with commands and pass it on to
+the notification dispatcher and the property cache which read the tokens instead of
+splitting the string again.
+
+The names of the types and properties are interned as str objects, the same ones
+the rest of the package uses as literals. The values of the enum-like properties
+(``ONLINESTATUS``, ``STATUS``, ...) are interned as well so that the cache keeps one
+copy of each instead of one per object. Free-form values are never interned.
+"""
+__docformat__ = 'restructuredtext en'
+
+
+__all__ = ['Message', 'parse', 'intern_name', 'intern_value']
+
+
+# Objects with an id, their messages look like ``<type> <id> <property> <value>``.
+OBJECT_TYPES = frozenset(['CALL', 'USER', 'GROUP', 'CHAT', 'CHATMESSAGE', 'CHATMEMBER',
+                          'VOICEMAIL', 'APPLICATION', 'SMS', 'FILETRANSFER'])
+
+# Objects without an id, their messages look like ``<type> <property> <value>``.
+GLOBAL_OBJECTS = frozenset(['PROFILE', 'PRIVILEGE'])
+
+# Client variables, their messages look like ``<variable> <value>``.
+VARIABLES = frozenset(['CURRENTUSERHANDLE', 'USERSTATUS', 'CONNSTATUS',
+                       'PREDICTIVE_DIALER_COUNTRY', 'SILENT_MODE', 'AUDIO_IN', 'AUDIO_OUT',
+                       'RINGER', 'MUTE', 'AUTOAWAY', 'WINDOWSTATE'])
+
+# Maximal number of interned names and values. Once the tables are full, new names
+# and values are returned as they are.
+MAX_NAMES = 10000
+MAX_VALUES = 10000
+
+# Properties and client variables whose values are taken from a small set (mostly
+# the `enums` constants), only their values are interned.
+ENUM_PROPERTIES = frozenset(['ONLINESTATUS', 'BUDDYSTATUS', 'STATUS', 'TYPE', 'SEX',
+                             'FAILUREREASON', 'LEAVEREASON', 'MYSTATUS', 'MYROLE', 'ROLE',
+                             'VIDEO_STATUS', 'VIDEO_SEND_STATUS', 'VIDEO_RECEIVE_STATUS',
+                             'HASCALLEQUIPMENT', 'IS_AUTHORIZED', 'IS_BLOCKED',
+                             'IS_VIDEO_CAPABLE', 'IS_VOICEMAIL_CAPABLE', 'CAN_LEAVE_VM',
+                             'IS_CF_ACTIVE', 'SEEN', 'USERSTATUS', 'CONNSTATUS', 'MUTE',
+                             'SILENT_MODE', 'AUTOAWAY', 'WINDOWSTATE'])
+
+# Maps names to their interned str objects.
+NAMES = dict((intern(x), intern(x)) for x in OBJECT_TYPES | GLOBAL_OBJECTS | VARIABLES)
+
+# Maps values to their canonical unicode objects.
+VALUES = {}
+
+
+class Message(unicode):
+    """A message received from the Skype client, either a notification or a reply.
+
+    The object is the message text (without the ``#<id>`` prefix of replies) and
+    can be used wherever a unicode string is expected. The tokens are available as
+    attributes:
+
+    - ``Id`` (int or None) - Id of the command the message replies to.
+    - ``Verb`` (str) - The first word.
+    - ``ObjectType`` (str or None) - Type of the object the message is about, None
+      if the message isn't about an object property or a client variable.
+    - ``ObjectId`` (unicode) - Id of the object, empty for objects without an id and
+      for the client variables.
+    - ``PropName`` (str) - Name of the property, empty for the client variables.
+    - ``Value`` (unicode) - Value of the property or the variable. If ``ObjectType``
+      is None, the rest of the message after the first word.
+    """
+
+    __slots__ = ('Id', 'Verb', 'ObjectType', 'ObjectId', 'PropName', 'Value')
+
+
+def intern_name(name):
+    """Returns the interned str object of a type, property or command name.
+
+    :Parameters:
+      name : unicode or str
+        Name to intern.
+
+    :return: Interned name or the name itself if it isn't ASCII or the table is full.
+    :rtype: str or unicode
+    """
+    try:
+        return NAMES[name]
+    except KeyError:
+        pass
+    if len(NAMES) >= MAX_NAMES:
+        return name
+    try:
+        interned = intern(str(name))
+    except UnicodeError:
+        return name
+    NAMES[interned] = interned
+    return interned
+
+
+def intern_value(value, name):
+    """Returns the canonical object of a property value.
+
+    :Parameters:
+      value : unicode
+        Value to intern.
+      name : str
+        Name of the property or the client variable.
+
+    :return: The first equal value seen or the value itself if the property isn't one
+             of `ENUM_PROPERTIES` or the table is full.
+    :rtype: unicode
+    """
+    if name not in ENUM_PROPERTIES:
+        return value
+    interned = VALUES.get(value)
+    if interned is not None:
+        return interned
+    if len(VALUES) < MAX_VALUES:
+        VALUES[value] = value
+    return value
+
+
+def parse(text):
+    """Tokenizes a message received from the Skype client.
+
+    :Parameters:
+      text : unicode
+        Message text, a reply including the ``#<id>`` prefix or a notification.
+
+    :return: Tokenized message. If text is already a `Message`, it is returned as is.
+    :rtype: `Message`
+    """
+    if isinstance(text, Message):
+        return text
+    id_ = None
+    if text.startswith(u'#'):
+        p = text.find(u' ')
+        if p < 0:
+            p = len(text)
+        id_ = int(text[1:p])
+        text = text[p + 1:]
+    message = Message(text)
+    message.Id = id_
+    words = text.split(None, 3)
+    if not words:
+        words = [u'']
+    # The lookups are inlined, the functions are only called for new or empty words.
+    verb = message.Verb = NAMES.get(words[0]) or intern_name(words[0])
+    if verb in OBJECT_TYPES:
+        if len(words) < 4:
+            words += [u''] * (4 - len(words))
+        message.ObjectType = verb
+        message.ObjectId = words[1]
+        prop_name = message.PropName = NAMES.get(words[2]) or intern_name(words[2])
+        if prop_name in ENUM_PROPERTIES:
+            message.Value = VALUES.get(words[3]) or intern_value(words[3], prop_name)
+        else:
+            message.Value = words[3]
+        return message
+    message.ObjectId = message.PropName = ''
+    if verb in GLOBAL_OBJECTS:
+        words = text.split(None, 2) + [u'', u'']
+        message.ObjectType = verb
+        message.PropName = intern_name(words[1])
+        message.Value = intern_value(words[2], message.PropName)
+    elif verb in VARIABLES:
+        message.ObjectType = verb
+        message.Value = intern_value((text.split(None, 1) + [u'', u''])[1], verb)
+    else:
+        message.ObjectType = None
+        message.Value = (text.split(None, 1) + [u'', u''])[1]
+    return message
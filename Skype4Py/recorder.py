@@ -0,0 +1,176 @@
+"""Protocol traffic recording.
+
+A `Recorder` writes every command sent to the Skype client, every reply and every
+notification to a file. The recording can be fed back to Skype4Py using the *replay*
+transport (see `Skype4Py.api.replay`).
+
+The file is an append-only UTF-8 text file with one record per line::
+
+    <microseconds> <kind> <data>
+
+where kind is one of:
+
+- ``S`` - Start of a recording session, the time is the number of microseconds since
+  the epoch. Times of the following records are relative to it.
+- ``C`` - Command sent to the client, data is the command id followed by the command.
+- ``R`` - Reply received from the client, data is the command id followed by the reply.
+- ``N`` - Notification received from the client.
+- ``A`` - Attachment status change.
+
+Backslashes and line breaks in the data are escaped using a backslash.
+"""
+__docformat__ = 'restructuredtext en'
+
+
+import threading
+import time
+
+from api import SkypeAPINotifier
+
+
+__all__ = ['Recorder', 'read_recording']
+
+
+def escape(s):
+    return s.replace(u'\\', u'\\\\').replace(u'\n', u'\\n').replace(u'\r', u'\\r')
+
+
+def unescape(s):
+    if u'\\' not in s:
+        return s
+    chars = []
+    i = 0
+    while i < len(s):
+        c = s[i]
+        if c == u'\\' and i + 1 < len(s):
+            i += 1
+            c = {u'n': u'\n', u'r': u'\r'}.get(s[i], s[i])
+        chars.append(c)
+        i += 1
+    return u''.join(chars)
+
+
+def read_recording(path):
+    """Reads a recording.
+
+    :Parameters:
+      path : str
+        Path of the recording file.
+
+    :return: Generator of (time, kind, data) tuples where time is the number of
+             seconds since the epoch and kind is one of ``C``, ``R``, ``N`` and ``A``.
+    :rtype: generator of (float, str, unicode)
+    """
+    start = 0
+    f = open(path, 'rb')
+    try:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            t, kind, data = (line.split(' ', 2) + [''])[:3]
+            if kind == 'S':
+                start = int(t)
+                continue
+            yield (start + int(t)) / 1e6, kind, unescape(data.decode('utf-8'))
+    finally:
+        f.close()
+
+
+class RecordingNotifier(SkypeAPINotifier):
+    """Passes the events to another notifier and records them.
+    """
+
+    def __init__(self, notifier, recorder):
+        self.notifier = notifier
+        self.recorder = recorder
+
+    def attachment_changed(self, status):
+        self.recorder._Write('A', status)
+        self.notifier.attachment_changed(status)
+
+    def notification_received(self, notification):
+        self.recorder._Write('N', notification)
+        self.notifier.notification_received(notification)
+
+    def sending_command(self, command):
+        self.recorder._Write('C', u'%d %s' % (command.Id, command.Command))
+        self.notifier.sending_command(command)
+
+    def reply_received(self, command):
+        self.recorder._Write('R', u'%d %s' % (command.Id, command.Reply))
+        self.notifier.reply_received(command)
+
+
+class Recorder(object):
+    """Records the traffic between a `Skype` object and the Skype client.
+
+    Usage:
+
+    .. python::
+
+        skype = Skype4Py.Skype()
+        recorder = Skype4Py.Recorder(skype, 'traffic.rec')
+        skype.Attach()
+        # ...
+        recorder.Close()
+    """
+
+    def __init__(self, Skype, Path, Flush=False):
+        """Starts recording.
+
+        :Parameters:
+          Skype : `Skype`
+            Skype object to record the traffic of.
+          Path : str
+            Path of the recording file. New records are appended to the file.
+          Flush : bool
+            If True, the file is flushed after every record so nothing is lost if
+            the process is killed. Slows the recording down.
+        """
+        self._Api = Skype._Api
+        self._Lock = threading.Lock()
+        self._File = open(Path, 'ab')
+        self._Flush = Flush
+        self._Count = 0
+        self._Start = time.time()
+        self._File.write('%d S\n' % (self._Start * 1e6))
+        self._Notifier = RecordingNotifier(self._Api.notifier, self)
+        self._Api.set_notifier(self._Notifier)
+
+    def _Write(self, Kind, Data):
+        line = '%d %s %s\n' % ((time.time() - self._Start) * 1e6, Kind,
+                               escape(unicode(Data)).encode('utf-8'))
+        self._Lock.acquire()
+        try:
+            if self._File is None:
+                return
+            self._File.write(line)
+            self._Count += 1
+            if self._Flush:
+                self._File.flush()
+        finally:
+            self._Lock.release()
+
+    def Close(self):
+        """Stops recording and closes the file.
+        """
+        self._Lock.acquire()
+        try:
+            if self._File is None:
+                return
+            if self._Api.notifier is self._Notifier:
+                self._Api.set_notifier(self._Notifier.notifier)
+            self._File.close()
+            self._File = None
+        finally:
+            self._Lock.release()
+
+    def _GetCount(self):
+        return self._Count
+
+    Count = property(_GetCount,
+    doc="""Number of records written so far.
+
+    :type: int
+    """)
@@ -0,0 +1,325 @@
+"""Local contact list mirror.
+
+A `Roster` loads the friends, their online statuses and the members of the contact
+groups once and then keeps them current using the ``USER`` and ``GROUP`` notifications
+received by the `Skype` object. The queries are answered from indexes kept in memory
+without sending any commands to the client.
+"""
+__docformat__ = 'restructuredtext en'
+
+
+import threading
+import weakref
+
+from enums import *
+from errors import SkypeError, SkypeAPIError
+from utils import split
+from user import UserCollection, GroupCollection
+
+
+__all__ = ['Roster']
+
+
+EMPTY = frozenset()
+
+
+class Roster(object):
+    """Mirror of the contact list of the current user.
+
+    Usage:
+
+    .. python::
+
+        skype = Skype4Py.Skype()
+        skype.Attach()
+        roster = Skype4Py.Roster(skype)
+        for user in roster.FindFriends(Skype4Py.olsAway, Group=skype.Groups[0]):
+            print user.Handle
+        print roster.CountByStatus()
+        # ...
+        roster.Close()
+
+    The friends are indexed by online status and by group. The indexes are updated when
+    the client notifies about changes of the ``ONLINESTATUS`` and ``BUDDYSTATUS`` user
+    properties and the ``USERS`` and ``NROFUSERS`` group properties or about a deleted
+    group. Values the notifications do not carry (the status of a new friend, the members
+    of a group whose size changed) are queried in the background.
+
+    The object is thread-safe. The notifications are applied before the events they
+    cause are fired, so the event handlers see the updated roster.
+    """
+
+    def __init__(self, Skype):
+        """Loads the contact list and starts following the changes.
+
+        :Parameters:
+          Skype : `Skype`
+            Attached Skype object.
+        """
+        # The Skype object keeps the roster, a weak reference avoids a cycle. The
+        # collections are owned by the Skype object itself, see _GetSkype.
+        self._SkypeRef = weakref.ref(Skype)
+        self._Lock = threading.RLock()
+        # Handle -> online status of every friend.
+        self._Status = {}
+        # Online status -> set of handles.
+        self._ByStatus = {}
+        # Group id -> set of handles.
+        self._Groups = {}
+        # Notifications received while loading, None if not loading.
+        self._Pending = None
+        Skype._Rosters.append(self)
+        try:
+            self.Reload()
+        except:
+            self.Close()
+            raise
+
+    def _GetSkype(self):
+        skype = self._SkypeRef()
+        if skype is None:
+            raise weakref.ReferenceError('the Skype object no longer exists')
+        return skype
+
+    def _SetStatus(self, Handle, Status):
+        old = self._Status.get(Handle)
+        if old == Status:
+            return
+        if old is not None:
+            self._ByStatus[old].discard(Handle)
+        self._Status[Handle] = Status
+        self._ByStatus.setdefault(Status, set()).add(Handle)
+
+    def _RemoveFriend(self, Handle):
+        old = self._Status.pop(Handle, None)
+        if old is not None:
+            self._ByStatus[old].discard(Handle)
+
+    def _Apply(self, Message):
+        # Updates the indexes, returns the property to query or None.
+        verb = Message.Verb
+        if verb == 'USER':
+            handle, prop_name = Message.ObjectId, Message.PropName
+            if prop_name == 'ONLINESTATUS':
+                if handle in self._Status:
+                    self._SetStatus(handle, str(Message.Value))
+            elif prop_name == 'BUDDYSTATUS':
+                if Message.Value == str(budFriend):
+                    if handle not in self._Status:
+                        key = ('USER', str(handle), 'ONLINESTATUS')
+                        status = self._GetSkype()._CacheDict.get(key, None)
+                        if status is not None:
+                            self._SetStatus(handle, str(status))
+                            return None
+                        self._SetStatus(handle, olsUnknown)
+                        return key
+                else:
+                    self._RemoveFriend(handle)
+        elif verb == 'GROUP':
+            group_id, prop_name = int(Message.ObjectId), Message.PropName
+            if prop_name == 'USERS':
+                self._Groups[group_id] = set(split(Message.Value, ', '))
+            elif prop_name == 'NROFUSERS':
+                if int(Message.Value) != len(self._Groups.get(group_id, EMPTY)) or \
+                        group_id not in self._Groups:
+                    self._Groups.setdefault(group_id, set())
+                    return ('GROUP', str(group_id), 'USERS')
+        elif verb == 'DELETED':
+            what, group_id = (split(Message.Value) + [''])[:2]
+            if what == 'GROUP':
+                self._Groups.pop(int(group_id), None)
+        return None
+
+    def _Notify(self, Message):
+        # Called by the notifier for every notification.
+        if Message.Verb not in ('USER', 'GROUP', 'DELETED'):
+            return
+        self._Lock.acquire()
+        try:
+            if self._Pending is not None:
+                self._Pending.append(Message)
+                return
+            key = self._Apply(Message)
+        finally:
+            self._Lock.release()
+        if key is not None:
+            self._Refresh(key)
+
+    def _Refresh(self, Key):
+        try:
+            future = self._GetSkype()._PropertyAsync(*Key)
+        except (SkypeAPIError, weakref.ReferenceError):
+            return
+        future.add_done_callback(lambda future: self._Refreshed(Key, future))
+
+    def _Refreshed(self, Key, Future):
+        try:
+            value = Future.result()
+        except (SkypeError, SkypeAPIError):
+            return
+        self._Lock.acquire()
+        try:
+            if Key[0] == 'USER':
+                if Key[1] in self._Status:
+                    self._SetStatus(Key[1], str(value))
+            elif int(Key[1]) in self._Groups:
+                self._Groups[int(Key[1])] = set(split(value, ', '))
+        finally:
+            self._Lock.release()
+
+    def _GroupId(self, Group):
+        return int(getattr(Group, 'Id', Group))
+
+    def Close(self):
+        """Stops following the changes. The roster keeps the last known state.
+        """
+        try:
+            self._GetSkype()._Rosters.remove(self)
+        except (ValueError, weakref.ReferenceError):
+            pass
+
+    def CountByStatus(self, Group=None):
+        """Counts the friends by online status.
+
+        :Parameters:
+          Group : `Group` or int
+            If given, only the friends in this group (or group with this id) are counted.
+
+        :return: Online statuses mapped to the numbers of friends. Statuses nobody has
+                 are omitted.
+        :rtype: dict of `enums`.ols* to int
+        """
+        self._Lock.acquire()
+        try:
+            if Group is None:
+                return dict((status, len(handles)) for status, handles in self._ByStatus.items()
+                            if handles)
+            counts = {}
+            for handle in self._Groups.get(self._GroupId(Group), EMPTY):
+                status = self._Status.get(handle)
+                if status is not None:
+                    counts[status] = counts.get(status, 0) + 1
+            return counts
+        finally:
+            self._Lock.release()
+
+    def FindFriends(self, Status=None, Group=None):
+        """Finds friends by online status and group.
+
+        :Parameters:
+          Status : `enums`.ols* or sequence of `enums`.ols*
+            If given, only the friends with this status (or one of these statuses) are
+            returned.
+          Group : `Group` or int
+            If given, only the friends in this group (or group with this id) are returned.
+
+        :return: Matching friends.
+        :rtype: `UserCollection`
+        """
+        self._Lock.acquire()
+        try:
+            if Status is None:
+                handles = self._Status
+            elif isinstance(Status, basestring):
+                handles = self._ByStatus.get(Status, EMPTY)
+            else:
+                handles = set()
+                for status in Status:
+                    handles.update(self._ByStatus.get(status, EMPTY))
+            if Group is not None:
+                members = self._Groups.get(self._GroupId(Group), EMPTY)
+                if len(members) < len(handles):
+                    handles = [x for x in members if x in handles]
+                else:
+                    handles = [x for x in handles if x in members]
+            return UserCollection(self._GetSkype(), list(handles))
+        finally:
+            self._Lock.release()
+
+    def OnlineStatus(self, Username):
+        """Returns the online status of a friend.
+
+        :Parameters:
+          Username : str
+            Skypename of the friend.
+
+        :return: Online status, `enums.olsUnknown` if the user isn't a friend.
+        :rtype: `enums`.ols*
+        """
+        self._Lock.acquire()
+        try:
+            return self._Status.get(Username, olsUnknown)
+        finally:
+            self._Lock.release()
+
+    def Reload(self):
+        """Loads the contact list again. Normally not needed, the roster follows the
+        changes automatically.
+        """
+        skype = self._GetSkype()
+        self._Lock.acquire()
+        try:
+            self._Pending = []
+        finally:
+            self._Lock.release()
+        try:
+            handles = skype._Search('FRIENDS')
+            group_ids = skype._Search('GROUPS', 'ALL')
+            statuses = skype._Prefetch('USER', handles, ['ONLINESTATUS'], True)
+            users = skype._Prefetch('GROUP', group_ids, ['USERS'], True)
+        except:
+            self._Lock.acquire()
+            try:
+                self._Pending = None
+            finally:
+                self._Lock.release()
+            raise
+        keys = []
+        self._Lock.acquire()
+        try:
+            self._Status = {}
+            self._ByStatus = {}
+            for handle, status in zip(handles, statuses):
+                self._SetStatus(handle, str(status))
+            self._Groups = dict((int(x), set(split(y, ', '))) for x, y in zip(group_ids, users))
+            # Apply the changes which happened while loading.
+            pending, self._Pending = self._Pending, None
+            for message in pending:
+                key = self._Apply(message)
+                if key is not None:
+                    keys.append(key)
+        finally:
+            self._Lock.release()
+        for key in keys:
+            self._Refresh(key)
+
+    def _GetFriends(self):
+        return self.FindFriends()
+
+    Friends = property(_GetFriends,
+    doc="""All friends.
+
+    :type: `UserCollection`
+    """)
+
+    def _GetGroups(self):
+        self._Lock.acquire()
+        try:
+            return GroupCollection(self._GetSkype(), list(self._Groups))
+        finally:
+            self._Lock.release()
+
+    Groups = property(_GetGroups,
+    doc="""All contact groups.
+
+    :type: `GroupCollection`
+    """)
+
+    def _GetOnlineFriends(self):
+        return self.FindFriends(olsOnline)
+
+    OnlineFriends = property(_GetOnlineFriends,
+    doc="""Friends whose online status is `enums.olsOnline`, like `Group.OnlineUsers`.
+
+    :type: `UserCollection`
+    """)
@@ -6,11 +6,14 @@ __docformat__ = 'restructuredtext en'
 import threading
 import weakref
 import logging
+from collections import deque
 
 from api import *
 from errors import *
 from enums import *
 from utils import *
+from protocol import parse
+from cache import PropertyCache, CachePolicy, CACHE_NEVER, DEFAULT as CACHE_DEFAULT
 from conversion import *
 from client import *
 from user import *
@@ -24,6 +27,101 @@ from sms import *
 from filetransfer import *
 
 
+def _sms_target_statuses(skype, object_id, value):
+    o = SmsMessage(skype, object_id)
+    for t in split(value, ', '):
+        number, status = t.split('=')
+        yield SmsTarget(o, number), str(status)
+
+
+def _application_streams(skype, object_id, value):
+    o = Application(skype, object_id)
+    return o, ApplicationStreamCollection(o, split(value))
+
+
+def _application_stream_sizes(skype, object_id, value):
+    o = Application(skype, object_id)
+    return o, ApplicationStreamCollection(o, (x.split('=')[0] for x in split(value)))
+
+
+def _application_datagram(skype, object_id, value):
+    o = Application(skype, object_id)
+    handle, text = chop(value)
+    return o, ApplicationStream(o, handle), text
+
+
+# Events fired by notifications about object properties and client variables.
+# Maps (object type, property name) to (event name, decoder, repeated) tuples.
+# The decoder is called with the Skype object, the object id and the value and
+# returns a tuple of the event arguments or, if repeated is True, an iterable
+# of such tuples in which case the event is fired for each of them.
+NOTIFICATION_EVENTS = {
+    ('USER', 'ONLINESTATUS'): ('OnlineStatus', lambda s, i, v: (User(s, i), str(v)), False),
+    ('USER', 'MOOD_TEXT'): ('UserMood', lambda s, i, v: (User(s, i), v), False),
+    ('USER', 'RICH_MOOD_TEXT'): ('UserMood', lambda s, i, v: (User(s, i), v), False),
+    ('USER', 'RECEIVEDAUTHREQUEST'): ('UserAuthorizationRequestReceived', lambda s, i, v: (User(s, i),), False),
+    ('CALL', 'STATUS'): ('CallStatus', lambda s, i, v: (Call(s, i), str(v)), False),
+    ('CALL', 'SEEN'): ('CallSeenStatusChanged', lambda s, i, v: (Call(s, i), v == 'TRUE'), False),
+    ('CALL', 'VAA_INPUT_STATUS'): ('CallInputStatusChanged', lambda s, i, v: (Call(s, i), v == 'TRUE'), False),
+    ('CALL', 'TRANSFER_STATUS'): ('CallTransferStatusChanged', lambda s, i, v: (Call(s, i), str(v)), False),
+    ('CALL', 'DTMF'): ('CallDtmfReceived', lambda s, i, v: (Call(s, i), str(v)), False),
+    ('CALL', 'VIDEO_STATUS'): ('CallVideoStatusChanged', lambda s, i, v: (Call(s, i), str(v)), False),
+    ('CALL', 'VIDEO_SEND_STATUS'): ('CallVideoSendStatusChanged', lambda s, i, v: (Call(s, i), str(v)), False),
+    ('CALL', 'VIDEO_RECEIVE_STATUS'): ('CallVideoReceiveStatusChanged', lambda s, i, v: (Call(s, i), str(v)), False),
+    ('CHAT', 'MEMBERS'): ('ChatMembersChanged', lambda s, i, v: (Chat(s, i), UserCollection(s, split(v))), False),
+    ('CHAT', 'OPENED'): ('ChatWindowState', lambda s, i, v: (Chat(s, i), True), False),
+    ('CHAT', 'CLOSED'): ('ChatWindowState', lambda s, i, v: (Chat(s, i), False), False),
+    ('CHATMEMBER', 'ROLE'): ('ChatMemberRoleChanged', lambda s, i, v: (ChatMember(s, i), str(v)), False),
+    ('CHATMESSAGE', 'STATUS'): ('MessageStatus', lambda s, i, v: (ChatMessage(s, i), str(v)), False),
+    ('APPLICATION', 'CONNECTING'): ('ApplicationConnecting', lambda s, i, v: (Application(s, i), UserCollection(s, split(v))), False),
+    ('APPLICATION', 'STREAMS'): ('ApplicationStreams', _application_streams, False),
+    ('APPLICATION', 'DATAGRAM'): ('ApplicationDatagram', _application_datagram, False),
+    ('APPLICATION', 'SENDING'): ('ApplicationSending', _application_stream_sizes, False),
+    ('APPLICATION', 'RECEIVED'): ('ApplicationReceiving', _application_stream_sizes, False),
+    ('GROUP', 'VISIBLE'): ('GroupVisible', lambda s, i, v: (Group(s, i), v == 'TRUE'), False),
+    ('GROUP', 'EXPANDED'): ('GroupExpanded', lambda s, i, v: (Group(s, i), v == 'TRUE'), False),
+    ('GROUP', 'NROFUSERS'): ('GroupUsers', lambda s, i, v: (Group(s, i), int(v)), False),
+    ('SMS', 'STATUS'): ('SmsMessageStatusChanged', lambda s, i, v: (SmsMessage(s, i), str(v)), False),
+    ('SMS', 'TARGET_STATUSES'): ('SmsTargetStatusChanged', _sms_target_statuses, True),
+    ('FILETRANSFER', 'STATUS'): ('FileTransferStatusChanged', lambda s, i, v: (FileTransfer(s, i), str(v)), False),
+    ('VOICEMAIL', 'STATUS'): ('VoicemailStatus', lambda s, i, v: (Voicemail(s, i), str(v)), False),
+    ('MUTE', ''): ('Mute', lambda s, i, v: (v == 'TRUE',), False),
+    ('CONNSTATUS', ''): ('ConnectionStatus', lambda s, i, v: (str(v),), False),
+    ('USERSTATUS', ''): ('UserStatus', lambda s, i, v: (str(v),), False),
+    ('AUTOAWAY', ''): ('AutoAway', lambda s, i, v: (v == 'ON',), False),
+    ('WINDOWSTATE', ''): ('ClientWindowState', lambda s, i, v: (str(v),), False),
+    ('SILENT_MODE', ''): ('SilentModeStatusChanged', lambda s, i, v: (v == 'ON',), False),
+}
+
+
+# Maximum number of property queries sent by Prefetch before waiting for replies.
+PREFETCH_WINDOW = 500
+
+# Maps the targets of the SEARCH command to the collections of the found objects.
+SEARCH_TYPES = {
+    'FRIENDS': UserCollection,
+    'USERS': UserCollection,
+    'USERSWAITINGMYAUTHORIZATION': UserCollection,
+    'GROUPS': GroupCollection,
+    'CALLS': CallCollection,
+    'ACTIVECALLS': CallCollection,
+    'MISSEDCALLS': CallCollection,
+    'VOICEMAILS': VoicemailCollection,
+    'MISSEDVOICEMAILS': VoicemailCollection,
+    'CHATS': ChatCollection,
+    'ACTIVECHATS': ChatCollection,
+    'MISSEDCHATS': ChatCollection,
+    'RECENTCHATS': ChatCollection,
+    'BOOKMARKEDCHATS': ChatCollection,
+    'CHATMESSAGES': ChatMessageCollection,
+    'MISSEDCHATMESSAGES': ChatMessageCollection,
+    'SMSS': SmsMessageCollection,
+    'MISSEDSMSS': SmsMessageCollection,
+    'FILETRANSFERS': FileTransferCollection,
+    'ACTIVEFILETRANSFERS': FileTransferCollection,
+}
+
+
 class APINotifier(SkypeAPINotifier):
     def __init__(self, skype):
         self.skype = weakref.proxy(skype)
@@ -39,108 +137,27 @@ class APINotifier(SkypeAPINotifier):
     def notification_received(self, notification):
         try:
             skype = self.skype
-            skype._CallEventHandler('Notify', notification)
-            a, b = chop(notification)
-            object_type = None
-            # if..elif handling cache and most event handlers
-            if a in ('CALL', 'USER', 'GROUP', 'CHAT', 'CHATMESSAGE', 'CHATMEMBER', 'VOICEMAIL', 'APPLICATION', 'SMS', 'FILETRANSFER'):
-                object_type, object_id, prop_name, value = [a] + chop(b, 2)
-                skype._CacheDict[str(object_type), str(object_id), str(prop_name)] = value
-                if object_type == 'USER':
-                    o = User(skype, object_id)
-                    if prop_name == 'ONLINESTATUS':
-                        skype._CallEventHandler('OnlineStatus', o, str(value))
-                    elif prop_name == 'MOOD_TEXT' or prop_name == 'RICH_MOOD_TEXT':
-                        skype._CallEventHandler('UserMood', o, value)
-                    elif prop_name == 'RECEIVEDAUTHREQUEST':
-                        skype._CallEventHandler('UserAuthorizationRequestReceived', o)
-                elif object_type == 'CALL':
-                    o = Call(skype, object_id)
-                    if prop_name == 'STATUS':
-                        skype._CallEventHandler('CallStatus', o, str(value))
-                    elif prop_name == 'SEEN':
-                        skype._CallEventHandler('CallSeenStatusChanged', o, (value == 'TRUE'))
-                    elif prop_name == 'VAA_INPUT_STATUS':
-                        skype._CallEventHandler('CallInputStatusChanged', o, (value == 'TRUE'))
-                    elif prop_name == 'TRANSFER_STATUS':
-                        skype._CallEventHandler('CallTransferStatusChanged', o, str(value))
-                    elif prop_name == 'DTMF':
-                        skype._CallEventHandler('CallDtmfReceived', o, str(value))
-                    elif prop_name == 'VIDEO_STATUS':
-                        skype._CallEventHandler('CallVideoStatusChanged', o, str(value))
-                    elif prop_name == 'VIDEO_SEND_STATUS':
-                        skype._CallEventHandler('CallVideoSendStatusChanged', o, str(value))
-                    elif prop_name == 'VIDEO_RECEIVE_STATUS':
-                        skype._CallEventHandler('CallVideoReceiveStatusChanged', o, str(value))
-                elif object_type == 'CHAT':
-                    o = Chat(skype, object_id)
-                    if prop_name == 'MEMBERS':
-                        skype._CallEventHandler('ChatMembersChanged', o, UserCollection(skype, split(value)))
-                    if prop_name in ('OPENED', 'CLOSED'):
-                        skype._CallEventHandler('ChatWindowState', o, (prop_name == 'OPENED'))
-                elif object_type == 'CHATMEMBER':
-                    o = ChatMember(skype, object_id)
-                    if prop_name == 'ROLE':
-                        skype._CallEventHandler('ChatMemberRoleChanged', o, str(value))
-                elif object_type == 'CHATMESSAGE':
-                    o = ChatMessage(skype, object_id)
-                    if prop_name == 'STATUS':
-                        skype._CallEventHandler('MessageStatus', o, str(value))
-                elif object_type == 'APPLICATION':
-                    o = Application(skype, object_id)
-                    if prop_name == 'CONNECTING':
-                        skype._CallEventHandler('ApplicationConnecting', o, UserCollection(skype, split(value)))
-                    elif prop_name == 'STREAMS':
-                        skype._CallEventHandler('ApplicationStreams', o, ApplicationStreamCollection(o, split(value)))
-                    elif prop_name == 'DATAGRAM':
-                        handle, text = chop(value)
-                        skype._CallEventHandler('ApplicationDatagram', o, ApplicationStream(o, handle), text)
-                    elif prop_name == 'SENDING':
-                        skype._CallEventHandler('ApplicationSending', o, ApplicationStreamCollection(o, (x.split('=')[0] for x in split(value))))
-                    elif prop_name == 'RECEIVED':
-                        skype._CallEventHandler('ApplicationReceiving', o, ApplicationStreamCollection(o, (x.split('=')[0] for x in split(value))))
-                elif object_type == 'GROUP':
-                    o = Group(skype, object_id)
-                    if prop_name == 'VISIBLE':
-                        skype._CallEventHandler('GroupVisible', o, (value == 'TRUE'))
-                    elif prop_name == 'EXPANDED':
-                        skype._CallEventHandler('GroupExpanded', o, (value == 'TRUE'))
-                    elif prop_name == 'NROFUSERS':
-                        skype._CallEventHandler('GroupUsers', o, int(value))
-                elif object_type == 'SMS':
-                    o = SmsMessage(skype, object_id)
-                    if prop_name == 'STATUS':
-                        skype._CallEventHandler('SmsMessageStatusChanged', o, str(value))
-                    elif prop_name == 'TARGET_STATUSES':
-                        for t in split(value, ', '):
-                            number, status = t.split('=')
-                            skype._CallEventHandler('SmsTargetStatusChanged', SmsTarget(o, number), str(status))
-                elif object_type == 'FILETRANSFER':
-                    o = FileTransfer(skype, object_id)
-                    if prop_name == 'STATUS':
-                        skype._CallEventHandler('FileTransferStatusChanged', o, str(value))
-                elif object_type == 'VOICEMAIL':
-                    o = Voicemail(skype, object_id)
-                    if prop_name == 'STATUS':
-                        skype._CallEventHandler('VoicemailStatus', o, str(value))
-            elif a in ('PROFILE', 'PRIVILEGE'):
-                object_type, object_id, prop_name, value = [a, ''] + chop(b)
-                skype._CacheDict[str(object_type), str(object_id), str(prop_name)] = value
-            elif a in ('CURRENTUSERHANDLE', 'USERSTATUS', 'CONNSTATUS', 'PREDICTIVE_DIALER_COUNTRY', 'SILENT_MODE', 'AUDIO_IN', 'AUDIO_OUT', 'RINGER', 'MUTE', 'AUTOAWAY', 'WINDOWSTATE'):
-                object_type, object_id, prop_name, value = [a, '', '', b]
-                skype._CacheDict[str(object_type), str(object_id), str(prop_name)] = value
-                if object_type == 'MUTE':
-                    skype._CallEventHandler('Mute', value == 'TRUE')
-                elif object_type == 'CONNSTATUS':
-                    skype._CallEventHandler('ConnectionStatus', str(value))
-                elif object_type == 'USERSTATUS':
-                    skype._CallEventHandler('UserStatus', str(value))
-                elif object_type == 'AUTOAWAY':
-                    skype._CallEventHandler('AutoAway', (value == 'ON'))
-                elif object_type == 'WINDOWSTATE':
-                    skype._CallEventHandler('ClientWindowState', str(value))
-                elif object_type == 'SILENT_MODE':
-                    skype._CallEventHandler('SilentModeStatusChanged', (value == 'ON'))
+            message = parse(notification)
+            for roster in skype._Rosters:
+                roster._Notify(message)
+            skype._CallEventHandler('Notify', message)
+            a, b = message.Verb, message.Value
+            if message.ObjectType is not None:
+                object_id, value = message.ObjectId, message.Value
+                skype._CacheProperty((message.ObjectType, object_id, message.PropName), value)
+                entry = NOTIFICATION_EVENTS.get((message.ObjectType, message.PropName))
+                # Decode the value and create the objects only if somebody listens.
+                if entry is not None and skype._HasEventHandlers(entry[0]):
+                    event, decode, repeated = entry
+                    # The property name keeps coalesced events caused by different
+                    # properties (MOOD_TEXT and RICH_MOOD_TEXT) apart.
+                    prop_name = message.PropName
+                    if repeated:
+                        for args in decode(skype, object_id, value):
+                            skype._DispatchEvent(event, tuple(args), {}, prop_name)
+                    else:
+                        skype._DispatchEvent(event, tuple(decode(skype, object_id, value)), {},
+                                             prop_name)
             elif a == 'CALLHISTORYCHANGED':
                 skype._CallEventHandler('CallHistory')
             elif a == 'IMHISTORYCHANGED':
@@ -152,6 +169,7 @@ class APINotifier(SkypeAPINotifier):
             elif a == 'DELETED':
                 prop_name, value = chop(b)
                 if prop_name == 'GROUP':
+                    skype._CacheDict.invalidate('GROUP', value)
                     skype._CallEventHandler('GroupDeleted', int(value))
             elif a == 'EVENT':
                 object_id, prop_name, value = chop(b, 2)
@@ -192,6 +210,119 @@ class APINotifier(SkypeAPINotifier):
             pass
 
 
+class CommandBatch(object):
+    """Sends many commands at once and collects their replies. Use `Skype.Batch`
+    to instantiate.
+
+    All methods return `CommandFuture` objects immediately after the command has been
+    sent. Results of the futures are checked for errors the same way as replies to
+    blocking commands, i.e. the ``result`` method raises `SkypeError` if Skype
+    replied with an error.
+    """
+
+    def __init__(self, Skype):
+        """Use `Skype.Batch` to instantiate the object instead of doing it directly.
+        """
+        self._Skype = Skype
+        self._Futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ExcType, ExcValue, Traceback):
+        if ExcType is None:
+            self.Wait()
+
+    def _Add(self, Future):
+        self._Futures.append(Future)
+        return Future
+
+    def DoCommand(self, Cmd, Reply=u''):
+        """Sends a command given as a string.
+
+        :Parameters:
+          Cmd : unicode
+            Command string.
+          Reply : unicode
+            Expected reply.
+
+        :return: A future returning the checked reply.
+        :rtype: `CommandFuture`
+        """
+        return self._Add(self._Skype._DoCommandAsync(Cmd, Reply))
+
+    def Property(self, ObjectType, ObjectId, PropName, Cache=True):
+        """Queries the property of an object. Same as `Skype.Property` but without
+        waiting for the reply. Cached values are used if available.
+
+        :Parameters:
+          ObjectType : str
+            Object type ('USER', 'CALL', 'CHAT', 'CHATMESSAGE', ...).
+          ObjectId : str
+            Object Id, depends on the object type.
+          PropName : str
+            Name of the property to query.
+          Cache : bool
+            If False, the cache is neither used nor updated.
+
+        :return: A future returning the property value.
+        :rtype: `CommandFuture`
+        """
+        return self._Add(self._Skype._PropertyAsync(ObjectType, ObjectId, PropName, Cache))
+
+    def Search(self, ObjectType, Target=None):
+        """Searches for objects. Same as `Skype.SearchAsync`.
+
+        :Parameters:
+          ObjectType : str
+            What to search for, the target of the SEARCH command, see `Skype.IterSearch`.
+          Target : unicode or None
+            Search argument.
+
+        :return: A future returning the collection of the found objects.
+        :rtype: `CommandFuture`
+        """
+        return self._Add(self._Skype._SearchAsync(ObjectType, Target))
+
+    def SendCommand(self, Command):
+        """Sends an API command. Same as `Skype.SendCommandAsync`.
+
+        :Parameters:
+          Command : `Command`
+            Command to send.
+
+        :return: A future returning the unchecked ``Command.Reply``.
+        :rtype: `CommandFuture`
+        """
+        return self._Add(self._Skype.SendCommandAsync(Command))
+
+    def Wait(self, Timeout=None):
+        """Waits until all commands sent so far are replied to or time out.
+
+        :Parameters:
+          Timeout : float, int, long or None
+            Maximum wait time for every command. None waits until the commands
+            themselves time out.
+
+        :return: True if all commands were completed, False otherwise.
+        :rtype: bool
+        """
+        done = True
+        for future in self._Futures:
+            if not future.wait(Timeout):
+                done = False
+        return done
+
+    def _GetFutures(self):
+        return list(self._Futures)
+
+    Futures = property(_GetFutures,
+    doc="""Futures of all commands sent through the batch so far.
+
+    :type: list of `CommandFuture`
+    """)
+
+
 class Skype(EventHandlingBase):
     """The main class which you have to instantiate to get access to the Skype client
     running currently in the background.
@@ -222,13 +353,26 @@ class Skype(EventHandlingBase):
        which is a superclass of this class.
     """
 
-    def __init__(self, Events=None, **Options):
+    def __init__(self, Events=None, EventPoolSize=DEFAULT_EVENT_POOL_SIZE, EventDelivery=evdPooled,
+                 QueuedEvents=(), EventQueueSize=0, EventQueueOverflow=eqoDropOldest, **Options):
         """Initializes the object.
 
         :Parameters:
           Events
             An optional object with event handlers. See `Skype4Py.utils.EventHandlingBase`
             for more information on events.
+          EventPoolSize : int
+            Maximum number of threads calling the event handlers. Handlers of one event
+            are always called serially, different events are handled concurrently by up
+            to this many threads.
+          EventDelivery : `enums`.evd*
+            Event delivery mode, see `Skype4Py.utils.EventHandlingBase`.
+          QueuedEvents : sequence of str
+            Names of the events to queue in the `enums.evdQueue` mode, see `Events`.
+          EventQueueSize : int
+            Maximum number of queued events, 0 if unbounded.
+          EventQueueOverflow : `enums`.eqo*
+            What to drop when the event queue is full.
           Options
             Additional options for low-level API handler. See the `Skype4Py.api`
             subpackage for supported options. Available options may depend on the
@@ -238,7 +382,8 @@ class Skype(EventHandlingBase):
         self._Logger = logging.getLogger('Skype4Py.skype.Skype')
         self._Logger.info('object created')
 
-        EventHandlingBase.__init__(self)
+        EventHandlingBase.__init__(self, EventPoolSize, EventDelivery, QueuedEvents,
+                                   EventQueueSize, EventQueueOverflow)
         if Events:
             self._SetEventHandlerObject(Events)
 
@@ -253,7 +398,9 @@ class Skype(EventHandlingBase):
         Cached._CreateOwner(self)
 
         self._Cache = True
-        self.ResetCache()
+        self._CacheDict = PropertyCache()
+        self._CachePolicy = CachePolicy()
+        self._Rosters = []
 
         from api import DEFAULT_TIMEOUT
         self._Timeout = DEFAULT_TIMEOUT
@@ -271,18 +418,131 @@ class Skype(EventHandlingBase):
 
         self._Logger.info('object destroyed')
 
-    def _DoCommand(self, Cmd, ExpectedReply=''):
-        command = Command(Cmd, ExpectedReply, True, self.Timeout)
-        self.SendCommand(command)
-        a, b = chop(command.Reply)
-        if a == 'ERROR':
-            errnum, errstr = chop(b)
+    def _CheckReply(self, command):
+        reply = parse(command.Reply)
+        if reply.Verb == 'ERROR':
+            errnum, errstr = chop(reply.Value)
             self._CallEventHandler('Error', command, int(errnum), errstr)
             raise SkypeError(int(errnum), errstr)
-        if not command.Reply.startswith(command.Expected):
+        if not reply.startswith(command.Expected):
             raise SkypeError(0, 'Unexpected reply from Skype, got [%s], expected [%s (...)]' % \
                 (command.Reply, command.Expected))
-        return command.Reply
+        return reply
+
+    def _DoCommand(self, Cmd, ExpectedReply=''):
+        command = Command(Cmd, ExpectedReply, True, self.Timeout)
+        self.SendCommand(command)
+        return self._CheckReply(command)
+
+    def _DoCommandAsync(self, Cmd, ExpectedReply='', Convert=None):
+        command = Command(Cmd, ExpectedReply, False, self.Timeout)
+        if Convert is None:
+            convert = self._CheckReply
+        else:
+            convert = lambda command: Convert(self._CheckReply(command))
+        future = CommandFuture(command, convert)
+        self.SendCommand(command)
+        return future
+
+    def _PropertyReply(self, Key, Reply, Cache=True, Token=None):
+        reply = parse(Reply)
+        if (reply.ObjectType, reply.ObjectId, reply.PropName) == Key:
+            value = reply.Value
+            arg = None
+        else:
+            arg = ('%s %s %s' % Key).split()
+            value = Reply
+        while arg:
+            try:
+                a, b = chop(value)
+            except ValueError:
+                break
+            if a.lower() != arg[0].lower():
+                break
+            del arg[0]
+            value = b
+        if Cache and self._Cache:
+            self._CacheProperty(Key, value, Token)
+        return value
+
+    def _CacheProperty(self, Key, Value, Token=None):
+        # Token is given if the value is a reply to a query started by _BeginQuery.
+        policy = self._CachePolicy.lookup(Key[0], Key[2])
+        if policy is CACHE_DEFAULT:
+            self._CacheDict.set(Key, Value, token=Token)
+        elif policy != CACHE_NEVER:
+            self._CacheDict.set(Key, Value, policy, Token)
+
+    def _IsCached(self, Key, Cache):
+        return Cache and self._Cache and self._CachePolicy.lookup(Key[0], Key[2]) != CACHE_NEVER
+
+    def _QueryAsync(self, Key, Arg, Cache=True):
+        # Sends GET Arg. The reply is converted and cached by the API thread as soon
+        # as it arrives, in order with the notifications, so a notification received
+        # after the reply is never overwritten by it.
+        return self._DoCommandAsync('GET %s' % Arg, Arg,
+                                    lambda reply: self._PropertyReply(Key, reply, Cache))
+
+    def _Revalidate(self, Key, Arg):
+        # Refreshes a tentative value loaded by LoadCache in the background.
+        if self._CacheDict.tentative and self._CacheDict.confirm(Key):
+            try:
+                future = self._QueryAsync(Key, Arg)
+            except SkypeAPIError:
+                return
+            future.add_done_callback(self._RevalidateDone)
+
+    @staticmethod
+    def _RevalidateDone(Future):
+        try:
+            Future.result()
+        except (SkypeError, SkypeAPIError):
+            pass
+
+    def _PropertyAsync(self, ObjectType, ObjectId, PropName, Cache=True):
+        h = (str(ObjectType), str(ObjectId), str(PropName))
+        jarg = ' '.join(('%s %s %s' % h).split())
+        if self._IsCached(h, Cache):
+            value = self._CacheDict.get(h, CommandFuture)
+            if value is not CommandFuture:
+                self._Revalidate(h, jarg)
+                future = CommandFuture(None, lambda command, value=value: value)
+                future.set_done()
+                return future
+        return self._QueryAsync(h, jarg, Cache)
+
+    def _Prefetch(self, ObjectType, Handles, PropNames, Values=False):
+        # Queries properties of many objects keeping up to PREFETCH_WINDOW queries in
+        # flight. Properties already cached are skipped unless Values is True, then
+        # the values of all properties are returned in the order of the handles and
+        # property names.
+        if ObjectType is None:
+            raise TypeError('objects have no properties to prefetch')
+        values = []
+        pending = deque()
+        error = None
+        for handle in Handles:
+            for prop_name in PropNames:
+                h = (ObjectType, str(handle), str(prop_name))
+                if not Values and (not self._IsCached(h, True) or h in self._CacheDict):
+                    continue
+                pending.append(self._PropertyAsync(*h))
+                # The values are cached when the replies arrive, the results are only
+                # collected to limit the number of queries in flight and for errors.
+                while len(pending) > PREFETCH_WINDOW or (pending and pending[0].done()):
+                    try:
+                        values.append(pending.popleft().result())
+                    except SkypeError, e:
+                        error = error or e
+        while pending:
+            try:
+                values.append(pending.popleft().result())
+            except SkypeError, e:
+                error = error or e
+        if error is not None:
+            raise error
+        if Values:
+            return values
 
     def _Property(self, ObjectType, ObjectId, PropName, Set=None, Cache=True):
         h = (str(ObjectType), str(ObjectId), str(PropName))
@@ -291,26 +551,37 @@ class Skype(EventHandlingBase):
             arg.remove('')
         jarg = ' '.join(arg)
         if Set is None: # Get
-            if Cache and self._Cache and h in self._CacheDict:
-                return self._CacheDict[h]
-            value = self._DoCommand('GET %s' % jarg, jarg)
-            while arg:
+            if self._IsCached(h, Cache):
                 try:
-                    a, b = chop(value)
-                except ValueError:
-                    break
-                if a.lower() != arg[0].lower():
-                    break
-                del arg[0]
-                value = b
-            if Cache and self._Cache:
-                self._CacheDict[h] = value
-            return value
+                    value = self._CacheDict[h]
+                except KeyError:
+                    pass
+                else:
+                    self._Revalidate(h, jarg)
+                    return value
+            else:
+                return self._PropertyReply(h, self._DoCommand('GET %s' % jarg, jarg), False)
+            # A blocking command, some transports only receive the replies to those
+            # while the caller waits. The reply is cached on this thread, a notification
+            # received after the query was sent is newer and takes precedence.
+            token = self._CacheDict.begin_update(h)
+            try:
+                return self._PropertyReply(h, self._DoCommand('GET %s' % jarg, jarg), Cache, token)
+            finally:
+                self._CacheDict.end_update(h, token)
         else: # Set
             value = unicode(Set)
-            self._DoCommand('SET %s %s' % (jarg, value), jarg)
-            if Cache and self._Cache:
-                self._CacheDict[h] = value
+            if not self._IsCached(h, Cache):
+                self._DoCommand('SET %s %s' % (jarg, value), jarg)
+                return
+            # The value is cached on this thread after the reply, a notification
+            # received meanwhile (the client may adjust the value) takes precedence.
+            token = self._CacheDict.begin_update(h)
+            try:
+                self._DoCommand('SET %s %s' % (jarg, value), jarg)
+                self._CacheProperty(h, value, token)
+            finally:
+                self._CacheDict.end_update(h, token)
 
     def _Alter(self, ObjectType, ObjectId, AlterName, Args=None, Reply=None):
         cmd = 'ALTER %s %s %s' % (str(ObjectType), str(ObjectId), str(AlterName))
@@ -331,6 +602,22 @@ class Skype(EventHandlingBase):
             reply = b
         return reply
 
+    def _SearchCommand(self, ObjectType, Target):
+        ObjectType = str(ObjectType).upper()
+        try:
+            collection = SEARCH_TYPES[ObjectType]
+        except KeyError:
+            raise ValueError('unknown search target: %s' % ObjectType)
+        cmd = 'SEARCH %s' % ObjectType
+        if Target is not None:
+            cmd = '%s %s' % (cmd, tounicode(Target))
+        return cmd, collection
+
+    def _SearchAsync(self, ObjectType, Target=None):
+        cmd, collection = self._SearchCommand(ObjectType, Target)
+        return self._DoCommandAsync(cmd, '',
+            lambda reply: collection(self, split(chop(str(reply))[-1], ', ')))
+
     def _Search(self, ObjectType, Args=None):
         cmd = 'SEARCH %s' % ObjectType
         if Args is not None:
@@ -338,6 +625,23 @@ class Skype(EventHandlingBase):
         # It is safe to do str() as none of the searchable objects use non-ascii chars.
         return split(chop(str(self._DoCommand(cmd)))[-1], ', ')
 
+    def _IterSearchReply(self, Type, Reply):
+        # Yields the objects listed in the reply one at a time without splitting
+        # the whole reply first.
+        end = Reply.find(' ')
+        if end < 0:
+            return
+        size = len(Reply)
+        while end < size:
+            start = end + 1
+            end = Reply.find(',', start)
+            if end < 0:
+                end = size
+            # It is safe to do str() as none of the searchable objects use non-ascii chars.
+            handle = str(Reply[start:end].strip())
+            if handle:
+                yield Type(self, handle)
+
     def ApiSecurityContextEnabled(self, Context):
         """Queries if an API security context for Internet Explorer is enabled.
 
@@ -364,14 +668,14 @@ class Skype(EventHandlingBase):
         """
         return Application(self, Name)
 
-    def _AsyncSearchUsersReplyHandler(self, Command):
-        if Command in self._AsyncSearchUsersCommands:
-            self._AsyncSearchUsersCommands.remove(Command)
-            self._CallEventHandler('AsyncSearchUsersFinished', Command.Id,
-                UserCollection(self, split(chop(Command.Reply)[-1], ', ')))
-            if len(self._AsyncSearchUsersCommands) == 0:
-                self.UnregisterEventHandler('Reply', self._AsyncSearchUsersReplyHandler)
-                del self._AsyncSearchUsersCommands
+    def _AsyncSearchUsersDone(self, Future):
+        try:
+            users = Future.result()
+        except SkypeError:
+            users = UserCollection(self)
+        except SkypeAPIError:
+            return
+        self._CallEventHandler('AsyncSearchUsersFinished', Future.command.Id, users)
 
     def AsyncSearchUsers(self, Target):
         """Asynchronously searches for Skype users.
@@ -384,14 +688,10 @@ class Skype(EventHandlingBase):
                  `SkypeEvents.AsyncSearchUsersFinished` event after the search is completed.
         :rtype: int
         """
-        if not hasattr(self, '_AsyncSearchUsersCommands'):
-            self._AsyncSearchUsersCommands = []
-            self.RegisterEventHandler('Reply', self._AsyncSearchUsersReplyHandler)
-        command = Command('SEARCH USERS %s' % tounicode(Target), 'USERS', False, self.Timeout)
-        self._AsyncSearchUsersCommands.append(command)
-        self.SendCommand(command)
+        future = self._SearchAsync('USERS', Target)
+        future.add_done_callback(self._AsyncSearchUsersDone)
         # return pCookie - search identifier
-        return command.Id
+        return future.command.Id
 
     def Attach(self, Protocol=5, Wait=True):
         """Establishes a connection to Skype.
@@ -410,6 +710,23 @@ class Skype(EventHandlingBase):
             self.ResetCache()
             raise
 
+    def Batch(self):
+        """Creates a command batch. Commands sent through the batch are not blocking,
+        many of them are in flight at once and their replies are collected as they arrive.
+
+        The batch is a context manager which waits for all its commands on exit:
+
+        .. python::
+
+            with skype.Batch() as batch:
+                names = [batch.Property('USER', x, 'FULLNAME') for x in handles]
+            print [x.result() for x in names]
+
+        :return: A command batch.
+        :rtype: `CommandBatch`
+        """
+        return CommandBatch(self)
+
     def Call(self, Id=0):
         """Queries a call object.
 
@@ -651,6 +968,97 @@ class Skype(EventHandlingBase):
             if v.Type in (vmtDefaultGreeting, vmtCustomGreeting):
                 return v
 
+    def InvalidateObject(self, Object):
+        """Deletes the cached properties of an object. Querying them will get them from
+        the Skype client again.
+
+        :Parameters:
+          Object : `User`, `Call`, `Chat`, `ChatMessage`, ...
+            Object whose properties should be forgotten.
+
+        :return: Number of deleted cache entries.
+        :rtype: int
+        """
+        if Object._ObjectType is None:
+            raise TypeError('%s has no cached properties' % repr(Object))
+        return self._CacheDict.invalidate(Object._ObjectType, str(Object._Handle))
+
+    def InvalidatePrefix(self, ObjectType, Prefix):
+        """Deletes the cached properties of all objects of a type whose ids start with
+        a prefix.
+
+        :Parameters:
+          ObjectType : str
+            Object type ('USER', 'CALL', 'CHAT', 'CHATMESSAGE', ...).
+          Prefix : str
+            Object id prefix.
+
+        :return: Number of deleted cache entries.
+        :rtype: int
+        """
+        return self._CacheDict.invalidate_prefix(str(ObjectType), str(Prefix))
+
+    def InvalidateType(self, ObjectType):
+        """Deletes the cached properties of all objects of a type.
+
+        :Parameters:
+          ObjectType : str
+            Object type ('USER', 'CALL', 'CHAT', 'CHATMESSAGE', ...) or a global object
+            or variable ('PROFILE', 'USERSTATUS', ...).
+
+        :return: Number of deleted cache entries.
+        :rtype: int
+        """
+        return self._CacheDict.invalidate(str(ObjectType))
+
+    def IterSearch(self, ObjectType, Target=None):
+        """Searches for objects and iterates over the results. Unlike the collections
+        returned by `Messages`, `Calls`, `Friends` and other properties, the objects are
+        created one at a time as the iteration proceeds which saves time and memory if
+        there are many of them or if only the first few are needed:
+
+        .. python::
+
+            for message in skype.IterSearch('CHATMESSAGES', chat.Name):
+                if message.Body == 'spam':
+                    break
+
+        The command is sent right away, errors are raised by this method.
+
+        :Parameters:
+          ObjectType : str
+            What to search for, the target of the SEARCH command ('CALLS', 'CHATMESSAGES',
+            'FRIENDS', 'MISSEDCHATMESSAGES', 'GROUPS', ...).
+          Target : unicode or None
+            Search argument, for example the chat name for 'CHATMESSAGES' or the search
+            text for 'USERS'.
+
+        :return: Iterator over the found objects.
+        :rtype: iterator of `User`, `Call`, `ChatMessage`, ...
+        """
+        cmd, collection = self._SearchCommand(ObjectType, Target)
+        return self._IterSearchReply(collection._CachedType, self._DoCommand(cmd))
+
+    def LoadCache(self, Filename, MaxAge=None):
+        """Loads object properties saved by `SaveCache`, typically by a previous run of
+        the program, into the cache.
+
+        The loaded values are returned right away but they are tentative. The first time
+        a loaded value is used, the property is queried from Skype client in the background
+        and the cache is updated when the reply arrives. Notifications about the property
+        update it as usual.
+
+        :Parameters:
+          Filename : str
+            Name of the file.
+          MaxAge : float or None
+            Values saved more than MaxAge seconds ago are ignored.
+
+        :return: Number of loaded values.
+        :rtype: int
+        """
+        return self._CacheDict.load(Filename, MaxAge)
+
     def Message(self, Id=0):
         """Queries a chat message object.
 
@@ -752,8 +1160,49 @@ class Skype(EventHandlingBase):
         This method clears the Skype4Py's internal command cache which means that all objects will forget
         their property values and querying them will trigger a code to get them from Skype client (and
         cache them again).
+
+        Use `InvalidateObject`, `InvalidateType` or `InvalidatePrefix` to forget only
+        a part of the cache.
+        """
+        self._CacheDict.clear()
+
+    def SaveCache(self, Filename):
+        """Saves the cached object properties to a file (an sqlite database) so that they
+        can be loaded by `LoadCache` after a restart.
+
+        :Parameters:
+          Filename : str
+            Name of the file.
+
+        :return: Number of saved values.
+        :rtype: int
         """
-        self._CacheDict = {}
+        return self._CacheDict.save(Filename)
+
+    def SearchAsync(self, ObjectType, Target=None):
+        """Searches for objects without waiting for the reply. Many searches can be in
+        flight at once, each reply is matched with its search by the command id:
+
+        .. python::
+
+            calls = skype.SearchAsync('ACTIVECALLS')
+            messages = skype.SearchAsync('MISSEDCHATMESSAGES')
+            print len(calls.result()), len(messages.result())
+
+        Use ``add_done_callback`` of the future to be called when the search completes
+        instead of waiting for it.
+
+        :Parameters:
+          ObjectType : str
+            What to search for, the target of the SEARCH command, see `IterSearch`.
+          Target : unicode or None
+            Search argument.
+
+        :return: A future returning the found objects as a collection of the right type
+                 (`UserCollection`, `CallCollection`, `ChatMessageCollection`, ...).
+        :rtype: `CommandFuture`
+        """
+        return self._SearchAsync(ObjectType, Target)
 
     def SearchForUsers(self, Target):
         """Searches for users.
@@ -780,6 +1229,25 @@ class Skype(EventHandlingBase):
             self.ResetCache()
             raise
 
+    def SendCommandAsync(self, Command):
+        """Sends an API command without waiting for the reply.
+
+        :Parameters:
+          Command : `Command`
+            Command to send. Use `Command` method to create a command. The command
+            is made non-blocking.
+
+        :return: A future completed when the reply arrives. Its ``result`` method
+                 returns the ``Command.Reply``.
+        :rtype: `CommandFuture`
+
+        :see: `Batch`
+        """
+        Command.Blocking = False
+        future = CommandFuture(Command)
+        self.SendCommand(Command)
+        return future
+
     def SendMessage(self, Username, Text):
         """Sends a chat message.
 
@@ -941,6 +1409,47 @@ class Skype(EventHandlingBase):
     :type: bool
     """)
 
+    def _GetPropertyCache(self):
+        return self._CacheDict
+
+    def _SetPropertyCache(self, Value):
+        self._CacheDict = Value
+
+    PropertyCache = property(_GetPropertyCache, _SetPropertyCache,
+    doc="""Queries/sets the cache of object properties. By default it is an unbounded
+    `cache.PropertyCache`. Set a new one to limit the size of the cache or to make the
+    entries expire, for example:
+
+    .. python::
+
+        skype.PropertyCache = Skype4Py.cache.PropertyCache(max_entries=100000, ttl=3600)
+        print skype.PropertyCache.stats()
+
+    Any object with the same interface can be used instead.
+
+    :type: `cache.PropertyCache`
+    """)
+
+    def _GetCachePolicy(self):
+        return self._CachePolicy
+
+    def _SetCachePolicy(self, Value):
+        self._CachePolicy = CachePolicy(Value)
+
+    CachePolicy = property(_GetCachePolicy, _SetCachePolicy,
+    doc="""Queries/sets the table of per-property cache policies. Maps (object type,
+    property name) tuples to the number of seconds the values are cached for,
+    `cache.CACHE_NEVER` or `cache.CACHE_UNTIL_NOTIFIED`, see `cache.CachePolicy`.
+    The table can be modified in place, for example:
+
+    .. python::
+
+        skype.CachePolicy['USER', 'FULLNAME'] = 3600
+        skype.CachePolicy['CALL', 'DURATION'] = Skype4Py.cache.CACHE_NEVER
+
+    :type: `cache.CachePolicy`
+    """)
+
     def _GetChats(self):
         return ChatCollection(self, self._Search('CHATS'))
 
@@ -1054,6 +1563,15 @@ class Skype(EventHandlingBase):
     :type: `GroupCollection`
     """)
 
+    def _GetEvents(self):
+        return self._EventQueue
+
+    Events = property(_GetEvents,
+    doc="""Queue of fired events if the event delivery mode is `enums.evdQueue`, None otherwise.
+
+    :type: `Skype4Py.utils.EventQueue`
+    """)
+
     def _GetFileTransfers(self):
         return FileTransferCollection(self, self._Search('FILETRANSFERS'))
 
@@ -1215,10 +1733,10 @@ class Skype(EventHandlingBase):
     """)
 
     def _GetSilentMode(self):
-        return self._Property('SILENT_MODE', '', '', Cache=False) == 'ON'
+        return self._Property('SILENT_MODE', '', '') == 'ON'
 
     def _SetSilentMode(self, Value):
-        self._Property('SILENT_MODE', '', '', cndexp(Value, 'ON', 'OFF'), Cache=False)
+        self._Property('SILENT_MODE', '', '', cndexp(Value, 'ON', 'OFF'))
 
     SilentMode = property(_GetSilentMode, _SetSilentMode,
     doc="""Returns/sets Skype silent mode status.
@@ -1738,3 +2256,21 @@ class SkypeEvents(object):
 
 
 Skype._AddEvents(SkypeEvents)
+Skype._StateEvents = {
+    'OnlineStatus': 0,
+    'UserMood': 0,
+    'CallSeenStatusChanged': 0,
+    'ChatMembersChanged': 0,
+    'ChatWindowState': 0,
+    'ApplicationStreams': 0,
+    'GroupVisible': 0,
+    'GroupExpanded': 0,
+    'GroupUsers': 0,
+    'ConnectionStatus': None,
+    'UserStatus': None,
+    'Mute': None,
+    'AutoAway': None,
+    'ClientWindowState': None,
+    'SilentModeStatusChanged': None,
+    'ContactsFocused': None,
+}
@@ -10,6 +10,7 @@ class SmsMessage(Cached):
     """Represents an SMS message.
     """
     _ValidateHandle = int
+    _ObjectType = 'SMS'
 
     def __repr__(self):
         return Cached.__repr__(self, 'Id')
@@ -51,7 +52,7 @@ class SmsMessage(Cached):
     """)
 
     def _GetChunks(self):
-        return SmsChunkCollection(self, xrange(int(chop(self._Property('CHUNKING', Cache=False))[0])))
+        return SmsChunkCollection(self, xrange(int(chop(self._Property('CHUNKING'))[0])))
 
     Chunks = property(_GetChunks,
     doc="""Chunks of this SMS message. More than one if this is a multi-part message.
@@ -234,6 +235,7 @@ class SmsMessage(Cached):
 
 class SmsMessageCollection(CachedCollection):
     _CachedType = SmsMessage
+    _HandleTypecode = 'l'
 
 
 class SmsChunk(Cached):
@@ -245,7 +247,7 @@ class SmsChunk(Cached):
         return Cached.__repr__(self, 'Id', 'Message')
 
     def _GetCharactersLeft(self):
-        count, left = map(int, chop(self.Message._Property('CHUNKING', Cache=False)))
+        count, left = map(int, chop(self.Message._Property('CHUNKING')))
         if self.Id == count - 1:
             return left
         return 0
@@ -11,6 +11,42 @@ class User(Cached):
     """Represents a Skype user.
     """
     _ValidateHandle = str
+    _ObjectType = 'USER'
+    _SnapshotProperties = (
+        ('Handle', None),
+        ('About', 'ABOUT'),
+        ('Birthday', 'BIRTHDAY'),
+        ('BuddyStatus', 'BUDDYSTATUS'),
+        ('CanLeaveVoicemail', 'CAN_LEAVE_VM'),
+        ('City', 'CITY'),
+        ('Country', 'COUNTRY'),
+        ('CountryCode', 'COUNTRY'),
+        ('DisplayName', 'DISPLAYNAME'),
+        ('FullName', 'FULLNAME'),
+        ('HasCallEquipment', 'HASCALLEQUIPMENT'),
+        ('Homepage', 'HOMEPAGE'),
+        ('IsAuthorized', 'ISAUTHORIZED'),
+        ('IsBlocked', 'ISBLOCKED'),
+        ('IsCallForwardActive', 'IS_CF_ACTIVE'),
+        ('IsSkypeOutContact', 'ONLINESTATUS'),
+        ('IsVideoCapable', 'IS_VIDEO_CAPABLE'),
+        ('IsVoicemailCapable', 'IS_VOICEMAIL_CAPABLE'),
+        ('Language', 'LANGUAGE'),
+        ('LanguageCode', 'LANGUAGE'),
+        ('LastOnline', 'LASTONLINETIMESTAMP'),
+        ('MoodText', 'MOOD_TEXT'),
+        ('NumberOfAuthBuddies', 'NROF_AUTHED_BUDDIES'),
+        ('OnlineStatus', 'ONLINESTATUS'),
+        ('PhoneHome', 'PHONE_HOME'),
+        ('PhoneMobile', 'PHONE_MOBILE'),
+        ('PhoneOffice', 'PHONE_OFFICE'),
+        ('Province', 'PROVINCE'),
+        ('ReceivedAuthRequest', 'RECEIVEDAUTHREQUEST'),
+        ('RichMoodText', 'RICH_MOOD_TEXT'),
+        ('Sex', 'SEX'),
+        ('SpeedDial', 'SPEEDDIAL'),
+        ('Timezone', 'TIMEZONE'),
+    )
 
     def __repr__(self):
         return Cached.__repr__(self, 'Handle')
@@ -402,6 +438,9 @@ class User(Cached):
     """)
 
 
+UserSnapshot = snapshot_type(User)
+
+
 class UserCollection(CachedCollection):
     _CachedType = User
 
@@ -410,6 +449,7 @@ class Group(Cached):
     """Represents a group of Skype users.
     """
     _ValidateHandle = int
+    _ObjectType = 'GROUP'
 
     def __repr__(self):
         return Cached.__repr__(self, 'Id')
@@ -524,7 +564,7 @@ class Group(Cached):
     """)
 
     def _GetUsers(self):
-        return UserCollection(self._Owner, split(self._Property('USERS', Cache=False), ', '))
+        return UserCollection(self._Owner, split(self._Property('USERS'), ', '))
 
     Users = property(_GetUsers,
     doc="""Users in this group.
@@ -535,3 +575,4 @@ class Group(Cached):
 
 class GroupCollection(CachedCollection):
     _CachedType = Group
+    _HandleTypecode = 'l'
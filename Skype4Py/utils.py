@@ -7,11 +7,18 @@ import sys
 import weakref
 import threading
 import logging
+import time
+import traceback
+from collections import deque
+from array import array
 from new import instancemethod
 
+from enums import *
+
 
 __all__ = ['tounicode', 'path2unicode', 'unicode2path', 'chop', 'args2dict', 'quote',
-           'split', 'cndexp', 'EventHandlingBase', 'Cached', 'CachedCollection']
+           'split', 'cndexp', 'DEFAULT_EVENT_POOL_SIZE', 'EventHandlingBase', 'Cached',
+           'CachedCollection', 'PropertySnapshot', 'snapshot_type']
 
 
 def tounicode(s):
@@ -190,39 +197,232 @@ def cndexp(condition, truevalue, falsevalue):
     return falsevalue
 
 
-class EventSchedulerThread(threading.Thread):
-    def __init__(self, name, after, handlers, args, kwargs):
+# Default maximum number of threads calling the event handlers of one object.
+DEFAULT_EVENT_POOL_SIZE = 10
+
+# Key of event handler calls which are never coalesced.
+NO_KEY = object()
+
+
+class EventExecutor(object):
+    """Calls event handlers on a bounded number of threads.
+
+    Every event has its own queue of pending calls. The queue is processed by at most
+    one thread at a time so the handlers of one event are called serially and in order
+    while different events are handled concurrently. Threads are started when there is
+    work and a free slot and end when there is no more work.
+    """
+
+    def __init__(self, size=DEFAULT_EVENT_POOL_SIZE):
         """Initializes the object.
-        
+
+        :Parameters:
+          size : int
+            Maximum number of threads.
+        """
+        if size < 1:
+            raise ValueError('event pool size must be at least 1')
+        self.size = size
+        self.lock = threading.Lock()
+        # Event -> deque of [handlers, args, kwargs, key] lists.
+        self.queues = {}
+        # Event -> {key: pending call} mapping of the calls which may be coalesced.
+        self.pending = {}
+        # Events with pending calls not being processed by any thread.
+        self.ready = deque()
+        self.threads = 0
+        self.coalesced = 0
+
+    def submit(self, name, handlers, args, kwargs, key=NO_KEY):
+        """Queues a call of event handlers.
+
         :Parameters:
           name : str
             Event name.
-          after : threading.Thread or None
-            If not None, a thread that needs to end before this
-            one starts.
           handlers : iterable
             Iterable of callable event handlers.
           args : tuple
             Positional arguments for the event handlers.
           kwargs : dict
             Keyword arguments for the event handlers.
-
-        :note: When the thread is started (using the ``start`` method), it iterates over
-               the handlers and calls them with the supplied arguments.
+          key
+            If given, a pending call of this event with the same key is replaced by this
+            one instead of queuing another call. The replaced call keeps its position in
+            the queue.
         """
-        threading.Thread.__init__(self, name='Skype4Py %s event scheduler' % name)
-        self.setDaemon(False)
-        self.after = after
-        self.handlers = handlers
-        self.args = args
-        self.kwargs = kwargs
+        start = False
+        self.lock.acquire()
+        try:
+            queue = self.queues.get(name)
+            if queue is None:
+                queue = self.queues[name] = deque()
+                self.ready.append(name)
+                if self.threads < self.size:
+                    self.threads += 1
+                    start = True
+            if key is NO_KEY:
+                queue.append([handlers, args, kwargs, key])
+            else:
+                pending = self.pending.setdefault(name, {})
+                call = pending.get(key)
+                if call is None:
+                    call = pending[key] = [handlers, args, kwargs, key]
+                    queue.append(call)
+                else:
+                    call[:3] = handlers, args, kwargs
+                    self.coalesced += 1
+        finally:
+            self.lock.release()
+        if start:
+            thread = threading.Thread(target=self.run, name='Skype4Py event executor')
+            thread.start()
 
     def run(self):
-        if self.after:
-            self.after.join()
-            self.after = None # Remove the reference.
-        for handler in self.handlers:
-            handler(*self.args, **self.kwargs)
+        self.lock.acquire()
+        try:
+            while self.ready:
+                name = self.ready.popleft()
+                queue = self.queues[name]
+                handlers, args, kwargs, key = queue.popleft()
+                if key is not NO_KEY:
+                    del self.pending[name][key]
+                self.lock.release()
+                try:
+                    try:
+                        for handler in handlers:
+                            handler(*args, **kwargs)
+                    except:
+                        traceback.print_exc()
+                finally:
+                    self.lock.acquire()
+                if queue:
+                    self.ready.append(name)
+                else:
+                    del self.queues[name]
+                    self.pending.pop(name, None)
+            self.threads -= 1
+        finally:
+            self.lock.release()
+
+
+class EventQueue(object):
+    """Queue of fired events drained by the application. Used if the event delivery
+    mode of an object is `enums.evdQueue`, access using the ``Events`` property of the
+    object, for example `Skype.Events`.
+
+    Events are stored as tuples of the event name, the positional arguments and the
+    keyword arguments, for example ``('OnlineStatus', (user, 'AWAY'), {})``. Only the
+    events named using `subscribe` (or the ``QueuedEvents`` argument of `Skype.__init__`)
+    are queued, the other ones are dropped at once.
+
+    The queue may be bounded. When it is full, the newest or the oldest event is dropped
+    depending on the overflow policy, the number of dropped events is kept in `dropped`.
+    """
+
+    def __init__(self, events=(), maxsize=0, overflow=eqoDropOldest):
+        """Initializes the object.
+
+        :Parameters:
+          events : iterable of str
+            Names of the events to queue.
+          maxsize : int
+            Maximum number of events in the queue, 0 if unbounded.
+          overflow : `enums`.eqo*
+            What to drop when a new event arrives and the queue is full.
+        """
+        if overflow not in (eqoDropNewest, eqoDropOldest):
+            raise ValueError('%s is not a valid overflow policy' % repr(overflow))
+        self.events = frozenset(events)
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self.cond = threading.Condition(threading.Lock())
+        self.queue = deque()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def put(self, event, args, kwargs=None):
+        """Queues an event if subscribed to it.
+
+        :Parameters:
+          event : str
+            Event name.
+          args : tuple
+            Positional event arguments.
+          kwargs : dict or None
+            Keyword event arguments.
+        """
+        if event not in self.events:
+            return
+        self.cond.acquire()
+        try:
+            if self.maxsize and len(self.queue) >= self.maxsize:
+                self.dropped += 1
+                if self.overflow == eqoDropNewest:
+                    return
+                self.queue.popleft()
+            self.queue.append((event, tuple(args), dict(kwargs or {})))
+            self.cond.notify()
+        finally:
+            self.cond.release()
+
+    def get_batch(self, max=500, timeout=None):
+        """Removes events from the queue and returns them.
+
+        :Parameters:
+          max : int
+            Maximum number of events to return.
+          timeout : float or None
+            Number of seconds to wait for the first event. If None, waits until there
+            is an event. If 0, returns immediately.
+
+        :return: List of (event name, arguments, keyword arguments) tuples, empty if the
+                 timeout elapsed before any event was queued.
+        :rtype: list of tuple(str, tuple, dict)
+        """
+        self.cond.acquire()
+        try:
+            if timeout is None:
+                while not self.queue:
+                    self.cond.wait()
+            elif timeout > 0:
+                deadline = time.time() + timeout
+                while not self.queue:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+            popleft = self.queue.popleft
+            return [popleft() for i in xrange(min(max, len(self.queue)))]
+        finally:
+            self.cond.release()
+
+    def subscribe(self, *events):
+        """Starts queuing events.
+
+        :Parameters:
+          events : str
+            Event names.
+        """
+        self.cond.acquire()
+        try:
+            self.events = self.events.union(events)
+        finally:
+            self.cond.release()
+
+    def unsubscribe(self, *events):
+        """Stops queuing events. Events already in the queue stay there.
+
+        :Parameters:
+          events : str
+            Event names.
+        """
+        self.cond.acquire()
+        try:
+            self.events = self.events.difference(events)
+        finally:
+            self.cond.release()
 
 
 class EventHandlingBase(object):
@@ -343,7 +543,39 @@ class EventHandlingBase(object):
        All event handlers are called on separate threads, never on the main one. At any given time,
        there is at most one thread per event calling your handlers. This means that when many events
        of the same type occur at once, the handlers will be called one after another. Different events
-       will be handled simultaneously.
+       will be handled simultaneously by a pool of threads, its size can be set using the
+       ``EventPoolSize`` argument of `Skype.__init__`. Events are queued while all threads of the pool
+       are busy so a handler should not wait for another event to be handled.
+
+    Delivery modes
+    ==============
+
+       The threading described above is the default `enums.evdPooled` delivery mode. The mode can
+       be changed using the ``EventDelivery`` argument of `Skype.__init__`:
+
+       - `enums.evdInline` - Handlers are called directly on the thread which fired the event,
+         usually the thread receiving messages from the Skype client. There is no thread switch
+         but until the handlers return, no other events are handled and no replies to commands
+         are received. In particular the handlers must not send blocking commands, for example
+         by reading object properties not yet in the cache.
+
+       - `enums.evdQueue` - Events are additionally stored in a queue which the application
+         drains in its own loop using the ``Events`` property, for example:
+
+         .. python::
+
+             skype = Skype4Py.Skype(EventDelivery=Skype4Py.evdQueue,
+                                    QueuedEvents=['OnlineStatus', 'MessageStatus'],
+                                    EventQueueSize=10000)
+             skype.Attach()
+             while True:
+                 for name, args, kwargs in skype.Events.get_batch(max=500):
+                     print name, args
+
+         Only the events named by the ``QueuedEvents`` argument or later using
+         `EventQueue.subscribe` are queued. The ``EventQueueSize`` and ``EventQueueOverflow``
+         arguments bound the queue and choose which events are dropped when it is full.
+         Handlers, if any, are called as in the `enums.evdPooled` mode.
     
     Cyclic references note
     ======================
@@ -357,12 +589,42 @@ class EventHandlingBase(object):
     # Initialized by the _AddEvents() class method.
     _EventNames = []
 
-    def __init__(self):
+    # Events reporting the current state of something which may be coalesced. Maps
+    # the event names to the index of the argument identifying the object whose state
+    # is reported or to None if the state is global. Defined by the subclasses.
+    _StateEvents = {}
+
+    def __init__(self, EventPoolSize=DEFAULT_EVENT_POOL_SIZE, EventDelivery=evdPooled,
+                 QueuedEvents=(), EventQueueSize=0, EventQueueOverflow=eqoDropOldest):
         """Initializes the object.
+
+        :Parameters:
+          EventPoolSize : int
+            Maximum number of threads calling the event handlers.
+          EventDelivery : `enums`.evd*
+            Event delivery mode.
+          QueuedEvents : sequence of str
+            Names of the events to queue in the `enums.evdQueue` mode.
+          EventQueueSize : int
+            Maximum number of queued events, 0 if unbounded.
+          EventQueueOverflow : `enums`.eqo*
+            What to drop when the event queue is full.
         """
-        # Event -> EventSchedulerThread object mapping. Use WeakValueDictionary to let the
-        # threads be freed after they are finished.
-        self._EventThreads = weakref.WeakValueDictionary()
+        if EventDelivery not in (evdInline, evdPooled, evdQueue):
+            raise ValueError('%s is not a valid event delivery mode' % repr(EventDelivery))
+        for event in QueuedEvents:
+            if event not in self._EventNames:
+                raise ValueError('%s is not a valid %s event name' % (event, self.__class__.__name__))
+        self._EventDelivery = EventDelivery
+        if EventDelivery == evdInline:
+            self._EventExecutor = None
+        else:
+            self._EventExecutor = EventExecutor(EventPoolSize)
+        if EventDelivery == evdQueue:
+            self._EventQueue = EventQueue(QueuedEvents, EventQueueSize, EventQueueOverflow)
+        else:
+            self._EventQueue = None
+        self._CoalescedEvents = frozenset()
         self._EventHandlerObject = None # Current "Events" object.
         self._DefaultEventHandlers = {} # "On..." handlers.
         self._EventHandlers = {} # "RegisterEventHandler" handlers.
@@ -375,7 +637,7 @@ class EventHandlingBase(object):
     def _CallEventHandler(self, Event, *Args, **KwArgs):
         """Calls all event handlers defined for given Event, additional parameters
         will be passed unchanged to event handlers, all event handlers are fired on
-        separate threads.
+        the threads of the event executor.
         
         :Parameters:
           Event : str
@@ -385,10 +647,27 @@ class EventHandlingBase(object):
           KwArgs
             Keyword arguments for the event handlers.
         """
+        self._DispatchEvent(Event, Args, KwArgs)
+
+    def _DispatchEvent(self, Event, Args, KwArgs, Source=None):
+        """Like `_CallEventHandler` but takes the arguments as a tuple and a dictionary.
+
+        :Parameters:
+          Event : str
+            Name of the event.
+          Args : tuple
+            Positional arguments for the event handlers.
+          KwArgs : dict
+            Keyword arguments for the event handlers.
+          Source
+            If given, identifies what caused the event, for example the name of the
+            changed property. Coalesced events with different sources are kept apart.
+        """
         if Event not in self._EventHandlers:
             raise ValueError('%s is not a valid %s event name' % (Event, self.__class__.__name__))
-        args = map(repr, Args) + ['%s=%s' % (key, repr(value)) for key, value in KwArgs.items()]
-        self.__Logger.debug('calling %s: %s', Event, ', '.join(args))
+        if self.__Logger.isEnabledFor(logging.DEBUG):
+            args = map(repr, Args) + ['%s=%s' % (key, repr(value)) for key, value in KwArgs.items()]
+            self.__Logger.debug('calling %s: %s', Event, ', '.join(args))
         # Get a list of handlers for this event.
         try:
             handlers = [self._DefaultEventHandlers[Event]]
@@ -399,16 +678,42 @@ class EventHandlingBase(object):
         except AttributeError:
             pass
         handlers.extend(self._EventHandlers[Event])
+        if self._EventQueue is not None:
+            self._EventQueue.put(Event, Args, KwArgs)
         # Proceed only if there are handlers.
         if handlers:
-            # Get the last thread for this event.
-            after = self._EventThreads.get(Event, None)
-            # Create a new thread, pass the last one to it so it can wait until it is finished.
-            thread = EventSchedulerThread(Event, after, handlers, Args, KwArgs)
-            # Store a weak reference to the new thread for this event.
-            self._EventThreads[Event] = thread
-            # Start the thread.
-            thread.start()
+            if self._EventExecutor is None:
+                try:
+                    for handler in handlers:
+                        handler(*Args, **KwArgs)
+                except:
+                    traceback.print_exc()
+            elif Event in self._CoalescedEvents:
+                index = self._StateEvents[Event]
+                if index is None:
+                    key = None
+                else:
+                    key = Args[index]
+                if Source is not None:
+                    key = (key, Source)
+                self._EventExecutor.submit(Event, handlers, Args, KwArgs, key)
+            else:
+                self._EventExecutor.submit(Event, handlers, Args, KwArgs)
+
+    def _HasEventHandlers(self, Event):
+        """Checks if any event handlers are defined for given Event. Used to skip
+        preparing the arguments of events nobody listens to.
+
+        :Parameters:
+          Event : str
+            Name of the event.
+
+        :return: True if `_CallEventHandler` would call any handlers.
+        :rtype: bool
+        """
+        return bool(Event in self._DefaultEventHandlers or self._EventHandlers.get(Event) or
+                    hasattr(self._EventHandlerObject, Event) or
+                    (self._EventQueue is not None and Event in self._EventQueue.events))
 
     def RegisterEventHandler(self, Event, Target):
         """Registers any callable as an event handler.
@@ -489,6 +794,40 @@ class EventHandlingBase(object):
         self._EventHandlerObject = Object
         self.__Logger.info('set object: %s', repr(Object))
 
+    def _GetCoalescedEvents(self):
+        return self._CoalescedEvents
+
+    def _SetCoalescedEvents(self, Value):
+        value = frozenset(Value)
+        for event in value:
+            if event not in self._StateEvents:
+                raise ValueError('%s is not a %s state event' % (event, self.__class__.__name__))
+        self._CoalescedEvents = value
+
+    CoalescedEvents = property(_GetCoalescedEvents, _SetCoalescedEvents,
+    doc="""Names of the coalesced events. While the handlers of a coalesced event are busy,
+    a newer event about the same object replaces the older one still waiting in the queue
+    so the handlers see only the latest state. Only events reporting a state can be
+    coalesced, see ``StateEvents``. Has no effect if the event delivery mode is
+    `enums.evdInline`.
+
+    :type: frozenset of str
+    """)
+
+    def _GetStateEvents(self):
+        return frozenset(self._StateEvents)
+
+    StateEvents = property(_GetStateEvents,
+    doc="""Names of the events which can be coalesced, see ``CoalescedEvents``. To coalesce
+    all of them, use:
+
+    .. python::
+
+        skype.CoalescedEvents = skype.StateEvents
+
+    :type: frozenset of str
+    """)
+
     @classmethod
     def _AddEvents(cls, Class):
         """Adds events based on the attributes of the given ``...Events`` class.
@@ -525,6 +864,16 @@ class Cached(object):
     # which is called by classmethod__new__ to validate the handle passed to
     # it before it is stored in the instance.
 
+    # Type of the Skype API object represented by the class, used to access
+    # the cached properties of the object. None if the class doesn't represent
+    # an API object.
+    _ObjectType = None
+
+    # Tuple of (attribute name, API property name) pairs of the properties which
+    # can be included in a snapshot, see snapshot_type. The API property name is
+    # None if the attribute doesn't need a query.
+    _SnapshotProperties = ()
+
     def __new__(cls, Owner, Handle):
         Handle = cls._ValidateHandle(Handle)
         key = (cls, Handle)
@@ -573,18 +922,185 @@ class Cached(object):
         """
         Object._ObjectCache = weakref.WeakValueDictionary()
 
+    def Prefetch(self, *PropNames):
+        """Queries many properties of the object at once and caches them, so that
+        reading them afterwards doesn't wait for Skype. The commands are sent without
+        waiting for the replies.
+
+        :Parameters:
+          PropNames : str
+            Names of the Skype API properties, for example 'FULLNAME', 'ONLINESTATUS'.
+
+        :raise SkypeError: If Skype replied with an error to any of the commands. The
+                           other properties are still cached.
+        """
+        self._Owner._Prefetch(self._ObjectType, [self._Handle], PropNames)
+
+    def Snapshot(self, Props=None):
+        """Returns a read-only record of the current property values. The properties are
+        queried at once (see `Prefetch`) and converted to their types only once. The record
+        holds no reference to the object and can be passed to other threads or pickled.
+
+        :Parameters:
+          Props : sequence of str or None
+            Names of the attributes to include, for example ['FullName', 'OnlineStatus'].
+            None includes all properties supported by the class.
+
+        :return: Record of the property values, an instance of the ``<class>Snapshot``
+                 subclass of `PropertySnapshot`.
+        :rtype: `PropertySnapshot`
+        """
+        return _snapshots(self._Owner, self.__class__, [self._Handle], Props)[0]
+
+
+class PropertySnapshot(object):
+    """Base class of the read-only records returned by `Cached.Snapshot`. Subclasses are
+    created by `snapshot_type`; their attributes are the properties of the object they
+    were taken of. Accessing a property which wasn't included in the snapshot raises
+    AttributeError.
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, Name, Value):
+        raise AttributeError('%s is read-only' % self.__class__.__name__)
+
+    def __delattr__(self, Name):
+        raise AttributeError('%s is read-only' % self.__class__.__name__)
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__ if hasattr(self, name))
+
+    def __setstate__(self, State):
+        for name, value in State.items():
+            object.__setattr__(self, name, value)
+
+    def __eq__(self, Other):
+        return self.__class__ is Other.__class__ and self.__getstate__() == Other.__getstate__()
+
+    def __ne__(self, Other):
+        return not self.__eq__(Other)
+
+    def __repr__(self):
+        return '<%s.%s with %s>' % (self.__class__.__module__, self.__class__.__name__,
+            ', '.join('%s=%s' % (name, repr(getattr(self, name)))
+                      for name in self.__slots__ if hasattr(self, name)))
+
+
+def snapshot_type(cls):
+    """Creates the snapshot record type of a `Cached` subclass with a
+    ``_SnapshotProperties`` table. The type has to be assigned to a module level
+    name ``<class>Snapshot`` in the module of the class so that the records can
+    be pickled.
+
+    :Parameters:
+      cls : type
+        `Cached` subclass.
+
+    :return: `PropertySnapshot` subclass.
+    :rtype: type
+    """
+    name = '%sSnapshot' % cls.__name__
+    record = type(name, (PropertySnapshot,), {
+        '__slots__': tuple(x[0] for x in cls._SnapshotProperties),
+        '__module__': cls.__module__,
+        '__doc__': 'Read-only record of the properties of a `%s`, see `Cached.Snapshot`.' % cls.__name__,
+    })
+    cls._SnapshotType = record
+    return record
+
+
+class _SnapshotSource(object):
+    # Stands for a Cached object while its property getters convert the raw values
+    # fetched by _snapshots, so the fields are converted exactly like the properties
+    # without querying them again.
+
+    __slots__ = ('_Object', '_Values')
+
+    def __init__(self, Object, Values):
+        self._Object = Object
+        self._Values = Values
+
+    def _Property(self, PropName, *Args, **KwArgs):
+        try:
+            return self._Values[PropName]
+        except KeyError:
+            return self._Object._Property(PropName, *Args, **KwArgs)
+
+    def __getattr__(self, Name):
+        prop = getattr(self._Object.__class__, Name, None)
+        if isinstance(prop, property):
+            return prop.fget(self)
+        return getattr(self._Object, Name)
+
+
+def _snapshots(Owner, Type, Handles, Props):
+    if not Type._SnapshotProperties:
+        raise TypeError('%s objects have no snapshots' % Type.__name__)
+    props = dict(Type._SnapshotProperties)
+    if Props is None:
+        names = [x[0] for x in Type._SnapshotProperties]
+    else:
+        names = list(Props)
+        for name in names:
+            if name not in props:
+                raise ValueError('%s is not a snapshot property of %s' % (name, Type.__name__))
+    prop_names = []
+    for name in names:
+        if props[name] is not None and props[name] not in prop_names:
+            prop_names.append(props[name])
+    # The values of all properties, cached or not, in one pipelined pass.
+    values = Owner._Prefetch(Type._ObjectType, Handles, prop_names, True)
+    count = len(prop_names)
+    record_type = Type._SnapshotType
+    set_field = object.__setattr__
+    records = []
+    for i, handle in enumerate(Handles):
+        source = _SnapshotSource(Type(Owner, handle),
+                                 dict(zip(prop_names, values[i * count:(i + 1) * count])))
+        record = record_type.__new__(record_type)
+        for name in names:
+            set_field(record, name, getattr(source, name))
+        records.append(record)
+    return records
+
 
 class CachedCollection(object):
     """
     """
     _CachedType = Cached
-    
+
+    # Type code of the array storing the handles or None if they are stored in
+    # a list. Collections of objects with integer handles use 'l' arrays which
+    # take a fraction of the memory of a list of int objects.
+    _HandleTypecode = None
+
     def __init__(self, Owner, Handles=[], Items=[]):
         self._Owner = Owner
-        self._Handles = map(self._CachedType._ValidateHandle, Handles)
+        self._Handles = self._MakeHandles(Handles)
+        # Maps handles to their first positions, built by _Lookup when needed
+        # and dropped by _Changed when the handles change.
+        self._Index = None
         for item in Items:
             self.append(item)
 
+    def _MakeHandles(self, Handles):
+        handles = map(self._CachedType._ValidateHandle, Handles)
+        if self._HandleTypecode is None:
+            return handles
+        return array(self._HandleTypecode, handles)
+
+    def _Changed(self):
+        self._Index = None
+
+    def _Lookup(self):
+        index = self._Index
+        if index is None:
+            handles = self._Handles
+            index = dict(zip(reversed(handles), xrange(len(handles) - 1, -1, -1)))
+            self._Index = index
+        return index
+
     def _AssertItem(self, Item):
         if not isinstance(Item, self._CachedType):
             raise TypeError('expected %s instance' % repr(self._CachedType))
@@ -613,24 +1129,27 @@ class CachedCollection(object):
             for it in Item:
                 self._AssertItem(it)
                 handles.append(it._Handle)
-            self._Handlers[Key] = handles
+            self._Handles[Key] = self._MakeHandles(handles)
         else:
             self._AssertItem(Item)
             self._Handles[Key] = Item._Handle
+        self._Changed()
 
     def __delitem__(self, Key):
         del self._Handles[Key]
+        self._Changed()
 
     def __iter__(self):
+        cls, owner = self._CachedType, self._Owner
         for handle in self._Handles:
-            yield self._CachedType(self._Owner, handle)
+            yield cls(owner, handle)
 
     def __contains__(self, Item):
         try:
             self._AssertItem(Item)
         except TypeError:
             return False
-        return (Item._Handle in self._Handles)
+        return (Item._Handle in self._Lookup())
 
     def __add__(self, Other):
         self._AssertCollection(Other)
@@ -640,6 +1159,7 @@ class CachedCollection(object):
     def __iadd__(self, Other):
         self._AssertCollection(Other)
         self._Handles += Other._Handles
+        self._Changed()
         return self
 
     def __mul__(self, Times):
@@ -648,8 +1168,18 @@ class CachedCollection(object):
 
     def __imul__(self, Times):
         self._Handles *= Times
+        self._Changed()
         return self
-        
+
+    def __or__(self, Other):
+        return self.union(Other)
+
+    def __and__(self, Other):
+        return self.intersection(Other)
+
+    def __sub__(self, Other):
+        return self.difference(Other)
+
     def __copy__(self):
         obj = self.__class__(self._Owner)
         obj._Handles = self._Handles[:]
@@ -660,6 +1190,7 @@ class CachedCollection(object):
         """
         self._AssertItem(item)
         self._Handles.append(item._Handle)
+        self._Changed()
 
     def count(self, item):
         """
@@ -671,7 +1202,10 @@ class CachedCollection(object):
         """
         """
         self._AssertItem(item)
-        return self._Handles.index(item._Handle)
+        try:
+            return self._Lookup()[item._Handle]
+        except KeyError:
+            raise ValueError('%s is not in the collection' % repr(item))
 
     def extend(self, seq):
         """
@@ -683,22 +1217,27 @@ class CachedCollection(object):
         """
         self._AssertItem(item)
         self._Handles.insert(index, item._Handle)
+        self._Changed()
 
     def pop(self, pos=-1):
         """
         """
-        return self._CachedType(self._Owner, self._Handles.pop(pos))
+        handle = self._Handles.pop(pos)
+        self._Changed()
+        return self._CachedType(self._Owner, handle)
 
     def remove(self, item):
         """
         """
         self._AssertItem(item)
         self._Handles.remove(item._Handle)
+        self._Changed()
 
     def reverse(self):
         """
         """
         self._Handles.reverse()
+        self._Changed()
 
     def sort(self, cmp=None, key=None, reverse=False):
         """
@@ -707,7 +1246,59 @@ class CachedCollection(object):
             wrapper = lambda x: self._CachedType(self._Owner, x)
         else:
             wrapper = lambda x: key(self._CachedType(self._Owner, x))
-        self._Handles.sort(cmp, wrapper, reverse)
+        handles = list(self._Handles)
+        handles.sort(cmp, wrapper, reverse)
+        self._Handles[:] = self._MakeHandles(handles)
+        self._Changed()
+
+    def union(self, other):
+        """Returns a collection of the objects in this or the other collection. The
+        order of the objects is kept, objects of this collection go first, duplicates
+        are removed.
+
+        :Parameters:
+          other : `CachedCollection`
+            Collection of the same type.
+
+        :rtype: `CachedCollection`
+        """
+        self._AssertCollection(other)
+        seen = set()
+        handles = [x for x in self._Handles if x not in seen and not seen.add(x)]
+        handles.extend(x for x in other._Handles if x not in seen and not seen.add(x))
+        return self.__class__(self._Owner, handles)
+
+    def intersection(self, other):
+        """Returns a collection of the objects in both this and the other collection,
+        in the order of this collection, without duplicates.
+
+        :Parameters:
+          other : `CachedCollection`
+            Collection of the same type.
+
+        :rtype: `CachedCollection`
+        """
+        self._AssertCollection(other)
+        index = other._Lookup()
+        seen = set()
+        return self.__class__(self._Owner, [x for x in self._Handles
+                                            if x in index and x not in seen and not seen.add(x)])
+
+    def difference(self, other):
+        """Returns a collection of the objects in this collection which are not in the
+        other collection, in the order of this collection, without duplicates.
+
+        :Parameters:
+          other : `CachedCollection`
+            Collection of the same type.
+
+        :rtype: `CachedCollection`
+        """
+        self._AssertCollection(other)
+        index = other._Lookup()
+        seen = set()
+        return self.__class__(self._Owner, [x for x in self._Handles
+                                            if x not in index and x not in seen and not seen.add(x)])
 
     def Add(self, Item):
         """
@@ -729,6 +1320,43 @@ class CachedCollection(object):
         """
         return self[Index]
 
+    def Prefetch(self, *PropNames):
+        """Queries properties of all objects in the collection at once and caches them,
+        so that reading them afterwards doesn't wait for Skype. The commands are sent
+        without waiting for the replies which is much faster than querying the objects
+        one by one:
+
+        .. python::
+
+            friends = skype.Friends
+            friends.Prefetch('FULLNAME', 'ONLINESTATUS')
+            for user in friends:
+                print user.FullName, user.OnlineStatus
+
+        :Parameters:
+          PropNames : str
+            Names of the Skype API properties, for example 'FULLNAME', 'ONLINESTATUS'.
+
+        :raise SkypeError: If Skype replied with an error to any of the commands. The
+                           other properties are still cached.
+        """
+        self._Owner._Prefetch(self._CachedType._ObjectType, self._Handles, PropNames)
+
+    def Snapshot(self, Props=None):
+        """Returns read-only records of the current property values of all objects in the
+        collection. The properties of all the objects are queried at once, see
+        `Cached.Snapshot`.
+
+        :Parameters:
+          Props : sequence of str or None
+            Names of the attributes to include. None includes all properties supported
+            by the class.
+
+        :return: Records of the property values in the order of the collection.
+        :rtype: list of `PropertySnapshot`
+        """
+        return _snapshots(self._Owner, self._CachedType, self._Handles, Props)
+
     def _GetCount(self):
         return len(self)
 
@@ -12,6 +12,7 @@ class Voicemail(Cached, DeviceMixin):
     """Represents a voicemail.
     """
     _ValidateHandle = int
+    _ObjectType = 'VOICEMAIL'
 
     def __repr__(self):
         return Cached.__repr__(self, 'Id')
@@ -174,3 +175,4 @@ class Voicemail(Cached, DeviceMixin):
 
 class VoicemailCollection(CachedCollection):
     _CachedType = Voicemail
+    _HandleTypecode = 'l'
@@ -30,6 +30,10 @@ if path:
 sys.skype4py_setup = True
 
 
+# Modules of the Skype4Py.api subpackage installed on every platform.
+SHARED_API_MODULES = ('sim', 'replay')
+
+
 class install_lib(old_install_lib):
     """Handles the 'install_lib' command.
 
@@ -65,10 +69,11 @@ class install_lib(old_install_lib):
 
         # Scan the <build_dir>/Skype4Py/api directory and remove all files
         # which names do not start with either '__' (for __init__) or the
-        # detected platform.
+        # detected platform. The platform independent transports are kept.
         path = os.path.join(self.build_dir, os.path.join('Skype4Py', 'api'))
         for name in os.listdir(path):
-            if not (name.startswith('__') or name.startswith(platform)):
+            if not (name.startswith('__') or name.startswith(platform) or
+                    os.path.splitext(name)[0] in SHARED_API_MODULES):
                 os.remove(os.path.join(path, name))
 
 
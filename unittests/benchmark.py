@@ -0,0 +1,559 @@
+"""Skype4Py microbenchmarks.
+
+Run from this directory. Without arguments all benchmarks are run, otherwise
+only the named ones, for example::
+
+    python benchmark.py command_table
+"""
+
+import sys
+import os
+import time
+import tempfile
+
+# Add the parent directory to the top of the search paths list so the
+# distribution copy of the Skype4Py module can be imported instead of
+# the installed one.
+sys.path.insert(0, os.path.abspath('..'))
+
+from Skype4Py.api import Command, SkypeAPIBase
+
+
+def report(name, count, seconds):
+    print '  %-40s %10.2f us/op (%d ops, %.3f s)' % \
+        (name, seconds * 1e6 / count, count, seconds)
+
+
+def bench_collection(count=100000, lookups=10000):
+    '''Tests lookups random messages for membership in a collection of
+    count messages by scanning a list of handles the old way and using the
+    ChatMessageCollection index, then diffs it with a half-overlapping one.
+    '''
+    import random
+    import Skype4Py
+    from Skype4Py.api import sim
+    from Skype4Py.chat import ChatMessage, ChatMessageCollection
+    skype = Skype4Py.Skype(Api=sim.SkypeAPI({'Contacts': 0}))
+    rand = random.Random(0)
+    handles = range(1000000, 1000000 + count)
+    probes = [ChatMessage(skype, 1000000 + rand.randrange(count * 2)) for i in xrange(lookups)]
+    size = sys.getsizeof(handles) + sum(sys.getsizeof(x) for x in handles)
+    print '  %-40s %10.1f bytes/handle' % ('list, size', float(size) / count)
+    t = time.time()
+    for probe in probes[:lookups // 100]:
+        probe._Handle in handles
+    report('list, in', lookups // 100, time.time() - t)
+    messages = ChatMessageCollection(skype, handles)
+    print '  %-40s %10.1f bytes/handle' % ('array, size', float(sys.getsizeof(messages._Handles)) / count)
+    t = time.time()
+    for probe in probes:
+        probe in messages
+    report('ChatMessageCollection, in', lookups, time.time() - t)
+    other = ChatMessageCollection(skype, handles[count // 2:] +
+                                  range(1000000 + count, 1000000 + count * 3 // 2))
+    t = time.time()
+    messages - other
+    report('ChatMessageCollection, difference', count, time.time() - t)
+
+
+def bench_command_table(count=10000):
+    '''Allocates ids for count in-flight commands, then pops them as if
+    the replies arrived in reverse order.
+    '''
+    api = SkypeAPIBase()
+    commands = [Command('GET USER user%d FULLNAME' % i) for i in xrange(count)]
+    t = time.time()
+    for command in commands:
+        api.push_command(command)
+    report('push_command, %d in flight' % count, count, time.time() - t)
+    t = time.time()
+    for command in reversed(commands):
+        api.pop_command(command.Id)
+    report('pop_command', count, time.time() - t)
+    # Again, now with ids wrapping around while half of them are in flight.
+    api.next_id = 0
+    for command in commands[::2]:
+        command.Id = -1
+        api.push_command(command)
+    api.next_id = 0
+    t = time.time()
+    for command in commands[1::2]:
+        command.Id = -1
+        api.push_command(command)
+    report('push_command, wrapped ids', count // 2, time.time() - t)
+
+
+def bench_x11_framing(size=65536, count=20):
+    '''Reassembles and slices size bytes long X11 messages.
+    '''
+    try:
+        from Skype4Py.api import posix_x11
+    except (ImportError, OSError), err:
+        print '  skipped: %s' % err
+        return
+    message = (u'CHATMESSAGE 1234 BODY ' + u'\u0105bc' * size)[:size]
+    # Received events, the chunks are read back from the structures by the
+    # receive loops so they are truncated at the null terminator.
+    begin, middle = 1, 2
+    events = []
+    for chunk in posix_x11.encode_message(message):
+        event = posix_x11.XEvent()
+        event.xclient.message_type = events and middle or begin
+        event.xclient.data = chunk
+        events.append(event)
+    t = time.time()
+    for i in xrange(count):
+        # The receive loop before MessageDecoder.
+        data = ''
+        for event in events:
+            if event.xclient.message_type == begin:
+                data = str(event.xclient.data)
+            elif event.xclient.message_type == middle:
+                if data != '':
+                    data += str(event.xclient.data)
+            if len(event.xclient.data) != 20 and data:
+                cmd = data.decode('utf-8')
+                data = ''
+        assert cmd == message
+    report('receiving, string concatenation', count, time.time() - t)
+    t = time.time()
+    for i in xrange(count):
+        feed = posix_x11.MessageDecoder().feed
+        for event in events:
+            xclient = event.xclient
+            message_type = xclient.message_type
+            if message_type != begin and message_type != middle:
+                continue
+            cmd = feed(xclient.data, message_type == begin)
+        assert cmd == message
+    report('receiving, MessageDecoder', count, time.time() - t)
+    event = posix_x11.XEvent()
+    t = time.time()
+    for i in xrange(count):
+        data = message.encode('utf-8') + '\x00'
+        for j in xrange(0, len(data), 20):
+            event.xclient.data = data[j:j + 20]
+    report('sending, slice per event', count, time.time() - t)
+    t = time.time()
+    for i in xrange(count):
+        for chunk in posix_x11.encode_message(message):
+            event.xclient.data = chunk
+    report('sending, encode_message', count, time.time() - t)
+
+
+def bench_cache(count=100000):
+    '''Stores count property values and reads them back from a plain
+    dictionary and from property caches with various limits.
+    '''
+    from Skype4Py.cache import PropertyCache
+    keys = [('USER', 'user%d' % i, 'FULLNAME') for i in xrange(count)]
+    for name, cache in (('dict', {}),
+                        ('PropertyCache', PropertyCache()),
+                        ('PropertyCache, ttl', PropertyCache(ttl=3600)),
+                        ('PropertyCache, max_entries', PropertyCache(max_entries=count // 2)),
+                        ('PropertyCache, max_bytes', PropertyCache(max_bytes=count * 30))):
+        t = time.time()
+        for key in keys:
+            cache[key] = u'Full Name'
+        report('%s, set' % name, count, time.time() - t)
+        t = time.time()
+        for key in keys:
+            cache.get(key)
+        report('%s, get' % name, count, time.time() - t)
+
+
+def bench_chatsync(chats=10, history=500, new=5, latency=0.0005):
+    '''Polls chats with history messages each after new messages arrived in
+    every chat, reading the bodies of all messages and of the new ones found
+    by a ChatSync, from a simulated client replying after latency seconds.
+    '''
+    import Skype4Py
+    from Skype4Py.api import sim
+    model = sim.SkypeModel(contacts=chats, seed=0)
+    names = [model.add_chat(['user%d' % i]) for i in xrange(chats)]
+    for name in names:
+        for i in xrange(history):
+            model.add_message(name, model.objects['CHAT', name]['MEMBERS'][1], u'old %d' % i)
+    api = sim.SkypeAPI({'Model': model, 'Latency': latency})
+    skype = Skype4Py.Skype(Api=api)
+    skype.Attach()
+    sync = Skype4Py.ChatSync(skype)
+    sync.Sync()
+    for name in names:
+        for i in xrange(new):
+            model.add_message(name, model.objects['CHAT', name]['MEMBERS'][1], u'new %d' % i)
+    skype.ResetCache()
+    t = time.time()
+    for chat in skype.Chats:
+        for message in chat.Messages:
+            message.Body
+    report('Chat.Messages, per poll', 1, time.time() - t)
+    skype.ResetCache()
+    t = time.time()
+    for chat, messages in sync.Sync():
+        for message in messages:
+            message.Body
+    report('ChatSync, per poll', 1, time.time() - t)
+    api.close()
+
+
+def bench_coalescing(count=20000, users=1000):
+    '''Dispatches a presence flood of count notifications about users
+    contacts to a slow OnlineStatus handler with and without coalescing.
+    '''
+    import Skype4Py
+    from Skype4Py.api import sim
+    notifications = [u'USER user%d ONLINESTATUS %s' % (i % users, ('ONLINE', 'AWAY')[i % 2])
+                     for i in xrange(count)]
+    for coalesce in (False, True):
+        skype = Skype4Py.Skype(Api=sim.SkypeAPI({'Contacts': 0}))
+        if coalesce:
+            skype.CoalescedEvents = ['OnlineStatus']
+        calls = [0]
+        def handler(user, status):
+            calls[0] += 1
+            time.sleep(0.0001)
+        skype.RegisterEventHandler('OnlineStatus', handler)
+        notifier = skype._Api.notifier
+        executor = skype._EventExecutor
+        t = time.time()
+        depth = 0
+        for notification in notifications:
+            notifier.notification_received(notification)
+            depth = max(depth, len(executor.queues.get('OnlineStatus', ())))
+        while executor.threads:
+            time.sleep(0.001)
+        report('%s, %d calls, max depth %d' % (('plain', 'coalesced')[coalesce], calls[0], depth),
+               count, time.time() - t)
+
+
+def footprint(*objects):
+    """Returns the total size in bytes of the objects and of all unique objects
+    reachable from them through containers and cache entries.
+    """
+    from Skype4Py.cache import Entry
+    seen = set()
+    size = 0
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.iterkeys())
+            stack.extend(obj.itervalues())
+        elif isinstance(obj, (tuple, list, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, Entry):
+            stack.append(obj.value)
+    return size
+
+
+def bench_memory(contacts=100000):
+    '''Caches the properties of a synthetic roster of contacts users as
+    notified by the client, keyed the way the dispatcher used to (str() of
+    the chopped words) and through Skype4Py.protocol.parse and PropertyCache,
+    and reports the memory used per cached value.
+    '''
+    import random
+    from Skype4Py.utils import chop
+    from Skype4Py.protocol import parse
+    from Skype4Py.cache import PropertyCache
+    rand = random.Random(0)
+    properties = [
+        ('ONLINESTATUS', lambda i: rand.choice(['ONLINE', 'AWAY', 'NA', 'DND', 'OFFLINE'])),
+        ('BUDDYSTATUS', lambda i: rand.choice(['1', '2', '3'])),
+        ('SEX', lambda i: rand.choice(['MALE', 'FEMALE', 'UNKNOWN'])),
+        ('LANGUAGE', lambda i: rand.choice(['en English', 'de German', 'pl Polish'])),
+        ('COUNTRY', lambda i: rand.choice(['us United States', 'de Germany', 'pl Poland'])),
+        ('IS_VIDEO_CAPABLE', lambda i: rand.choice(['TRUE', 'FALSE'])),
+        ('FULLNAME', lambda i: 'Contact Number %d' % i),
+        ('MOOD_TEXT', lambda i: 'mood text of the contact number %d' % i),
+    ]
+    notifications = [u'USER contact%d %s %s' % (i, name, value(i))
+                     for i in xrange(contacts) for name, value in properties]
+    count = len(notifications)
+
+    def done(name, size, seconds):
+        print '  %-40s %10.1f bytes/value (%d values, %.1f MB, %.3f s)' % \
+            (name, float(size) / count, count, size / 1048576.0, seconds)
+
+    t = time.time()
+    cache = {}
+    for notification in notifications:
+        a, b = chop(notification)
+        object_type, object_id, prop_name, value = [a] + chop(b, 2)
+        cache[str(object_type), str(object_id), str(prop_name)] = value
+    done('dict, chopped words', footprint(cache), time.time() - t)
+    del cache
+    t = time.time()
+    cache = PropertyCache()
+    for notification in notifications:
+        message = parse(notification)
+        cache[message.ObjectType, message.ObjectId, message.PropName] = message.Value
+    done('PropertyCache, parse', footprint(cache.data, cache.index), time.time() - t)
+
+
+def bench_parser(count=100000):
+    '''Tokenizes count notifications and replies the way the transports and
+    the dispatcher used to (slicing the id and chopping the words again in
+    every layer) and using Skype4Py.protocol.parse.
+    '''
+    from Skype4Py.utils import chop
+    from Skype4Py.protocol import parse
+    messages = [u'USER user%d ONLINESTATUS AWAY' % i for i in xrange(count // 2)] + \
+               [u'#%d CHAT #user/$%d TOPIC some topic' % (i, i) for i in xrange(count // 2)]
+    t = time.time()
+    for cmd in messages:
+        if cmd.startswith(u'#'):
+            p = cmd.find(u' ')
+            id_ = int(cmd[1:p])
+            cmd = cmd[p + 1:]
+        a, b = chop(cmd)
+        object_type, object_id, prop_name, value = [a] + chop(b, 2)
+        key = str(object_type), str(object_id), str(prop_name)
+    report('split id, chop, str() key', count, time.time() - t)
+    t = time.time()
+    for cmd in messages:
+        message = parse(cmd)
+        key = message.ObjectType, message.ObjectId, message.PropName
+    report('parse', count, time.time() - t)
+
+
+def bench_dispatch(count=50000):
+    '''Dispatches a presence flood of count notifications through the
+    notifier of a Skype object with and without an OnlineStatus handler.
+    '''
+    import Skype4Py
+    from Skype4Py.api import sim
+    skype = Skype4Py.Skype(Api=sim.SkypeAPI({'Contacts': 0}))
+    notifier = skype._Api.notifier
+    notifications = [u'USER user%d ONLINESTATUS %s' % (i, ('ONLINE', 'AWAY')[i % 2])
+                     for i in xrange(count)]
+    t = time.time()
+    for notification in notifications:
+        notifier.notification_received(notification)
+    report('no handlers', count, time.time() - t)
+    skype.RegisterEventHandler('OnlineStatus', lambda user, status: None)
+    t = time.time()
+    for notification in notifications:
+        notifier.notification_received(notification)
+    report('OnlineStatus handler', count, time.time() - t)
+
+
+def bench_events(count=10000):
+    '''Fires a burst of count MessageStatus events and waits until the
+    handler has seen all of them, in every event delivery mode.
+    '''
+    import threading
+    import Skype4Py
+    from Skype4Py.api import sim
+    for mode in (Skype4Py.evdPooled, Skype4Py.evdInline, Skype4Py.evdQueue):
+        skype = Skype4Py.Skype(Api=sim.SkypeAPI({'Contacts': 0}), EventDelivery=mode,
+                               QueuedEvents=['MessageStatus'])
+        done = threading.Event()
+        seen = []
+        peak = [0]
+        def handler(message, status):
+            seen.append(message)
+            peak[0] = max(peak[0], threading.activeCount())
+            if len(seen) == count:
+                done.set()
+        if mode != Skype4Py.evdQueue:
+            skype.RegisterEventHandler('MessageStatus', handler)
+        t = time.time()
+        for i in xrange(count):
+            skype._CallEventHandler('MessageStatus', i, 'RECEIVED')
+        if mode == Skype4Py.evdQueue:
+            while len(seen) < count:
+                for name, args, kwargs in skype.Events.get_batch(max=500):
+                    handler(*args, **kwargs)
+        done.wait()
+        report('%s, peak %d threads' % (mode.lower(), peak[0]), count, time.time() - t)
+
+
+def bench_prefetch(contacts=2000, latency=0.0005):
+    '''Reads two properties of contacts friends one by one and after
+    prefetching them, from a simulated client replying after latency seconds.
+    '''
+    import Skype4Py
+    from Skype4Py.api import sim
+    for prefetch in (False, True):
+        api = sim.SkypeAPI({'Contacts': contacts, 'Seed': 0, 'Latency': latency})
+        skype = Skype4Py.Skype(Api=api)
+        skype.Attach()
+        friends = skype.Friends
+        t = time.time()
+        if prefetch:
+            friends.Prefetch('FULLNAME', 'ONLINESTATUS')
+        for user in friends:
+            user.FullName, user.OnlineStatus
+        report(('one by one', 'Prefetch')[prefetch], contacts * 2, time.time() - t)
+        api.close()
+
+
+def bench_roster(contacts=5000, count=1000):
+    '''Finds the online friends, the away friends in a group and counts the
+    friends by status through the properties and using a roster.
+    '''
+    import Skype4Py
+    from Skype4Py.api import sim
+    api = sim.SkypeAPI({'Contacts': contacts, 'Seed': 0})
+    skype = Skype4Py.Skype(Api=api)
+    skype.Attach()
+    group = skype.Groups[0]
+    skype.Friends.Prefetch('ONLINESTATUS')
+    t = time.time()
+    for i in xrange(count // 100):
+        group.OnlineUsers
+        [x for x in group.Users if x.OnlineStatus == Skype4Py.olsAway]
+        counts = {}
+        for user in skype.Friends:
+            counts[user.OnlineStatus] = counts.get(user.OnlineStatus, 0) + 1
+    report('properties, cached statuses', count // 100, time.time() - t)
+    t = time.time()
+    roster = Skype4Py.Roster(skype)
+    report('Roster load', 1, time.time() - t)
+    t = time.time()
+    for i in xrange(count):
+        roster.OnlineFriends
+        roster.FindFriends(Skype4Py.olsAway, group)
+        roster.CountByStatus()
+    report('Roster', count, time.time() - t)
+    t = time.time()
+    for i in xrange(count):
+        api.notify(u'USER user%d ONLINESTATUS %s' % (i % contacts, Skype4Py.olsAway))
+    report('notifications, with roster', count, time.time() - t)
+    roster.Close()
+    api.close()
+
+
+def bench_search(count=200000):
+    '''Turns a SEARCH CHATMESSAGES reply listing count messages into objects
+    through a ChatMessageCollection and through IterSearch, and measures the
+    time to the first object and to the last one.
+    '''
+    import Skype4Py
+    from Skype4Py.api import sim
+    from Skype4Py.utils import chop, split
+    from Skype4Py.chat import ChatMessageCollection
+    skype = Skype4Py.Skype(Api=sim.SkypeAPI({'Contacts': 0}))
+    reply = u'CHATMESSAGES ' + u', '.join(unicode(x) for x in xrange(1000000, 1000000 + count))
+    t = time.time()
+    messages = ChatMessageCollection(skype, split(chop(str(reply))[-1], ', '))
+    iterator = iter(messages)
+    iterator.next()
+    report('collection, first object', 1, time.time() - t)
+    for message in iterator:
+        pass
+    report('collection, all objects', count, time.time() - t)
+    t = time.time()
+    iterator = skype._IterSearchReply(Skype4Py.chat.ChatMessage, reply)
+    iterator.next()
+    report('IterSearch, first object', 1, time.time() - t)
+    for message in iterator:
+        pass
+    report('IterSearch, all objects', count, time.time() - t)
+
+
+def bench_search_async(count=50, latency=0.002):
+    '''Runs count searches of various kinds one by one and all at once with
+    SearchAsync against a simulated client replying after latency seconds.
+    '''
+    import Skype4Py
+    from Skype4Py.api import sim
+    api = sim.SkypeAPI({'Contacts': 100, 'Seed': 0, 'Latency': latency})
+    skype = Skype4Py.Skype(Api=api)
+    skype.Attach()
+    kinds = ['FRIENDS', 'CHATS', 'ACTIVECALLS', 'MISSEDCHATMESSAGES', 'GROUPS']
+    t = time.time()
+    for i in xrange(count):
+        skype._Search(kinds[i % len(kinds)])
+    report('one by one', count, time.time() - t)
+    t = time.time()
+    futures = [skype.SearchAsync(kinds[i % len(kinds)]) for i in xrange(count)]
+    for future in futures:
+        future.result()
+    report('SearchAsync', count, time.time() - t)
+    api.close()
+
+
+def bench_snapshot(contacts=1000, rounds=20):
+    '''Reads three typed properties of contacts cached friends rounds times
+    through the properties and from snapshot records.
+    '''
+    import Skype4Py
+    from Skype4Py.api import sim
+    api = sim.SkypeAPI({'Contacts': contacts, 'Seed': 0})
+    skype = Skype4Py.Skype(Api=api)
+    skype.Attach()
+    friends = skype.Friends
+    props = ['OnlineStatus', 'LastOnline', 'IsVideoCapable']
+    friends.Snapshot(props)
+    t = time.time()
+    for i in xrange(rounds):
+        for user in friends:
+            user.OnlineStatus, user.LastOnline, user.IsVideoCapable
+    report('properties', contacts * rounds, time.time() - t)
+    t = time.time()
+    snapshots = friends.Snapshot(props)
+    for i in xrange(rounds):
+        for user in snapshots:
+            user.OnlineStatus, user.LastOnline, user.IsVideoCapable
+    report('Snapshot, including taking it', contacts * rounds, time.time() - t)
+    api.close()
+
+
+def bench_replay(count=20000):
+    '''Records a presence flood of count notifications using the simulator
+    and replays it as fast as possible.
+    '''
+    import Skype4Py
+    from Skype4Py.api import sim, replay
+    fd, path = tempfile.mkstemp('.rec')
+    os.close(fd)
+    try:
+        api = sim.SkypeAPI({'Contacts': 1000, 'Seed': 0})
+        skype = Skype4Py.Skype(Api=api)
+        recorder = Skype4Py.Recorder(skype, path)
+        skype.Attach()
+        notifications = [u'USER user%d ONLINESTATUS %s' % (i % 1000, ('ONLINE', 'AWAY')[i % 2])
+                         for i in xrange(count)]
+        t = time.time()
+        for notification in notifications:
+            api.notify(notification)
+        report('recording', count, time.time() - t)
+        recorder.Close()
+        api.close()
+        for handler in (False, True):
+            api = replay.SkypeAPI({'Recording': path})
+            skype = Skype4Py.Skype(Api=api)
+            if handler:
+                skype.RegisterEventHandler('OnlineStatus', lambda user, status: None)
+            t = time.time()
+            skype.Attach()
+            api.join()
+            report('replay, %s' % ('no handlers', 'OnlineStatus handler')[handler],
+                   count, time.time() - t)
+            api.close()
+    finally:
+        os.remove(path)
+
+
+benchmarks = [name[6:] for name in sorted(globals()) if name.startswith('bench_')]
+
+
+if __name__ == '__main__':
+    from optparse import OptionParser
+
+    parser = OptionParser(usage='Usage: %%prog [benchmark] [...]\n\nBenchmarks: %s' %
+                                ', '.join(benchmarks))
+    options, args = parser.parse_args()
+
+    for name in args or benchmarks:
+        if name not in benchmarks:
+            parser.error('unknown benchmark: %s' % name)
+        print '%s:' % name
+        globals()['bench_%s' % name]()
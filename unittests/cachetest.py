@@ -0,0 +1,147 @@
+import unittest
+import tempfile
+import time
+import os
+
+import skype4pytest
+from Skype4Py.cache import *
+from Skype4Py.cache import DEFAULT
+
+
+class PropertyCacheTest(unittest.TestCase):
+    def testUnbounded(self):
+        cache = PropertyCache()
+        cache['USER', 'spam', 'FULLNAME'] = u'Spam'
+        self.assertEqual(cache['USER', 'spam', 'FULLNAME'], u'Spam')
+        self.assertEqual(cache.get(('USER', 'eggs', 'FULLNAME')), None)
+        self.assertRaises(KeyError, cache.__getitem__, ('USER', 'eggs', 'FULLNAME'))
+        self.failUnless(('USER', 'spam', 'FULLNAME') in cache)
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['hits'], stats['misses']), (1, 1, 2))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def testMaxEntries(self):
+        cache = PropertyCache(max_entries=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache['a']
+        cache['c'] = 3
+        self.assertEqual(sorted(cache.keys()), ['a', 'c'])
+        self.assertEqual(cache.evictions, 1)
+
+    def testMaxBytes(self):
+        cache = PropertyCache(max_bytes=1000)
+        for i in range(100):
+            cache[i] = u'x' * 10
+        self.failUnless(cache.bytes <= 1000)
+        self.failUnless(cache.evictions > 0)
+        self.assertEqual(cache.bytes, sum(cache.data[x].size for x in cache.keys()))
+
+    def testTTL(self):
+        cache = PropertyCache(ttl=0.05)
+        cache['a'] = 1
+        cache.set('b', 2, None)
+        cache.set('c', 3, 0)
+        self.assertEqual(cache.get('a'), 1)
+        self.failIf('c' in cache)
+        time.sleep(0.1)
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('b'), 2)
+        self.assertEqual(cache.purge(), 1)
+        self.assertEqual(cache.expirations, 2)
+        self.assertEqual(cache.keys(), ['b'])
+
+    def testSharedKeys(self):
+        cache = PropertyCache()
+        cache[u'USER', u'spam', 'FULLNAME'] = u'Spam'
+        cache['USER', ''.join(['sp', 'am']), 'MOOD_TEXT'] = u'Eggs'
+        k1, k2 = cache.keys()
+        self.failUnless(k1[0] is k2[0] and k1[1] is k2[1])
+
+    def testInvalidate(self):
+        cache = PropertyCache(max_entries=5)
+        cache['USER', 'spam', 'FULLNAME'] = u'Spam'
+        cache['USER', 'spam', 'MOOD_TEXT'] = u'Eggs'
+        cache['USER', 'eggs', 'FULLNAME'] = u'Eggs'
+        cache['CHAT', '#spam/$1', 'TOPIC'] = u'Spam'
+        cache['CHAT', '#spam/$2', 'TOPIC'] = u'Spam'
+        cache['CHAT', '#eggs/$1', 'TOPIC'] = u'Eggs'
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.invalidate('USER', 'spam'), 1)
+        self.assertEqual(cache.invalidate('USER', 'eggs', 'FULLNAME'), 1)
+        self.assertEqual(cache.invalidate('USER', 'eggs', 'FULLNAME'), 0)
+        self.assertEqual(cache.invalidate_prefix('CHAT', '#spam/'), 2)
+        self.assertEqual(cache.keys(), [('CHAT', '#eggs/$1', 'TOPIC')])
+        self.assertEqual(cache.invalidate('CHAT'), 1)
+        self.assertEqual((len(cache), cache.index), (0, {}))
+
+    def testSnapshot(self):
+        fd, path = tempfile.mkstemp('.db')
+        os.close(fd)
+        try:
+            cache = PropertyCache()
+            cache['USER', 'spam', 'FULLNAME'] = u'Spam'
+            cache.set(('USER', 'spam', 'MOOD_TEXT'), u'Eggs', 0.05)
+            cache.set(('USER', 'spam', 'ABOUT'), u'Eggs', 0)
+            cache['SPAM'] = u'Eggs'
+            self.assertEqual(cache.save(path), 2)
+            time.sleep(0.1)
+            cache = PropertyCache()
+            cache['USER', 'spam', 'FULLNAME'] = u'Sausage'
+            self.assertEqual(cache.load(path), 0)
+            cache = PropertyCache(ttl=0.01)
+            self.assertEqual(cache.load(path, max_age=0.01), 0)
+            self.assertEqual(cache.load(path), 1)
+            self.assertEqual(cache['USER', 'spam', 'FULLNAME'], u'Spam')
+            self.assertEqual(cache.stats()['tentative'], 1)
+            self.failUnless(cache.confirm(('USER', 'spam', 'FULLNAME')))
+            self.failIf(cache.confirm(('USER', 'spam', 'FULLNAME')))
+            # Saved without an expiration time, the default ttl doesn't apply.
+            time.sleep(0.05)
+            self.assertEqual(cache['USER', 'spam', 'FULLNAME'], u'Spam')
+        finally:
+            os.remove(path)
+        self.assertEqual(cache.load(path), 0)
+
+    def testUpdates(self):
+        cache = PropertyCache()
+        key = ('USER', 'spam', 'FULLNAME')
+        token = cache.begin_update(key)
+        cache[key] = u'Notified'
+        self.failIf(cache.set(key, u'Stale', token=token))
+        cache.end_update(key, token)
+        self.assertEqual(cache[key], u'Notified')
+        token = cache.begin_update(key)
+        self.failUnless(cache.set(key, u'Fresh', token=token))
+        cache.end_update(key, token)
+        self.assertEqual(cache[key], u'Fresh')
+        self.assertEqual((cache.updating, cache.changed), ({}, {}))
+
+
+class CachePolicyTest(unittest.TestCase):
+    def testLookup(self):
+        policy = CachePolicy({})
+        self.failUnless(policy.lookup('USER', 'FULLNAME') is DEFAULT)
+        policy['USER', '*'] = 60
+        policy['USER', 'ONLINESTATUS'] = CACHE_UNTIL_NOTIFIED
+        self.assertEqual(policy.lookup('USER', 'FULLNAME'), 60)
+        self.assertEqual(policy.lookup('USER', 'ONLINESTATUS'), CACHE_UNTIL_NOTIFIED)
+        self.failUnless(policy.lookup('CALL', 'STATUS') is DEFAULT)
+
+    def testDefaults(self):
+        policy = CachePolicy()
+        self.assertEqual(policy.lookup('CALL', 'DURATION'), CACHE_NEVER)
+        policy['CALL', 'DURATION'] = 1
+        self.assertEqual(CachePolicy().lookup('CALL', 'DURATION'), CACHE_NEVER)
+
+
+def suite():
+    return unittest.TestSuite([
+        unittest.defaultTestLoader.loadTestsFromTestCase(PropertyCacheTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(CachePolicyTest),
+    ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import os
+import tempfile
+
+import skype4pytest
+from Skype4Py.chatsync import *
+
+
+class ChatSyncTest(skype4pytest.TestCase):
+    def setUpObject(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self.path)
+        self.obj = ChatSync(self.skype, self.path, ['BODY'])
+
+    def tearDownObject(self):
+        del self.obj
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def enqueueMessages(self, *ids):
+        for i in ids:
+            self.api.enqueue('GET CHATMESSAGE %d TIMESTAMP' % i,
+                             'CHATMESSAGE %d TIMESTAMP %d' % (i, 1000 + i))
+            self.api.enqueue('GET CHATMESSAGE %d BODY' % i,
+                             'CHATMESSAGE %d BODY msg%d' % (i, i))
+
+    # Methods
+    # =======
+
+    def testSync(self):
+        self.api.enqueue('SEARCH CHATS',
+                         'CHATS spam, eggs')
+        self.api.enqueue('GET CHAT spam CHATMESSAGES',
+                         'CHAT spam CHATMESSAGES 3, 1')
+        self.api.enqueue('GET CHAT eggs CHATMESSAGES',
+                         'CHAT eggs CHATMESSAGES ')
+        self.enqueueMessages(1, 3)
+        result = self.obj.Sync()
+        self.failUnless(self.api.is_empty())
+        self.assertEqual([(x.Name, [y.Id for y in z]) for x, z in result], [('spam', [1, 3])])
+        self.assertEqual(result[0][1][1].Body, 'msg3')
+        self.assertEqual(self.obj.Mark('spam'), (1003.0, 3))
+        self.assertEqual(self.obj.Mark('eggs'), None)
+        self.api.enqueue('GET CHAT spam CHATMESSAGES',
+                         'CHAT spam CHATMESSAGES 1, 3, 4')
+        self.enqueueMessages(4)
+        self.assertEqual([x.Id for x in self.obj.SyncChat('spam')], [4])
+        self.failUnless(self.api.is_empty())
+        self.api.enqueue('GET CHAT spam CHATMESSAGES',
+                         'CHAT spam CHATMESSAGES 1, 3, 4')
+        self.assertEqual(len(self.obj.SyncChat('spam')), 0)
+
+    def testRenumbered(self):
+        self.api.enqueue('GET CHAT spam CHATMESSAGES',
+                         'CHAT spam CHATMESSAGES 7')
+        self.enqueueMessages(7)
+        self.obj.SyncChat('spam')
+        # Message 7 is now message 2, message 3 was received in the same second.
+        self.api.enqueue('GET CHAT spam CHATMESSAGES',
+                         'CHAT spam CHATMESSAGES 1, 2, 3, 4')
+        for i, timestamp in ((1, 1000), (2, 1007), (3, 1007), (4, 1010)):
+            self.api.enqueue('GET CHATMESSAGE %d TIMESTAMP' % i,
+                             'CHATMESSAGE %d TIMESTAMP %d' % (i, timestamp))
+        self.api.enqueue('GET CHATMESSAGE 2 BODY',
+                         'CHATMESSAGE 2 BODY msg7')
+        self.api.enqueue('GET CHATMESSAGE 3 BODY',
+                         'CHATMESSAGE 3 BODY msg3')
+        self.api.enqueue('GET CHATMESSAGE 4 BODY',
+                         'CHATMESSAGE 4 BODY msg4')
+        self.assertEqual([x.Id for x in self.obj.SyncChat('spam')], [3, 4])
+        self.failUnless(self.api.is_empty())
+        self.assertEqual(self.obj.Mark('spam'), (1010.0, 4))
+
+    def testCheckpoint(self):
+        self.api.enqueue('GET CHAT spam CHATMESSAGES',
+                         'CHAT spam CHATMESSAGES 1')
+        self.enqueueMessages(1)
+        self.obj.SyncChat('spam')
+        self.obj.Checkpoint()
+        sync = ChatSync(self.skype, self.path)
+        self.assertEqual(sync.Mark('spam'), (1001.0, 1))
+        self.assertEqual(sync._Marks['spam'][2], 'msg1')
+        self.api.enqueue('GET CHAT spam CHATMESSAGES',
+                         'CHAT spam CHATMESSAGES 1')
+        self.assertEqual(len(sync.SyncChat('spam')), 0)
+        self.failUnless(self.api.is_empty())
+
+    def testReset(self):
+        self.api.enqueue('GET CHAT spam CHATMESSAGES',
+                         'CHAT spam CHATMESSAGES 1')
+        self.enqueueMessages(1)
+        self.obj.SyncChat('spam')
+        self.obj.Reset('spam')
+        self.assertEqual(self.obj.Mark('spam'), None)
+
+
+def suite():
+    return unittest.TestSuite([
+        unittest.defaultTestLoader.loadTestsFromTestCase(ChatSyncTest),
+    ])
+
+
+if __name__ == '__main__':
+    unittest.main()
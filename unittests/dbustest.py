@@ -0,0 +1,86 @@
+import unittest
+
+import skype4pytest
+from Skype4Py.api import Command, CommandFuture, SkypeAPIBase
+from Skype4Py.errors import SkypeAPIError
+try:
+    import dbus
+    from Skype4Py.api.posix_dbus import SkypeAPI
+except ImportError:
+    dbus = None
+
+
+class FakeSkypeOut(object):
+    '''Stands for the /com/Skype DBus object. Answers asynchronous calls by
+    echoing the command, by calling the error handler or by raising.
+    '''
+
+    def __init__(self):
+        self.mode = 'reply'
+        self.calls = []
+
+    def Invoke(self, cmd, reply_handler=None, error_handler=None):
+        self.calls.append(cmd)
+        if self.mode == 'raise':
+            raise dbus.DBusException('org.freedesktop.DBus.Error.Disconnected')
+        if self.mode == 'error':
+            error_handler(dbus.DBusException('org.freedesktop.DBus.Error.NoReply'))
+        else:
+            reply_handler(cmd)
+
+
+class DBusTest(unittest.TestCase):
+    def setUp(self):
+        # Skip the constructor, it connects to the session bus.
+        self.api = SkypeAPI.__new__(SkypeAPI)
+        SkypeAPIBase.__init__(self.api)
+        self.api.run_main_loop = True
+        self.api.async_invoke = True
+        self.api.skype_out = self.skype_out = FakeSkypeOut()
+
+    def tearDown(self):
+        SkypeAPIBase.close(self.api)
+
+    def send(self, blocking=False):
+        command = Command('PING', Blocking=blocking, Timeout=10000)
+        future = CommandFuture(command)
+        self.api.send_command(command)
+        return command, future
+
+    def testReplyHandler(self):
+        command, future = self.send()
+        self.failUnless(future.done())
+        self.assertEqual(future.result(), u'PING')
+        self.assertEqual(self.skype_out.calls, [u'#%d PING' % command.Id])
+        self.failIf(self.api.commands)
+        self.assertEqual(len(self.api.timeouts), 0)
+
+    def testErrorHandler(self):
+        self.skype_out.mode = 'error'
+        command, future = self.send()
+        self.failUnless(future.done())
+        self.failUnlessRaises(SkypeAPIError, future.result)
+        self.failIf(self.api.commands)
+        self.assertEqual(len(self.api.timeouts), 0)
+
+    def testSynchronousFailure(self):
+        self.skype_out.mode = 'raise'
+        command, future = self.send()
+        self.failUnless(future.done())
+        self.failUnlessRaises(SkypeAPIError, future.result)
+        self.failIf(self.api.commands)
+        self.assertEqual(len(self.api.timeouts), 0)
+        self.failUnlessRaises(SkypeAPIError, self.send, True)
+        self.failIf(self.api.commands)
+
+
+def suite():
+    if dbus is None:
+        return unittest.TestSuite()
+    return unittest.TestSuite([
+        unittest.defaultTestLoader.loadTestsFromTestCase(DBusTest),
+    ])
+
+
+if __name__ == '__main__':
+    unittest.main()
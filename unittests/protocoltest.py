@@ -0,0 +1,65 @@
+import unittest
+
+import skype4pytest
+from Skype4Py.protocol import *
+
+
+class ProtocolTest(unittest.TestCase):
+    def testObject(self):
+        m = parse(u'USER echo123 MOOD_TEXT spam  eggs')
+        self.assertEqual(m, u'USER echo123 MOOD_TEXT spam  eggs')
+        self.assertEqual(m.Id, None)
+        self.assertEqual((m.Verb, m.ObjectType, m.ObjectId, m.PropName, m.Value),
+                         (u'USER', u'USER', u'echo123', u'MOOD_TEXT', u'spam  eggs'))
+        m = parse(u'CHAT #spam/$eggs TOPIC')
+        self.assertEqual((m.ObjectId, m.PropName, m.Value), (u'#spam/$eggs', u'TOPIC', u''))
+
+    def testReply(self):
+        m = parse(u'#12 CALL 34 STATUS INPROGRESS')
+        self.assertEqual(m, u'CALL 34 STATUS INPROGRESS')
+        self.assertEqual(m.Id, 12)
+        self.assertEqual((m.ObjectType, m.ObjectId, m.PropName, m.Value),
+                         (u'CALL', u'34', u'STATUS', u'INPROGRESS'))
+        self.failUnless(parse(m) is m)
+
+    def testGlobalObject(self):
+        m = parse(u'PROFILE MOOD_TEXT spam eggs')
+        self.assertEqual((m.ObjectType, m.ObjectId, m.PropName, m.Value),
+                         (u'PROFILE', u'', u'MOOD_TEXT', u'spam eggs'))
+
+    def testVariable(self):
+        m = parse(u'USERSTATUS AWAY')
+        self.assertEqual((m.ObjectType, m.ObjectId, m.PropName, m.Value),
+                         (u'USERSTATUS', u'', u'', u'AWAY'))
+
+    def testOther(self):
+        m = parse(u'#5 ERROR 2 Unknown command')
+        self.assertEqual((m.Id, m.Verb, m.ObjectType, m.Value),
+                         (5, u'ERROR', None, u'2 Unknown command'))
+        m = parse(u'')
+        self.assertEqual((m.Verb, m.ObjectType, m.Value), (u'', None, u''))
+
+    def testInterning(self):
+        m1 = parse(u'USER spam ONLINESTATUS ONLINE')
+        m2 = parse(u'#3 USER eggs ONLINESTATUS ONLINE')
+        self.failUnless(m1.ObjectType is intern_name('USER'))
+        self.failUnless(m1.PropName is m2.PropName is intern_name('ONLINESTATUS'))
+        self.failUnless(m1.Value is m2.Value)
+        m1 = parse(u'CONNSTATUS ONLINE')
+        self.failUnless(m1.Value is m2.Value)
+        # Free-form values are not interned, however short.
+        m1 = parse(u'USER spam MOOD_TEXT %s' % u''.join([u'sp', u'am']))
+        m2 = parse(u'USER eggs MOOD_TEXT spam')
+        self.failIf(m1.Value is m2.Value)
+        self.failUnless(intern_value(u''.join([u'sp', u'am']), 'FULLNAME') is not m2.Value)
+        self.assertEqual(intern_name(u'\xe9'), u'\xe9')
+
+
+def suite():
+    return unittest.TestSuite([
+        unittest.defaultTestLoader.loadTestsFromTestCase(ProtocolTest),
+    ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import threading
+import tempfile
+import os
+
+import skype4pytest
+import Skype4Py
+from Skype4Py.recorder import *
+from Skype4Py.api import sim, replay
+
+
+class RecorderTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp('.rec')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def record(self):
+        api = sim.SkypeAPI({'Contacts': 3, 'Seed': 0})
+        skype = Skype4Py.Skype(Api=api)
+        recorder = Recorder(skype, self.path)
+        skype.Attach()
+        skype.Friends
+        api.notify(u'USER user1 ONLINESTATUS AWAY')
+        api.notify(u'USER user2 MOOD_TEXT multi\nline \\ text')
+        recorder.Close()
+        api.notify(u'USER user2 ONLINESTATUS NA')
+        api.close()
+        return recorder.Count
+
+    def testRecord(self):
+        count = self.record()
+        records = list(read_recording(self.path))
+        self.assertEqual(len(records), count)
+        kinds = [x[1] for x in records]
+        self.failUnless('C' in kinds and 'R' in kinds and 'A' in kinds)
+        notifications = [x[2] for x in records if x[1] == 'N']
+        self.assertEqual(notifications, [u'USER user1 ONLINESTATUS AWAY',
+                                         u'USER user2 MOOD_TEXT multi\nline \\ text'])
+        commands = [x[2].split(' ', 1)[1] for x in records if x[1] == 'C']
+        self.failUnless(u'SEARCH FRIENDS' in commands)
+
+    def testReplay(self):
+        self.record()
+        api = replay.SkypeAPI({'Recording': self.path})
+        skype = Skype4Py.Skype(Api=api)
+        events = []
+        def OnlineStatus(user, status):
+            events.append((user.Handle, status))
+        skype.RegisterEventHandler('OnlineStatus', OnlineStatus)
+        skype.Attach()
+        api.join()
+        self.assertEqual(len(skype.Friends), 3)
+        self.assertRaises(Skype4Py.SkypeError, skype._DoCommand, 'PING')
+        api.close()
+        # Event handlers run on their own threads.
+        for i in range(100):
+            if events:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(events, [('user1', Skype4Py.olsAway)])
+
+
+def suite():
+    return unittest.TestSuite([
+        unittest.defaultTestLoader.loadTestsFromTestCase(RecorderTest),
+    ])
+
+
+if __name__ == '__main__':
+    unittest.main()
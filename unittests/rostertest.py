@@ -0,0 +1,108 @@
+import unittest
+
+import skype4pytest
+from Skype4Py.roster import *
+from Skype4Py.enums import *
+
+
+class RosterTest(skype4pytest.TestCase):
+    def setUpObject(self):
+        self.api.enqueue('SEARCH FRIENDS',
+                         'USERS spam, eggs, ham')
+        self.api.enqueue('SEARCH GROUPS ALL',
+                         'GROUPS 1, 2')
+        self.api.enqueue('GET USER spam ONLINESTATUS',
+                         'USER spam ONLINESTATUS ONLINE')
+        self.api.enqueue('GET USER eggs ONLINESTATUS',
+                         'USER eggs ONLINESTATUS AWAY')
+        self.api.enqueue('GET USER ham ONLINESTATUS',
+                         'USER ham ONLINESTATUS AWAY')
+        self.api.enqueue('GET GROUP 1 USERS',
+                         'GROUP 1 USERS spam, eggs, ham')
+        self.api.enqueue('GET GROUP 2 USERS',
+                         'GROUP 2 USERS eggs')
+        self.obj = Roster(self.skype)
+        self.failUnless(self.api.is_empty())
+
+    def notify(self, notification):
+        self.api.notifier.notification_received(notification)
+
+    def handles(self, users):
+        return sorted(x.Handle for x in users)
+
+    # Methods
+    # =======
+
+    def testFindFriends(self):
+        self.assertEqual(self.handles(self.obj.FindFriends()), ['eggs', 'ham', 'spam'])
+        self.assertEqual(self.handles(self.obj.FindFriends(olsAway)), ['eggs', 'ham'])
+        self.assertEqual(self.handles(self.obj.FindFriends((olsOnline, olsAway), 2)), ['eggs'])
+        self.assertEqual(self.handles(self.obj.FindFriends(olsDoNotDisturb)), [])
+        self.assertEqual(self.handles(self.obj.FindFriends(Group=3)), [])
+
+    def testCountByStatus(self):
+        self.assertEqual(self.obj.CountByStatus(), {olsOnline: 1, olsAway: 2})
+        self.assertEqual(self.obj.CountByStatus(Group=2), {olsAway: 1})
+
+    def testOnlineStatus(self):
+        self.assertEqual(self.obj.OnlineStatus('spam'), olsOnline)
+        self.assertEqual(self.obj.OnlineStatus('nobody'), olsUnknown)
+
+    def testNotifications(self):
+        self.notify('USER eggs ONLINESTATUS ONLINE')
+        self.notify('USER nobody ONLINESTATUS ONLINE')
+        self.assertEqual(self.handles(self.obj.OnlineFriends), ['eggs', 'spam'])
+        self.notify('USER ham BUDDYSTATUS 1')
+        self.assertEqual(self.obj.CountByStatus(), {olsOnline: 2})
+        self.api.enqueue('GET USER bacon ONLINESTATUS',
+                         'USER bacon ONLINESTATUS NA')
+        self.notify('USER bacon BUDDYSTATUS 3')
+        self.failUnless(self.api.is_empty())
+        self.assertEqual(self.obj.OnlineStatus('bacon'), olsNotAvailable)
+        self.notify('GROUP 2 USERS eggs, spam')
+        self.assertEqual(self.handles(self.obj.FindFriends(Group=2)), ['eggs', 'spam'])
+        self.api.enqueue('GET GROUP 2 USERS',
+                         'GROUP 2 USERS spam')
+        self.notify('GROUP 2 NROFUSERS 1')
+        self.failUnless(self.api.is_empty())
+        self.assertEqual(self.handles(self.obj.FindFriends(Group=2)), ['spam'])
+        self.notify('DELETED GROUP 2')
+        self.assertEqual([x.Id for x in self.obj.Groups], [1])
+
+    def testClose(self):
+        self.obj.Close()
+        self.notify('USER eggs ONLINESTATUS ONLINE')
+        self.assertEqual(self.obj.OnlineStatus('eggs'), olsAway)
+
+    def testOwner(self):
+        self.api.enqueue('SEARCH FRIENDS',
+                         'USERS spam, eggs, ham')
+        friends = self.skype.Friends
+        online = self.obj.OnlineFriends
+        self.failUnless(online[0] in friends)
+        self.assertEqual(online[0], friends[0])
+        self.failUnless(online[0] is self.skype.User('spam'))
+        self.assertEqual(len(friends - online), 2)
+        self.assertEqual(len(friends + self.obj.Friends), 6)
+
+    # Properties
+    # ==========
+
+    def testFriends(self):
+        self.assertEqual(self.handles(self.obj.Friends), ['eggs', 'ham', 'spam'])
+
+    def testGroups(self):
+        self.assertEqual(sorted(x.Id for x in self.obj.Groups), [1, 2])
+
+    def testOnlineFriends(self):
+        self.assertEqual(self.handles(self.obj.OnlineFriends), ['spam'])
+
+
+def suite():
+    return unittest.TestSuite([
+        unittest.defaultTestLoader.loadTestsFromTestCase(RosterTest),
+    ])
+
+
+if __name__ == '__main__':
+    unittest.main()
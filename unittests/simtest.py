@@ -0,0 +1,141 @@
+import unittest
+import threading
+
+import skype4pytest
+import Skype4Py
+from Skype4Py.api.sim import *
+
+
+class SimTest(unittest.TestCase):
+    def setUp(self):
+        self.model = SkypeModel(contacts=10, seed=0)
+        self.api = SkypeAPI({'Model': self.model})
+        self.skype = Skype4Py.Skype(Api=self.api)
+        self.skype.Attach()
+
+    def tearDown(self):
+        self.api.close()
+        del self.skype
+        del self.api
+
+    def testAttach(self):
+        self.assertEqual(self.skype.AttachmentStatus, Skype4Py.apiAttachSuccess)
+        self.assertEqual(self.skype.CurrentUserHandle, 'skype4py.sim')
+
+    def testFriends(self):
+        friends = self.skype.Friends
+        self.assertEqual(len(friends), 10)
+        self.assertEqual(friends[3].Handle, 'user3')
+        self.assertEqual(friends[3].FullName, 'User user3')
+
+    def testAllFriendsGroup(self):
+        group = [x for x in self.skype.Groups if x.Type == Skype4Py.grpAllFriends][0]
+        self.assertEqual(group._Property('NROFUSERS'), '10')
+        self.assertEqual(len(group.Users), 10)
+        skype = Skype4Py.Skype(Api=SkypeAPI({'Contacts': 0}))
+        skype.Attach()
+        group = [x for x in skype.Groups if x.Type == Skype4Py.grpAllFriends][0]
+        self.assertEqual(group._Property('NROFUSERS'), '0')
+        skype._Api.close()
+
+    def testError(self):
+        self.assertRaises(Skype4Py.SkypeError, self.skype.User, 'nobody')
+
+    def testChat(self):
+        events = []
+        event = threading.Event()
+        def MessageStatus(message, status):
+            events.append((message.Id, status))
+            if status == Skype4Py.cmsSent:
+                event.set()
+        self.skype.RegisterEventHandler('MessageStatus', MessageStatus)
+        chat = self.skype.CreateChatWith('user1', 'user2')
+        self.assertEqual(chat.Type, Skype4Py.chatTypeMultiChat)
+        chat.Topic = 'spam'
+        self.assertEqual(chat.Topic, 'spam')
+        message = chat.SendMessage('eggs')
+        event.wait(1)
+        self.failUnless((message.Id, Skype4Py.cmsSent) in events)
+        self.assertEqual(message.Body, 'eggs')
+        self.assertEqual([x.Id for x in self.skype.Chat(chat.Name).Messages], [message.Id])
+
+    def testSetOnlineStatus(self):
+        self.skype.ChangeUserStatus(Skype4Py.cusAway)
+        self.assertEqual(self.skype.CurrentUserStatus, Skype4Py.cusAway)
+
+    def testRandomNotifications(self):
+        self.api.close()
+        self.api = SkypeAPI({'Model': self.model, 'NotificationRate': 1000})
+        self.skype = Skype4Py.Skype(Api=self.api)
+        event = threading.Event()
+        def OnlineStatus(user, status):
+            event.set()
+        self.skype.RegisterEventHandler('OnlineStatus', OnlineStatus)
+        self.skype.Attach()
+        event.wait(1)
+        self.failUnless(event.isSet())
+
+    def testRoster(self):
+        roster = Skype4Py.Roster(self.skype)
+        self.assertEqual(len(roster.Friends), 10)
+        self.assertEqual(sum(roster.CountByStatus().values()), 10)
+        event = threading.Event()
+        def GroupUsers(group, count):
+            event.set()
+        self.skype.RegisterEventHandler('GroupUsers', GroupUsers)
+        group = self.skype.CreateGroup('spam')
+        event.wait(1)
+        event.clear()
+        group.AddUser('user1')
+        event.wait(1)
+        self.assertEqual([x.Handle for x in roster.FindFriends(Group=group)], ['user1'])
+        roster.Close()
+
+    def testLatency(self):
+        self.api.close()
+        self.api = SkypeAPI({'Model': self.model, 'Latency': 0.01})
+        self.skype = Skype4Py.Skype(Api=self.api)
+        self.assertEqual(self.skype.Friends[0].Handle, 'user0')
+
+    def testInlineDelivery(self):
+        self.api.close()
+        self.api = SkypeAPI({'Model': self.model})
+        self.skype = Skype4Py.Skype(Api=self.api, EventDelivery=Skype4Py.evdInline)
+        threads = []
+        def OnlineStatus(user, status):
+            threads.append(threading.currentThread())
+        self.skype.RegisterEventHandler('OnlineStatus', OnlineStatus)
+        self.skype.Attach()
+        self.api.notify(u'USER user1 ONLINESTATUS AWAY')
+        self.assertEqual(threads, [threading.currentThread()])
+        self.assertEqual(self.skype.Events, None)
+
+    def testQueueDelivery(self):
+        self.api.close()
+        self.api = SkypeAPI({'Model': self.model})
+        self.skype = Skype4Py.Skype(Api=self.api, EventDelivery=Skype4Py.evdQueue,
+                                    QueuedEvents=['AttachmentStatus', 'OnlineStatus'])
+        self.failIf(self.skype._HasEventHandlers('UserMood'))
+        self.skype.Attach()
+        self.api.notify(u'USER user1 ONLINESTATUS AWAY')
+        self.api.notify(u'USER user2 MOOD_TEXT spam')
+        events = self.skype.Events.get_batch(timeout=0)
+        self.assertEqual([x[0] for x in events], ['AttachmentStatus', 'OnlineStatus'])
+        self.assertEqual(events[1][1][0].Handle, 'user1')
+        self.assertEqual(events[1][1][1], Skype4Py.olsAway)
+        self.skype.Events.subscribe('UserMood')
+        self.api.notify(u'USER user2 MOOD_TEXT eggs')
+        self.assertEqual(self.skype.Events.get_batch(timeout=0),
+                         [('UserMood', (self.skype.User('user2'), 'eggs'), {})])
+        self.assertRaises(ValueError, Skype4Py.Skype, Api=self.api, EventDelivery=Skype4Py.evdQueue,
+                          QueuedEvents=['Spam'])
+
+
+def suite():
+    return unittest.TestSuite([
+        unittest.defaultTestLoader.loadTestsFromTestCase(SimTest),
+    ])
+
+
+if __name__ == '__main__':
+    unittest.main()
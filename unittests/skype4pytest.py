@@ -34,6 +34,8 @@ class SkypeAPI(SkypeAPIBase):
                 raise SkypeAPIError('expected [%s] command in the queue, not [%s]' %
                                     (command.Command, cmd))
             command.Reply = reply
+            if not command.Blocking:
+                self.complete_command(command)
             self.notifier.reply_received(command)
             if cmd[:4].upper() == 'SET ':
                 self.schedule(0.1, reply)
@@ -100,29 +102,47 @@ class TestCase(unittest.TestCase):
 
 def suite():
     import applicationtest
+    import cachetest
     import calltest
+    import chatsynctest
     import chattest
     import clienttest
+    import dbustest
     import filetransfertest
     import profiletest
+    import protocoltest
+    import recordertest
+    import rostertest
     import settingstest
+    import simtest
     import skypetest
     import smstest
     import usertest
+    import utilstest
     import voicemailtest
+    import x11test
 
     return unittest.TestSuite([
         applicationtest.suite(),
+        cachetest.suite(),
         calltest.suite(),
+        chatsynctest.suite(),
         chattest.suite(),
         clienttest.suite(),
+        dbustest.suite(),
         filetransfertest.suite(),
         profiletest.suite(),
+        protocoltest.suite(),
+        recordertest.suite(),
+        rostertest.suite(),
         settingstest.suite(),
+        simtest.suite(),
         skypetest.suite(),
         smstest.suite(),
         usertest.suite(),
+        utilstest.suite(),
         voicemailtest.suite(),
+        x11test.suite(),
     ])
 
 
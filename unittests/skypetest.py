@@ -1,4 +1,5 @@
 import unittest
+import time
 
 import skype4pytest
 from Skype4Py.skype import *
@@ -26,16 +27,45 @@ class SkypeTest(skype4pytest.TestCase):
         # Returned type: int
         self.api.enqueue('SEARCH USERS spam',
                          'USERS eggs, sausage, bacon')
+        found = []
+        self.obj.RegisterEventHandler('AsyncSearchUsersFinished',
+                                      lambda cookie, users: found.append((cookie, len(users))))
         t = self.obj.AsyncSearchUsers('spam')
         self.assertInstance(t, int)
         self.assertEqual(t, 0)
         self.failUnless(self.api.is_empty())
+        for i in range(100):
+            if found:
+                break
+            time.sleep(0.01)
+        self.assertEqual(found, [(0, 3)])
 
     def testAttach(self):
         self.api.set_attachment_status(apiAttachUnknown)
         self.obj.Attach()
         self.assertEqual(self.obj.AttachmentStatus, apiAttachSuccess)
 
+    def testBatch(self):
+        # Returned type: CommandBatch
+        self.api.enqueue('GET USER spam FULLNAME',
+                         'USER spam FULLNAME Spam Eggs')
+        self.api.enqueue('GET USER eggs FULLNAME',
+                         'ERROR 26 Invalid user handle')
+        self.api.enqueue('GET CONNSTATUS',
+                         'CONNSTATUS ONLINE')
+        t = self.obj.Batch()
+        self.assertInstance(t, CommandBatch)
+        f1 = t.Property('USER', 'spam', 'FULLNAME')
+        f2 = t.Property('USER', 'eggs', 'FULLNAME')
+        f3 = t.DoCommand('GET CONNSTATUS', 'CONNSTATUS')
+        self.failUnless(t.Wait())
+        self.assertEqual(len(t.Futures), 3)
+        self.assertEqual(f1.result(), 'Spam Eggs')
+        self.failUnlessRaises(SkypeError, f2.result)
+        self.assertEqual(f3.result(), 'CONNSTATUS ONLINE')
+        self.assertEqual(self.obj.Property('USER', 'spam', 'FULLNAME'), 'Spam Eggs')
+        self.failUnless(self.api.is_empty())
+
     def testCall(self):
         # Returned type: Call
         self.api.enqueue('GET CALL 345 STATUS',
@@ -182,6 +212,35 @@ class SkypeTest(skype4pytest.TestCase):
         self.assertEqual(t.Id, 123)
         self.failUnless(self.api.is_empty())
 
+    def testIterSearch(self):
+        self.api.enqueue('SEARCH CHATMESSAGES spam',
+                         'CHATMESSAGES 123, 456,789')
+        t = self.obj.IterSearch('ChatMessages', 'spam')
+        self.failUnless(self.api.is_empty())
+        self.assertEqual([(x.__class__, x.Id) for x in t],
+                         [(ChatMessage, 123), (ChatMessage, 456), (ChatMessage, 789)])
+        self.api.enqueue('SEARCH FRIENDS',
+                         'USERS ')
+        self.assertEqual(list(self.obj.IterSearch('FRIENDS')), [])
+        self.assertRaises(ValueError, self.obj.IterSearch, 'SPAM')
+
+    def testLoadCache(self):
+        import tempfile, os
+        fd, path = tempfile.mkstemp('.db')
+        os.close(fd)
+        try:
+            self.obj._CacheDict['USER', 'spam', 'FULLNAME'] = 'Spam'
+            self.assertEqual(self.obj.SaveCache(path), 1)
+            self.obj.ResetCache()
+            self.assertEqual(self.obj.LoadCache(path), 1)
+        finally:
+            os.remove(path)
+        self.api.enqueue('GET USER spam FULLNAME',
+                         'USER spam FULLNAME Eggs')
+        self.assertEqual(self.obj._Property('USER', 'spam', 'FULLNAME'), 'Spam')
+        self.failUnless(self.api.is_empty())
+        self.assertEqual(self.obj._Property('USER', 'spam', 'FULLNAME'), 'Eggs')
+
     def testMessage(self):
         # Returned type: ChatMessage
         self.api.enqueue('GET CHATMESSAGE 123 STATUS',
@@ -259,11 +318,120 @@ class SkypeTest(skype4pytest.TestCase):
         t = self.obj.UnregisterEventHandler('UserMood', handler)
         self.assertEqual(t, False)
 
+    def testNotificationDispatch(self):
+        from threading import Event
+        self.api.notifier.notification_received(u'GROUP 12 NROFUSERS 3')
+        self.assertEqual(self.obj._CacheDict['GROUP', '12', 'NROFUSERS'], '3')
+        event = Event()
+        args = []
+        def handler(group, count):
+            args.extend([group.Id, count])
+            event.set()
+        self.obj.OnGroupUsers = handler
+        self.api.notifier.notification_received(u'GROUP 12 NROFUSERS 4')
+        event.wait(1)
+        self.assertEqual(args, [12, 4])
+        self.assertEqual(self.obj._CacheDict['GROUP', '12', 'NROFUSERS'], '4')
+
+    def testCoalescedEvents(self):
+        self.assertEqual(self.obj.CoalescedEvents, frozenset())
+        self.failUnless('OnlineStatus' in self.obj.StateEvents)
+        self.obj.CoalescedEvents = self.obj.StateEvents
+        self.assertEqual(self.obj.CoalescedEvents, self.obj.StateEvents)
+        self.assertRaises(ValueError, setattr, self.obj, 'CoalescedEvents', ['CallStatus'])
+
+    def testCoalescedStateEvents(self):
+        from threading import Event
+        self.obj.CoalescedEvents = self.obj.StateEvents
+        release = Event()
+        calls = []
+        def handler(*args):
+            release.wait(1)
+            calls.append(args[-1])
+        self.obj.RegisterEventHandler('ConnectionStatus', handler)
+        self.obj.RegisterEventHandler('UserMood', handler)
+        notify = self.api.notifier.notification_received
+        notify(u'CONNSTATUS CONNECTING')
+        notify(u'USER spam MOOD_TEXT a')
+        time.sleep(0.05)
+        notify(u'CONNSTATUS OFFLINE')
+        notify(u'CONNSTATUS ONLINE')
+        notify(u'USER spam RICH_MOOD_TEXT b')
+        notify(u'USER spam MOOD_TEXT c')
+        notify(u'USER spam MOOD_TEXT d')
+        release.set()
+        while self.obj._EventExecutor.threads:
+            time.sleep(0.01)
+        self.assertEqual([x for x in calls if x.isupper()], ['CONNECTING', 'ONLINE'])
+        self.assertEqual([x for x in calls if x.islower()], ['a', 'b', 'd'])
+
+    def testPropertyCache(self):
+        from Skype4Py.cache import PropertyCache
+        cache = PropertyCache(max_entries=10)
+        self.obj.PropertyCache = cache
+        self.api.enqueue('GET USER spam FULLNAME',
+                         'USER spam FULLNAME eggs')
+        self.assertEqual(self.obj._Property('USER', 'spam', 'FULLNAME'), 'eggs')
+        self.assertEqual(self.obj._Property('USER', 'spam', 'FULLNAME'), 'eggs')
+        self.failUnless(self.api.is_empty())
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.obj.ResetCache()
+        self.failUnless(self.obj.PropertyCache is cache)
+        self.assertEqual(len(cache), 0)
+
+    def testCachePolicy(self):
+        from Skype4Py.cache import CACHE_NEVER
+        self.obj.PropertyCache.ttl = 60
+        self.obj.CachePolicy['USER', 'FULLNAME'] = CACHE_NEVER
+        self.obj.CachePolicy['USER', 'MOOD_TEXT'] = None
+        for i in range(2):
+            self.api.enqueue('GET USER spam FULLNAME',
+                             'USER spam FULLNAME eggs')
+            self.assertEqual(self.obj._Property('USER', 'spam', 'FULLNAME'), 'eggs')
+        self.failUnless(self.api.is_empty())
+        self.api.enqueue('GET USER spam MOOD_TEXT',
+                         'USER spam MOOD_TEXT eggs')
+        self.assertEqual(self.obj._Property('USER', 'spam', 'MOOD_TEXT'), 'eggs')
+        self.assertEqual(self.obj._Property('USER', 'spam', 'MOOD_TEXT'), 'eggs')
+        self.failUnless(self.api.is_empty())
+        self.assertEqual(self.obj._CacheDict.data['USER', 'spam', 'MOOD_TEXT'], 'eggs')
+        self.failIf(('USER', 'spam', 'FULLNAME') in self.obj._CacheDict)
+
+    def testInvalidateObject(self):
+        self.obj._CacheDict['USER', 'spam', 'FULLNAME'] = 'Spam'
+        self.obj._CacheDict['USER', 'eggs', 'FULLNAME'] = 'Eggs'
+        self.obj._CacheDict['CALL', '5', 'STATUS'] = 'INPROGRESS'
+        self.assertEqual(self.obj.InvalidateObject(User(self.obj, 'spam')), 1)
+        self.assertEqual(self.obj.InvalidateObject(Call(self.obj, 5)), 1)
+        self.assertEqual(self.obj._CacheDict.keys(), [('USER', 'eggs', 'FULLNAME')])
+        self.assertEqual(self.obj.InvalidatePrefix('USER', 'e'), 1)
+
+    def testInvalidateType(self):
+        self.obj._CacheDict['USER', 'spam', 'FULLNAME'] = 'Spam'
+        self.obj._CacheDict['PROFILE', '', 'FULLNAME'] = 'Eggs'
+        self.assertEqual(self.obj.InvalidateType('USER'), 1)
+        self.assertEqual(self.obj._CacheDict.keys(), [('PROFILE', '', 'FULLNAME')])
+
     def testResetCache(self):
         self.obj._CacheDict['SPAM'] = 'EGGS'
         self.obj.ResetCache()
         self.assertEqual(len(self.obj._CacheDict), 0)
 
+    def testSearchAsync(self):
+        # Returned type: CommandFuture
+        self.api.enqueue('SEARCH ACTIVECALLS',
+                         'CALLS 12, 34')
+        self.api.enqueue('SEARCH MISSEDCHATMESSAGES',
+                         'CHATMESSAGES 56')
+        t1 = self.obj.SearchAsync('ACTIVECALLS')
+        t2 = self.obj.Batch().Search('MISSEDCHATMESSAGES')
+        self.failUnless(self.api.is_empty())
+        self.assertInstance(t1.result(), CallCollection)
+        self.assertEqual([x.Id for x in t1.result()], [12, 34])
+        self.assertInstance(t2.result(), ChatMessageCollection)
+        self.assertEqual(len(t2.result()), 1)
+        self.assertRaises(ValueError, self.obj.SearchAsync, 'SPAM')
+
     def testSearchForUsers(self):
         # Returned type: UserCollection
         self.api.enqueue('SEARCH USERS spam',
@@ -281,6 +449,101 @@ class SkypeTest(skype4pytest.TestCase):
         self.assertEqual(command.Reply, 'EGGS')
         self.failUnless(self.api.is_empty())
 
+    def testSendCommandAsync(self):
+        # Returned type: CommandFuture
+        self.api.enqueue('SPAM',
+                         'EGGS')
+        command = self.obj.Command('SPAM', Block=True)
+        t = self.obj.SendCommandAsync(command)
+        self.assertInstance(t, CommandFuture)
+        self.failIf(command.Blocking)
+        self.failUnless(t.done())
+        self.assertEqual(t.result(), 'EGGS')
+        self.failUnless(self.api.is_empty())
+
+    def testPropertyAsyncCaching(self):
+        key = ('USER', 'spam', 'ONLINESTATUS')
+        self.api.enqueue('GET USER spam ONLINESTATUS',
+                         'USER spam ONLINESTATUS ONLINE')
+        future = self.obj._PropertyAsync(*key)
+        # Cached when the reply arrives, not when the result is read.
+        self.assertEqual(self.obj._CacheDict[key], 'ONLINE')
+        self.api.notifier.notification_received(u'USER spam ONLINESTATUS AWAY')
+        self.assertEqual(future.result(), 'ONLINE')
+        self.assertEqual(self.obj._CacheDict[key], 'AWAY')
+
+    def testPropertyCallerLoop(self):
+        # Like darwin or posix_dbus without a main loop, replies to non-blocking
+        # commands are only received while the caller runs its loop.
+        held = []
+        send_command = self.api.send_command
+        def sending(command):
+            if command.Blocking:
+                send_command(command)
+            else:
+                self.api.push_command(command)
+                self.api.timeouts.schedule(command)
+                held.append(command)
+        self.api.send_command = sending
+        self.obj.Timeout = 100
+        self.api.enqueue('GET USER spam FULLNAME',
+                         'USER spam FULLNAME Spam')
+        self.assertEqual(self.obj._Property('USER', 'spam', 'FULLNAME'), 'Spam')
+        self.failIf(held)
+        self.assertEqual(self.obj._CacheDict['USER', 'spam', 'FULLNAME'], 'Spam')
+
+    def testGetPropertyNotified(self):
+        notifier = self.api.notifier
+        sending_command = notifier.sending_command
+        def sending(command):
+            sending_command(command)
+            notifier.notification_received(u'USER spam FULLNAME Eggs')
+        notifier.sending_command = sending
+        self.api.enqueue('GET USER spam FULLNAME',
+                         'USER spam FULLNAME Spam')
+        self.assertEqual(self.obj._Property('USER', 'spam', 'FULLNAME'), 'Spam')
+        # The notification arrived after the query was sent, it is newer.
+        self.assertEqual(self.obj._CacheDict['USER', 'spam', 'FULLNAME'], 'Eggs')
+        self.assertEqual(self.obj._CacheDict.updating, {})
+
+    def testSetPropertyNotified(self):
+        notifier = self.api.notifier
+        sending_command = notifier.sending_command
+        def sending(command):
+            sending_command(command)
+            notifier.notification_received(u'USER spam DISPLAYNAME Eggs')
+        notifier.sending_command = sending
+        self.api.enqueue('SET USER spam DISPLAYNAME eggs',
+                         'USER spam DISPLAYNAME eggs')
+        self.obj._Property('USER', 'spam', 'DISPLAYNAME', 'eggs')
+        self.assertEqual(self.obj._CacheDict['USER', 'spam', 'DISPLAYNAME'], 'Eggs')
+        self.assertEqual(self.obj._CacheDict.updating, {})
+
+    def testSendCommandAsyncTimeout(self):
+        command = self.obj.Command('SPAM', Timeout=0.01)
+        t = CommandFuture(command)
+        self.api.push_command(command)
+        self.api.timeouts.schedule(command)
+        self.failUnless(t.wait(1.0))
+        self.failUnlessRaises(SkypeAPIError, t.result)
+        self.assertEqual(self.api.expired_commands, 1)
+        self.assertEqual(len(self.api.timeouts), 0)
+        self.failIf(self.api.commands)
+
+    def testSendCommandAsyncClose(self):
+        command = self.obj.Command('SPAM', Timeout=10000)
+        t = CommandFuture(command)
+        self.api.push_command(command)
+        self.api.timeouts.schedule(command)
+        self.api.close()
+        self.failUnless(t.done())
+        self.failUnlessRaises(SkypeAPIError, t.result)
+        self.assertEqual(self.api.expired_commands, 0)
+        self.failIf(self.api.commands)
+        command = self.obj.Command('EGGS', Timeout=10000)
+        self.api.push_command(command)
+        self.failUnlessRaises(SkypeAPIError, self.api.timeouts.schedule, command)
+
     def testSendMessage(self):
         # Returned type: ChatMessage
         self.api.enqueue('CHAT CREATE spam',
@@ -2,6 +2,7 @@ import unittest
 
 import skype4pytest
 from Skype4Py.user import *
+from Skype4Py.errors import SkypeError
 
 
 class UserTest(skype4pytest.TestCase):
@@ -11,6 +12,80 @@ class UserTest(skype4pytest.TestCase):
     # Methods
     # =======
 
+    def testPrefetch(self):
+        self.api.enqueue('GET USER spam FULLNAME',
+                         'USER spam FULLNAME Spam')
+        self.api.enqueue('GET USER spam ONLINESTATUS',
+                         'USER spam ONLINESTATUS AWAY')
+        self.obj.Prefetch('FULLNAME', 'ONLINESTATUS')
+        self.failUnless(self.api.is_empty())
+        self.assertEqual(self.obj.FullName, 'Spam')
+        self.assertEqual(self.obj.OnlineStatus, 'AWAY')
+
+    def testPrefetchCollection(self):
+        users = UserCollection(self.skype, ['spam', 'eggs'])
+        self.api.enqueue('GET USER spam FULLNAME',
+                         'USER spam FULLNAME Spam')
+        self.api.enqueue('GET USER eggs FULLNAME',
+                         'ERROR 26 Invalid user handle')
+        self.assertRaises(SkypeError, users.Prefetch, 'FULLNAME')
+        self.failUnless(self.api.is_empty())
+        self.assertEqual(self.obj.FullName, 'Spam')
+
+    def testSnapshot(self):
+        import pickle
+        from Skype4Py.call import Call
+        from Skype4Py.chat import Chat, ChatMessage
+        for cls in (User, Call, Chat, ChatMessage):
+            for name, prop in cls._SnapshotProperties:
+                self.failUnless(isinstance(getattr(cls, name), property), name)
+        self.api.enqueue('GET USER spam FULLNAME',
+                         'USER spam FULLNAME Spam')
+        self.api.enqueue('GET USER spam ONLINESTATUS',
+                         'USER spam ONLINESTATUS SKYPEOUT')
+        t = self.obj.Snapshot(['Handle', 'FullName', 'OnlineStatus', 'IsSkypeOutContact'])
+        self.failUnless(self.api.is_empty())
+        self.assertInstance(t, UserSnapshot)
+        self.assertEqual((t.Handle, t.FullName, t.OnlineStatus, t.IsSkypeOutContact),
+                         ('spam', 'Spam', 'SKYPEOUT', True))
+        self.assertRaises(AttributeError, getattr, t, 'MoodText')
+        self.assertRaises(AttributeError, setattr, t, 'FullName', 'Eggs')
+        self.assertEqual(pickle.loads(pickle.dumps(t)), t)
+        self.assertEqual(pickle.loads(pickle.dumps(t, 2)), t)
+        self.assertRaises(ValueError, self.obj.Snapshot, ['Spam'])
+
+    def testSnapshotCollection(self):
+        users = UserCollection(self.skype, ['spam', 'eggs'])
+        self.api.enqueue('GET USER spam TIMEZONE',
+                         'USER spam TIMEZONE 3600')
+        self.api.enqueue('GET USER eggs TIMEZONE',
+                         'USER eggs TIMEZONE 7200')
+        t = users.Snapshot(['Handle', 'Timezone'])
+        self.failUnless(self.api.is_empty())
+        self.assertEqual([(x.Handle, x.Timezone) for x in t], [('spam', 3600), ('eggs', 7200)])
+
+    def testSnapshotPipelined(self):
+        # Uncached and CACHE_NEVER properties are fetched by the pipelined pass too,
+        # the getters are not called on the live objects.
+        blocking = []
+        sending_command = self.api.notifier.sending_command
+        def sending(command):
+            blocking.append(command.Blocking)
+            sending_command(command)
+        self.api.notifier.sending_command = sending
+        self.skype.Cache = False
+        users = UserCollection(self.skype, ['spam', 'eggs'])
+        for handle in ('spam', 'eggs'):
+            self.api.enqueue('GET USER %s FULLNAME' % handle,
+                             'USER %s FULLNAME %s' % (handle, handle.title()))
+            self.api.enqueue('GET USER %s ONLINESTATUS' % handle,
+                             'USER %s ONLINESTATUS SKYPEOUT' % handle)
+        t = users.Snapshot(['FullName', 'IsSkypeOutContact'])
+        self.failUnless(self.api.is_empty())
+        self.assertEqual(blocking, [False] * 4)
+        self.assertEqual([(x.FullName, x.IsSkypeOutContact) for x in t],
+                         [('Spam', True), ('Eggs', True)])
+
     def testSaveAvatarToFile(self):
         self.api.enqueue('GET USER spam AVATAR 1 c:\\eggs.jpg',
                          'USER spam AVATAR 1 c:\\eggs.jpg')
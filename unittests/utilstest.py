@@ -0,0 +1,164 @@
+import unittest
+import threading
+import time
+
+import skype4pytest
+from Skype4Py.utils import *
+from Skype4Py.utils import EventExecutor, EventQueue
+from Skype4Py.enums import eqoDropNewest
+
+
+class EventExecutorTest(unittest.TestCase):
+    def testOrder(self):
+        executor = EventExecutor(2)
+        calls = []
+        done = threading.Event()
+        def handler(name, i):
+            calls.append((name, i))
+            if len(calls) == 300:
+                done.set()
+        for i in range(100):
+            for name in ('spam', 'eggs', 'sausage'):
+                executor.submit(name, [handler], (name, i), {})
+        done.wait(5)
+        for name in ('spam', 'eggs', 'sausage'):
+            self.assertEqual([i for n, i in calls if n == name], range(100))
+        while executor.threads:
+            time.sleep(0.01)
+        self.assertEqual(executor.queues, {})
+
+    def testConcurrency(self):
+        executor = EventExecutor(2)
+        lock = threading.Lock()
+        running = [0, 0]
+        release = threading.Event()
+        def handler():
+            lock.acquire()
+            running[0] += 1
+            running[1] = max(running[0], running[1])
+            lock.release()
+            release.wait(1)
+            lock.acquire()
+            running[0] -= 1
+            lock.release()
+        for name in ('spam', 'eggs', 'sausage', 'bacon'):
+            executor.submit(name, [handler], (), {})
+        time.sleep(0.1)
+        self.assertEqual(executor.threads, 2)
+        release.set()
+        while executor.threads:
+            time.sleep(0.01)
+        self.assertEqual(running, [0, 2])
+
+    def testCoalescing(self):
+        executor = EventExecutor(1)
+        calls = []
+        release = threading.Event()
+        def handler(key, value):
+            release.wait(1)
+            calls.append((key, value))
+        executor.submit('spam', [handler], ('a', 1), {}, 'a')
+        time.sleep(0.05)
+        for i in range(2, 5):
+            executor.submit('spam', [handler], ('a', i), {}, 'a')
+        executor.submit('spam', [handler], ('b', 5), {}, 'b')
+        self.assertEqual(len(executor.queues['spam']), 2)
+        release.set()
+        while executor.threads:
+            time.sleep(0.01)
+        self.assertEqual(calls, [('a', 1), ('a', 4), ('b', 5)])
+        self.assertEqual(executor.coalesced, 2)
+        self.assertEqual(executor.pending, {})
+
+
+class EventQueueTest(unittest.TestCase):
+    def testGetBatch(self):
+        queue = EventQueue(['Spam', 'Eggs'])
+        self.assertEqual(queue.get_batch(timeout=0), [])
+        self.assertEqual(queue.get_batch(timeout=0.01), [])
+        for i in range(5):
+            queue.put('Spam', (i, 'x'))
+        queue.put('Sausage', ())
+        queue.put('Eggs', (), {'Status': 'x'})
+        self.assertEqual(len(queue), 6)
+        self.assertEqual(queue.get_batch(max=3), [('Spam', (0, 'x'), {}), ('Spam', (1, 'x'), {}),
+                                                  ('Spam', (2, 'x'), {})])
+        self.assertEqual(queue.get_batch()[-1], ('Eggs', (), {'Status': 'x'}))
+
+    def testSubscribe(self):
+        queue = EventQueue()
+        queue.put('Spam', ())
+        self.assertEqual(len(queue), 0)
+        queue.subscribe('Spam', 'Eggs')
+        queue.unsubscribe('Spam')
+        queue.put('Spam', ())
+        queue.put('Eggs', ())
+        self.assertEqual(queue.get_batch(timeout=0), [('Eggs', (), {})])
+
+    def testOverflow(self):
+        queue = EventQueue(['Spam'], maxsize=2)
+        for i in range(4):
+            queue.put('Spam', (i,))
+        self.assertEqual([x[1] for x in queue.get_batch()], [(2,), (3,)])
+        self.assertEqual(queue.dropped, 2)
+        queue = EventQueue(['Spam'], maxsize=2, overflow=eqoDropNewest)
+        for i in range(4):
+            queue.put('Spam', (i,))
+        self.assertEqual([x[1] for x in queue.get_batch()], [(0,), (1,)])
+        self.assertEqual(queue.dropped, 2)
+        self.assertRaises(ValueError, EventQueue, overflow='SPAM')
+
+    def testWait(self):
+        queue = EventQueue(['Spam'])
+        threading.Timer(0.05, queue.put, ['Spam', ()]).start()
+        self.assertEqual(queue.get_batch(), [('Spam', (), {})])
+
+
+class CachedCollectionTest(skype4pytest.TestCase):
+    def setUpObject(self):
+        from Skype4Py.chat import ChatMessageCollection
+        from Skype4Py.user import UserCollection
+        self.obj = self.messages = ChatMessageCollection(self.skype, ['1', 2, 3, 2])
+        self.users = UserCollection(self.skype, ['spam', 'eggs'])
+
+    def testStorage(self):
+        from array import array
+        self.assertInstance(self.messages._Handles, array)
+        self.assertInstance(self.users._Handles, list)
+        self.assertEqual([x.Id for x in self.messages], [1, 2, 3, 2])
+        self.assertEqual(self.messages[1:3]._Handles.tolist(), [2, 3])
+
+    def testLookup(self):
+        from Skype4Py.chat import ChatMessage
+        m = ChatMessage(self.skype, 2)
+        self.failUnless(m in self.messages)
+        self.assertEqual(self.messages.index(m), 1)
+        self.messages.remove(m)
+        self.assertEqual(self.messages.index(m), 2)
+        self.messages.insert(0, m)
+        self.assertEqual(self.messages.index(m), 0)
+        self.messages.sort(key=lambda x: x.Id)
+        self.assertEqual(self.messages._Handles.tolist(), [1, 2, 2, 3])
+        self.assertEqual(self.messages.index(ChatMessage(self.skype, 3)), 3)
+        self.assertRaises(ValueError, self.messages.index, ChatMessage(self.skype, 4))
+        self.failIf(ChatMessage(self.skype, 4) in self.messages)
+
+    def testSetOperations(self):
+        from Skype4Py.chat import ChatMessageCollection
+        other = ChatMessageCollection(self.skype, [3, 4])
+        self.assertEqual((self.messages | other)._Handles.tolist(), [1, 2, 3, 4])
+        self.assertEqual((self.messages & other)._Handles.tolist(), [3])
+        self.assertEqual((self.messages - other)._Handles.tolist(), [1, 2])
+        self.assertRaises(TypeError, self.messages.union, self.users)
+
+
+def suite():
+    return unittest.TestSuite([
+        unittest.defaultTestLoader.loadTestsFromTestCase(EventExecutorTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(EventQueueTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(CachedCollectionTest),
+    ])
+
+
+if __name__ == '__main__':
+    unittest.main()
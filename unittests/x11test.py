@@ -0,0 +1,75 @@
+import unittest
+
+import skype4pytest
+try:
+    from Skype4Py.api.posix_x11 import XEvent, MessageDecoder, encode_message, CHUNK_SIZE
+except (ImportError, OSError):
+    XEvent = None
+
+
+class MessageDecoderTest(unittest.TestCase):
+    def chunks(self, message):
+        # Read the chunks back from an event structure so they are truncated
+        # at the null terminator like the received ones.
+        event = XEvent()
+        result = []
+        for chunk in encode_message(message):
+            event.xclient.data = chunk
+            result.append(event.xclient.data)
+        return result
+
+    def decode(self, chunks):
+        decoder = MessageDecoder()
+        result = []
+        for i, chunk in enumerate(chunks):
+            message = decoder.feed(chunk, i == 0)
+            if message is not None:
+                result.append(message)
+        return result
+
+    def testEncode(self):
+        chunks = encode_message(u'x' * 19)
+        self.assertEqual(chunks, ['x' * 19 + '\x00'])
+        chunks = encode_message(u'x' * 20)
+        self.assertEqual(chunks, ['x' * 20, '\x00'])
+        chunks = encode_message(u'x' * 45)
+        self.assertEqual([len(x) for x in chunks], [20, 20, 6])
+        self.assertEqual(chunks[-1][-1], '\x00')
+
+    def testChunkBoundaries(self):
+        for size in (0, 1, 19, 20, 21, 39, 40, 41, 1000):
+            message = (u'SPAM ' * size)[:size]
+            chunks = self.chunks(message)
+            self.assertEqual(len(chunks), size // CHUNK_SIZE + 1)
+            # The terminating null byte makes the last chunk shorter, even
+            # if the message fills the previous chunks exactly.
+            self.failUnless(len(chunks[-1]) < CHUNK_SIZE)
+            self.assertEqual(self.decode(chunks), [message])
+
+    def testMultibyte(self):
+        # Every multibyte character straddles a chunk boundary at some point.
+        for prefix in range(CHUNK_SIZE):
+            message = u'x' * prefix + u'\u0105\u20ac' * 15
+            self.assertEqual(self.decode(self.chunks(message)), [message])
+
+    def testSequence(self):
+        decoder = MessageDecoder()
+        chunks = self.chunks(u'x' * 30)
+        self.assertEqual(decoder.feed(chunks[0], True), None)
+        # A new beginning discards the unfinished message.
+        self.assertEqual(decoder.feed('spam', True), u'spam')
+        self.assertRaises(ValueError, decoder.feed, chunks[1], False)
+        self.assertEqual(decoder.feed(chunks[0], True), None)
+        self.assertEqual(decoder.feed(chunks[1], False), u'x' * 30)
+
+
+def suite():
+    if XEvent is None:
+        return unittest.TestSuite()
+    return unittest.TestSuite([
+        unittest.defaultTestLoader.loadTestsFromTestCase(MessageDecoderTest),
+    ])
+
+
+if __name__ == '__main__':
+    unittest.main()